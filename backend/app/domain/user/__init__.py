@@ -1,11 +1,19 @@
 # ドメインエンティティのエクスポート
 from app.domain.user.entity import User
+from app.domain.user.batch import UserBatch
 
 # リポジトリインターフェースのエクスポート
-from app.domain.user.repository import UserRepository
+from app.domain.user.repository import (
+    BulkCreateResult,
+    EmailAlreadyRegisteredError,
+    UserNotFoundError,
+    UserPage,
+    UserRepository,
+    UserVersionConflictError,
+)
 
 # ドメインサービスのエクスポート
 from app.domain.user.service import UserService
 
 # この形式により、以下のようにインポートできる
-# from app.domain.user import User, UserRepository, UserService
+# from app.domain.user import User, UserBatch, UserPage, UserRepository, UserService
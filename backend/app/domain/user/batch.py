@@ -0,0 +1,143 @@
+from collections.abc import Sequence
+from datetime import datetime
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Tuple, Union, overload
+
+from app.domain.user.entity import Timestamp, User, make_revision
+
+# 同じロールの組み合わせは1つのタプルを共有する（ユーザー数に比べて組み合わせはごく少ない）
+_ROLE_TUPLES: Dict[Tuple[str, ...], Tuple[str, ...]] = {}
+
+
+def _shared_roles(roles: Iterable[str]) -> Tuple[str, ...]:
+    key = tuple(roles)
+    return _ROLE_TUPLES.setdefault(key, key)
+
+
+class UserBatch(Sequence):
+    """
+    ユーザーの列指向のまとまり
+
+    フィールドごとのリスト（列）で保持し、1件ごとに User を生成しない。
+    日時は受け取った値（ISO 8601文字列または datetime）のまま保持し、ロールは同じ組み合わせのタプルを共有する。
+    一覧・エクスポート・一括取り込みのように多数のユーザーをまとめて扱う経路で使う。
+
+    Sequence[User] として扱え、添字や反復で取り出したときに初めて User を生成する（取り出した User の変更はバッチに影響しない）
+    """
+
+    __slots__ = (
+        "ids", "emails", "usernames", "password_hashes", "is_active", "roles",
+        "created_at", "updated_at", "last_login", "versions",
+    )
+
+    def __init__(self):
+        self.ids: List[str] = []
+        self.emails: List[str] = []
+        self.usernames: List[str] = []
+        self.password_hashes: List[str] = []
+        self.is_active: List[bool] = []
+        self.roles: List[Tuple[str, ...]] = []
+        self.created_at: List[Timestamp] = []
+        self.updated_at: List[Optional[Timestamp]] = []
+        self.last_login: List[Optional[Timestamp]] = []
+        self.versions: List[int] = []
+
+    @classmethod
+    def from_users(cls, users: Iterable[User]) -> "UserBatch":
+        batch = cls()
+        for user in users:
+            batch.append_user(user)
+        return batch
+
+    @classmethod
+    def from_rows(cls, rows: Iterable[Tuple[Any, ...]]) -> "UserBatch":
+        """User.FIELDS の順の行から作る"""
+        batch = cls()
+        for row in rows:
+            batch.append(*row)
+        return batch
+
+    def append(
+        self,
+        id: str,
+        email: str,
+        username: str,
+        password_hash: str = "",
+        is_active: bool = True,
+        roles: Iterable[str] = (),
+        created_at: Optional[Timestamp] = None,
+        updated_at: Optional[Timestamp] = None,
+        last_login: Optional[Timestamp] = None,
+        version: int = 0
+    ) -> None:
+        self.ids.append(id)
+        self.emails.append(email)
+        self.usernames.append(username)
+        self.password_hashes.append(password_hash)
+        self.is_active.append(is_active)
+        self.roles.append(_shared_roles(roles))
+        self.created_at.append(created_at if created_at is not None else datetime.now())
+        self.updated_at.append(updated_at)
+        self.last_login.append(last_login)
+        self.versions.append(version)
+
+    def append_user(self, user: User) -> None:
+        self.append(*user.raw_values())
+
+    def extend(self, other: "UserBatch") -> None:
+        for name in self.__slots__:
+            getattr(self, name).extend(getattr(other, name))
+
+    def column(self, name: str) -> List[Any]:
+        """User.FIELDS のフィールド名に対応する列"""
+        return getattr(self, self.__slots__[User.FIELDS.index(name)])
+
+    def rows(self) -> Iterator[Tuple[Any, ...]]:
+        """User.FIELDS の順の行を返す（日時は未解析の文字列のこともある）"""
+        return zip(
+            self.ids, self.emails, self.usernames, self.password_hashes, self.is_active, self.roles,
+            self.created_at, self.updated_at, self.last_login, self.versions,
+        )
+
+    def revisions(self) -> List[str]:
+        """各ユーザーの User.revision() を日時を解析せずに返す"""
+        return [
+            make_revision(version, updated_at, created_at)
+            for version, updated_at, created_at in zip(self.versions, self.updated_at, self.created_at)
+        ]
+
+    def __len__(self) -> int:
+        return len(self.ids)
+
+    @overload
+    def __getitem__(self, index: int) -> User: ...
+
+    @overload
+    def __getitem__(self, index: slice) -> "UserBatch": ...
+
+    def __getitem__(self, index: Union[int, slice]) -> Union[User, "UserBatch"]:
+        if isinstance(index, slice):
+            batch = UserBatch()
+            for name in self.__slots__:
+                setattr(batch, name, getattr(self, name)[index])
+            return batch
+        return User(
+            id=self.ids[index],
+            email=self.emails[index],
+            username=self.usernames[index],
+            password_hash=self.password_hashes[index],
+            is_active=self.is_active[index],
+            roles=list(self.roles[index]),
+            created_at=self.created_at[index],
+            updated_at=self.updated_at[index],
+            last_login=self.last_login[index],
+            version=self.versions[index]
+        )
+
+    def __iter__(self) -> Iterator[User]:
+        for id, email, username, password_hash, is_active, roles, created_at, updated_at, last_login, version in self.rows():
+            yield User(
+                id, email, username, password_hash, is_active, list(roles), created_at, updated_at, last_login, version
+            )
+
+    def __repr__(self) -> str:
+        return f"UserBatch(len={len(self)})"
@@ -1,17 +1,191 @@
-from dataclasses import dataclass, field
 from datetime import datetime
-from typing import Optional, List
+from typing import Any, Dict, Iterable, List, Optional, Tuple, Union
+
+# 日時フィールドには datetime のほか、未解析のISO 8601文字列を保持できる
+Timestamp = Union[datetime, str]
+
+
+def to_isoformat(value: Optional[Timestamp]) -> Optional[str]:
+    return value.isoformat() if isinstance(value, datetime) else value
+
+
+def make_revision(version: int, updated_at: Optional[Timestamp], created_at: Timestamp) -> str:
+    """User.revision() と同じ形式の版（version と、updated_at または一度も更新されていなければ created_at）"""
+    return f"{version}:{to_isoformat(updated_at) or to_isoformat(created_at)}"
+
+
+def revision_version(revision: str) -> int:
+    """make_revision の版から version を取り出す"""
+    return int(revision.partition(":")[0])
+
+
+def _tracked(name: str) -> property:
+    # 代入されたフィールドを変更として記録するプロパティ（値はスロット "_<name>" に持つ）
+    slot = "_" + name
+
+    def get(self: "User") -> Any:
+        return getattr(self, slot)
+
+    def set(self: "User", value: Any) -> None:
+        setattr(self, slot, value)
+        self._mark(name)
+
+    return property(get, set)
+
 
-@dataclass
 class User:
-    id: str
-    email: str
-    username: str
-    password_hash: str
-    is_active: bool = True
-    roles: List[str] = field(default_factory=list)
-    created_at: datetime = datetime.now()
-    updated_at: Optional[datetime] = None
+    """
+    ユーザーエンティティ
+
+    - __slots__ によりインスタンスごとの __dict__ を持たない（大量のユーザーを保持する一覧・キャッシュ向け）
+    - created_at / updated_at / last_login にはISO 8601文字列も渡せ、最初に参照されたときに datetime へ変換する
+      （リポジトリから読んだ行のうち、日時を使わないものは解析しない）
+    - created_at を省略した場合は生成時刻になる
+    - 生成後に代入された email / username / password_hash / is_active / roles / last_login を変更として記録し、
+      リポジトリは変更されたフィールドだけを書き込む（roles をその場で変更する場合は add_role / remove_role を使う）
+    - version はリポジトリが書き込みのたびに1ずつ増やす版番号で、更新時の競合検出に使う
+    """
+
+    __slots__ = (
+        "id", "_email", "_username", "_password_hash", "_is_active", "_roles",
+        "_created_at", "_updated_at", "_last_login", "version", "_changes",
+    )
+
+    # フィールド名（出力・比較・スナップショットの列順）
+    FIELDS: Tuple[str, ...] = (
+        "id", "email", "username", "password_hash", "is_active", "roles",
+        "created_at", "updated_at", "last_login", "version",
+    )
+
+    # 変更を記録するフィールド
+    TRACKED_FIELDS: Tuple[str, ...] = (
+        "email", "username", "password_hash", "is_active", "roles", "last_login",
+    )
+
+    def __init__(
+        self,
+        id: str,
+        email: str,
+        username: str,
+        password_hash: str = "",
+        is_active: bool = True,
+        roles: Optional[List[str]] = None,
+        created_at: Optional[Timestamp] = None,
+        updated_at: Optional[Timestamp] = None,
+        last_login: Optional[Timestamp] = None,
+        version: int = 0
+    ):
+        self.id = id
+        self._email = email
+        self._username = username
+        self._password_hash = password_hash
+        self._is_active = is_active
+        self._roles = roles if roles is not None else []
+        self._created_at = created_at if created_at is not None else datetime.now()
+        self._updated_at = updated_at
+        self._last_login = last_login
+        self.version = version
+        self._changes: Optional[set] = None
+
+    email = _tracked("email")
+    username = _tracked("username")
+    password_hash = _tracked("password_hash")
+    is_active = _tracked("is_active")
+    roles = _tracked("roles")
+
+    @property
+    def created_at(self) -> datetime:
+        if isinstance(self._created_at, str):
+            self._created_at = datetime.fromisoformat(self._created_at)
+        return self._created_at
+
+    @created_at.setter
+    def created_at(self, value: Timestamp) -> None:
+        self._created_at = value
+
+    @property
+    def updated_at(self) -> Optional[datetime]:
+        if isinstance(self._updated_at, str):
+            self._updated_at = datetime.fromisoformat(self._updated_at)
+        return self._updated_at
+
+    @updated_at.setter
+    def updated_at(self, value: Optional[Timestamp]) -> None:
+        self._updated_at = value
+
+    @property
+    def last_login(self) -> Optional[datetime]:
+        if isinstance(self._last_login, str):
+            self._last_login = datetime.fromisoformat(self._last_login)
+        return self._last_login
+
+    @last_login.setter
+    def last_login(self, value: Optional[Timestamp]) -> None:
+        self._last_login = value
+        self._mark("last_login")
+
+    # --- 変更の記録 ---
+
+    def _mark(self, name: str) -> None:
+        if self._changes is None:
+            self._changes = set()
+        self._changes.add(name)
+
+    def changes(self) -> Dict[str, Any]:
+        """生成後（または mark_clean 後）に変更されたフィールドと現在の値（日時は未解析の文字列のこともある）"""
+        if not self._changes:
+            return {}
+        return {name: getattr(self, "_" + name) for name in self.TRACKED_FIELDS if name in self._changes}
+
+    def mark_clean(self) -> None:
+        """変更の記録を消す（リポジトリが保存した後に呼ぶ）"""
+        self._changes = None
+
+    # --- 値の取り出し ---
+
+    def isoformat(self, name: str) -> Optional[str]:
+        """日時フィールドをISO 8601文字列で返す（未解析の文字列はそのまま返す）"""
+        return to_isoformat(getattr(self, "_" + name))
+
+    def revision(self) -> str:
+        """内容の版を表す文字列"""
+        return make_revision(self.version, self._updated_at, self._created_at)
+
+    def raw_values(self) -> Tuple[Any, ...]:
+        """FIELDS の順の値（日時は未解析の文字列のこともある）"""
+        return (
+            self.id, self._email, self._username, self._password_hash, self._is_active, self._roles,
+            self._created_at, self._updated_at, self._last_login, self.version,
+        )
+
+    def copy(self, **changes: Any) -> "User":
+        """roles も含めて複製する（changes で一部のフィールドを置き換えられる。変更の記録は引き継がない）"""
+        values = dict(zip(self.FIELDS, self.raw_values()))
+        values["roles"] = list(self._roles)
+        values.update(changes)
+        return User(**values)
+
+    def to_dict(self) -> dict:
+        return {name: getattr(self, name) for name in self.FIELDS}
+
+    def __eq__(self, other: object) -> bool:
+        if not isinstance(other, User):
+            return NotImplemented
+        return all(getattr(self, name) == getattr(other, name) for name in self.FIELDS)
+
+    __hash__ = None
+
+    def __repr__(self) -> str:
+        fields = ", ".join(f"{name}={getattr(self, name)!r}" for name in self.FIELDS)
+        return f"User({fields})"
+
+    def __getstate__(self) -> Tuple[Any, ...]:
+        return self.raw_values()
+
+    def __setstate__(self, state: Iterable[Any]) -> None:
+        (self.id, self._email, self._username, self._password_hash, self._is_active, self._roles,
+         self._created_at, self._updated_at, self._last_login, self.version) = state
+        self._changes = None
 
     # 単純な状態の更新のみを行う
     def _set_username(self, username: str) -> None:
@@ -37,12 +211,14 @@ class User:
         """ユーザーにロールを追加"""
         if role not in self.roles:
             self.roles.append(role)
+            self._mark("roles")
             self.updated_at = datetime.now()
             
     def remove_role(self, role: str) -> None:
         """ユーザーからロールを削除"""
         if role in self.roles:
             self.roles.remove(role)
+            self._mark("roles")
             self.updated_at = datetime.now()
             
     def has_role(self, role: str) -> bool:
@@ -1,17 +1,116 @@
 from abc import ABC, abstractmethod
-from typing import List, Optional
+from dataclasses import dataclass, field
+from typing import Any, AsyncIterator, Dict, List, Optional, Sequence, Tuple
 
-from app.domain.user import User
+from app.domain.user import User, UserBatch
+
+
+class UserNotFoundError(ValueError):
+    """更新対象のユーザーが存在しない"""
+
+
+class UserVersionConflictError(ValueError):
+    """保存されているユーザーの version が期待した値と異なる（他の更新と競合した）"""
+
+
+class EmailAlreadyRegisteredError(ValueError):
+    """メールアドレスが他のユーザーで使用されている"""
+
+
+# メールアドレスが使用済みの場合のエラーメッセージ（API のレスポンスや一括取り込みの結果に使う）
+EMAIL_ALREADY_REGISTERED = "Email already registered"
+
+
+def check_update_fields(changes: Dict[str, Any]) -> None:
+    """update_fields で更新できるのは User.TRACKED_FIELDS のみ（それ以外は ValueError）"""
+    unknown = set(changes) - set(User.TRACKED_FIELDS)
+    if unknown:
+        raise ValueError(f"更新できないフィールドです: {', '.join(sorted(unknown))}")
+
+
+# 版（User.revision()）の判定とページングに必要なフィールド。射影して読み込む場合も常に含める
+REVISION_FIELDS: Tuple[str, ...] = ("id", "created_at", "updated_at", "version")
+
+
+def check_fields(fields: Sequence[str], allowed: Sequence[str] = User.FIELDS) -> None:
+    """読み込むフィールドとして指定できるのは allowed（既定は User.FIELDS）のみ（それ以外は ValueError）"""
+    unknown = [name for name in fields if name not in allowed]
+    if unknown:
+        raise ValueError(f"存在しないフィールドです: {', '.join(unknown)}")
+
+
+def projection_fields(fields: Sequence[str]) -> Tuple[str, ...]:
+    """fields に REVISION_FIELDS を加えた、リポジトリが実際に読み込むフィールド"""
+    return tuple(dict.fromkeys((*REVISION_FIELDS, *fields)))
+
+
+@dataclass
+class UserPage:
+    """カーソルページングの1ページ分の結果"""
+    # List[User] または列指向の UserBatch
+    items: Sequence[User] = field(default_factory=list)
+    # 次ページ取得用の不透明なカーソル（最終ページではNone）
+    next_cursor: Optional[str] = None
+
+
+@dataclass
+class BulkCreateResult:
+    """create_users の結果"""
+    # 作成したユーザー（渡されたものと同じく List[User] または UserBatch）
+    created: Sequence[User] = field(default_factory=list)
+    # 作成しなかったユーザーのID → 理由（使用済みのメールアドレス、既存のIDなど）
+    errors: Dict[str, str] = field(default_factory=dict)
+
+    @classmethod
+    def excluding(cls, users: Sequence[User], errors: Dict[str, str]) -> "BulkCreateResult":
+        """users のうち errors にないユーザーを created とする"""
+        if not errors:
+            return cls(users, {})
+        if isinstance(users, UserBatch):
+            created = UserBatch.from_rows(row for row in users.rows() if row[0] not in errors)
+        else:
+            created = [user for user in users if user.id not in errors]
+        return cls(created, errors)
 
 class UserRepository(ABC):
     @abstractmethod
-    async def create(self, user: User) -> User:
-        """ユーザーを作成する"""
+    async def create_user(self, user: User) -> User:
+        """ユーザーを作成する（メールアドレスが使用済みなら EmailAlreadyRegisteredError、IDが既に存在すれば ValueError）"""
+        pass
+
+    @abstractmethod
+    async def create_users(self, users: Sequence[User]) -> BulkCreateResult:
+        """
+        複数ユーザーをまとめて作成する（UserBatch も渡せる）
+        create_user と同じく、使用済みのメールアドレス（同じ呼び出し内の重複を含む）・既存のIDのユーザーは作成せず、
+        その理由を BulkCreateResult.errors に返す（他のユーザーは作成する）
+        """
         pass
 
+    # 読み込み系のメソッドの fields: 指定した場合、リポジトリはそのフィールドと REVISION_FIELDS だけを読み込んでよい
+    # （それ以外のフィールドは未設定の値になるため、呼び出し側は fields のフィールドだけを参照する）
+
     @abstractmethod
-    async def get_by_id(self, user_id: str) -> Optional[User]:
-        """IDでユーザーを取得する"""
+    async def get_by_id(
+        self,
+        user_id: str,
+        fields: Optional[Sequence[str]] = None,
+        consistent: bool = False
+    ) -> Optional[User]:
+        """
+        IDでユーザーを取得する
+        consistent=True の場合はキャッシュを通さず、直前までの書き込みをすべて反映した値を読む
+        （DynamoDB では強い整合性の読み込み。条件付き更新の前の確認などに使う）
+        """
+        pass
+
+    @abstractmethod
+    async def get_many(
+        self,
+        user_ids: List[str],
+        fields: Optional[Sequence[str]] = None
+    ) -> List[Optional[User]]:
+        """複数IDのユーザーをまとめて取得する（入力順を保ち、存在しないIDはNone）"""
         pass
 
     @abstractmethod
@@ -20,12 +119,37 @@ class UserRepository(ABC):
         pass
 
     @abstractmethod
-    async def update(self, user: User) -> User:
-        """ユーザーを更新する"""
+    async def update_user(self, user: User) -> User:
+        """
+        ユーザーの変更されたフィールド（User.changes()）だけを書き込む（変更がなければ何もしない）
+        保存されている version が user.version と異なれば UserVersionConflictError、
+        ユーザーが存在しなければ UserNotFoundError。書き込み後は user の version と updated_at を更新する
+        """
         pass
 
+    async def update_fields(
+        self,
+        user_id: str,
+        changes: Dict[str, Any],
+        expected_version: Optional[int] = None
+    ) -> User:
+        """
+        指定したフィールドだけを更新し、更新後のユーザーを返す
+        expected_version を指定した場合は保存されている version と一致するときだけ書き込む
+        既定の実装は読み込んでから update_user を呼ぶ（読み込まずに条件付きで書き込めるリポジトリは上書きする）
+        """
+        check_update_fields(changes)
+        user = await self.get_by_id(user_id)
+        if user is None:
+            raise UserNotFoundError("ユーザーが存在しません")
+        if expected_version is not None and user.version != expected_version:
+            raise UserVersionConflictError("ユーザーは他の更新により変更されています")
+        for name, value in changes.items():
+            setattr(user, name, value)
+        return await self.update_user(user)
+
     @abstractmethod
-    async def delete(self, user_id: str) -> bool:
+    async def delete_user(self, user_id: str) -> bool:
         """ユーザーを削除する"""
         pass
 
@@ -33,3 +157,45 @@ class UserRepository(ABC):
     async def list_users(self) -> List[User]:
         """全ユーザーを取得する"""
         pass
+
+    @abstractmethod
+    async def list_users_page(
+        self,
+        limit: int,
+        cursor: Optional[str] = None,
+        fields: Optional[Sequence[str]] = None
+    ) -> UserPage:
+        """ユーザーを1ページ分取得する（不正なカーソルはValueError）"""
+        pass
+
+    @abstractmethod
+    def iter_users(self, page_size: int = 1000) -> AsyncIterator[User]:
+        """全ページを順に辿りながらユーザーを1件ずつ返す"""
+        pass
+
+    async def iter_user_batches(
+        self,
+        batch_size: int = 1000,
+        fields: Optional[Sequence[str]] = None
+    ) -> AsyncIterator[UserBatch]:
+        """全ユーザーを最大 batch_size 件ずつの UserBatch で返す（既定の実装は iter_users をまとめ直し、fields は使わない）"""
+        batch = UserBatch()
+        async for user in self.iter_users(page_size=batch_size):
+            batch.append_user(user)
+            if len(batch) >= batch_size:
+                yield batch
+                batch = UserBatch()
+        if batch:
+            yield batch
+
+    async def get_revision(self, user_id: str) -> Optional[str]:
+        """ユーザーの User.revision() だけを返す（存在しなければNone）。既定の実装はユーザー全体を読み込む"""
+        user = await self.get_by_id(user_id)
+        return user.revision() if user else None
+
+    async def collection_revision(self) -> Optional[str]:
+        """
+        全ユーザーの集合の版を表す文字列（いずれかのユーザーが変わるたびに変わる）
+        安価に求められないリポジトリはNoneを返す
+        """
+        return None
@@ -1,7 +1,7 @@
 from typing import Optional
 
 from app.domain.user import User
-from app.domain.user.repository import UserRepository
+from app.domain.user.repository import EmailAlreadyRegisteredError, UserRepository
 
 import uuid
 
@@ -15,19 +15,17 @@ class UserService:
         username: str, 
         password_hash: str
     ) -> User:
-        """ユーザーを作成する"""
-        # メールアドレスの重複チェック
-        existing_user = await self.user_repository.get_by_email(email)
-        if existing_user:
-            raise ValueError("このメールアドレスは既に使用されています")
-
+        """ユーザーを作成する（メールアドレスの重複はリポジトリが書き込みと同時に確認する）"""
         user = User(
             id=str(uuid.uuid4()),
             email=email,
             username=username,
             password_hash=password_hash
         )
-        return await self.user_repository.create(user)
+        try:
+            return await self.user_repository.create_user(user)
+        except EmailAlreadyRegisteredError:
+            raise ValueError("このメールアドレスは既に使用されています")
 
     async def update_user_status(
         self, 
@@ -44,4 +42,4 @@ class UserService:
         else:
             user.deactivate()
 
-        return await self.user_repository.update(user)
+        return await self.user_repository.update_user(user)
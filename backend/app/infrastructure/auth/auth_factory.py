@@ -2,6 +2,7 @@ from typing import Optional
 
 from app.infrastructure.auth.cognito_auth import CognitoAuth
 from app.infrastructure.auth.mock_auth import MockAuth
+from app.infrastructure.auth.password_hasher import PasswordHasher
 
 class AuthFactory:
     @staticmethod
@@ -10,12 +11,15 @@ class AuthFactory:
         user_pool_id: Optional[str] = None,
         client_id: Optional[str] = None,
         region: Optional[str] = None,
-        secret_key: Optional[str] = None
+        secret_key: Optional[str] = None,
+        password_hasher: Optional[PasswordHasher] = None,
+        endpoint_url: Optional[str] = None,
+        max_pool_connections: int = 10
     ):
         if auth_type == "local":
             if not secret_key:
                 raise ValueError("Secret key is required for local authentication")
-            return MockAuth(secret_key=secret_key)
+            return MockAuth(secret_key=secret_key, password_hasher=password_hasher)
         
         elif auth_type in ["dev", "trial", "prod"]:
             if not all([user_pool_id, client_id, region, secret_key]):
@@ -24,7 +28,9 @@ class AuthFactory:
                 user_pool_id=user_pool_id,
                 client_id=client_id,
                 region=region,
-                secret_key=secret_key
+                secret_key=secret_key,
+                endpoint_url=endpoint_url,
+                max_pool_connections=max_pool_connections
             )
         
         raise ValueError(f"Invalid auth type: {auth_type}") 
\ No newline at end of file
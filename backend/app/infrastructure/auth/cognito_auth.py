@@ -1,29 +1,77 @@
+import asyncio
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime, timedelta
-from typing import Optional
+from functools import partial
+from typing import Any, Optional
 
 import boto3
-from botocore.exceptions import ClientError
+from botocore.config import Config
+from botocore.exceptions import BotoCoreError, ClientError
 from jose import JWTError, jwt
 
 from app.domain.user import User
+from app.infrastructure.auth.jwks import JwksCache, JwksFetcher, cognito_jwks_url, http_jwks_fetcher
 
 class CognitoAuth:
+    """
+    Cognitoユーザープールによる認証
+
+    - ログイン（initiate_auth）はブロッキングなboto3の呼び出しのため、専用のスレッドプールで実行してイベントループを塞がない
+      （boto3のクライアントはスレッドセーフなため1つを使い回し、接続プールの大きさとスレッド数を揃える）
+    - ユーザー情報は initiate_auth が返すIDトークンのクレームから取り出し、get_user の呼び出しを行わない
+      （IDトークンに email が含まれない設定のアプリクライアントの場合だけ get_user で補う）
+    - endpoint_url（または client）を指定すると、moto などのローカルのCognito互換サーバーに対して動かせる
+    """
+
     def __init__(
         self,
         user_pool_id: str,
         client_id: str,
         region: str,
-        secret_key: str
+        secret_key: str,
+        jwks_fetcher: Optional[JwksFetcher] = None,
+        jwks_ttl: float = 3600.0,
+        endpoint_url: Optional[str] = None,
+        max_pool_connections: int = 10,
+        client: Any = None
     ):
         self.user_pool_id = user_pool_id
         self.client_id = client_id
         self.region = region
         self.secret_key = secret_key
-        self.cognito = boto3.client('cognito-idp', region_name=region)
+        self.cognito = client or boto3.client(
+            'cognito-idp',
+            region_name=region,
+            endpoint_url=endpoint_url,
+            config=Config(
+                max_pool_connections=max_pool_connections,
+                connect_timeout=2.0,
+                read_timeout=5.0,
+                retries={'max_attempts': 3, 'mode': 'standard'}
+            )
+        )
+        self._executor = ThreadPoolExecutor(max_workers=max_pool_connections, thread_name_prefix="cognito")
+        self.issuer = f"https://cognito-idp.{region}.amazonaws.com/{user_pool_id}"
+        # Cognitoが発行したRS256トークンはユーザープールのJWKSでローカルに検証する
+        self.jwks = JwksCache(
+            fetcher=jwks_fetcher or http_jwks_fetcher(cognito_jwks_url(region, user_pool_id)),
+            ttl=jwks_ttl
+        )
+
+    async def warm_up(self) -> None:
+        """起動時にJWKSを取得しておき、最初のリクエストで取得を待たないようにする"""
+        await self.jwks.refresh()
+
+    def close(self) -> None:
+        self._executor.shutdown(wait=False, cancel_futures=True)
+
+    async def _call(self, method, **params) -> dict:
+        return await asyncio.get_running_loop().run_in_executor(self._executor, partial(method, **params))
 
     async def authenticate_user(self, username: str, password: str) -> Optional[User]:
         try:
-            response = self.cognito.initiate_auth(
+            response = await self._call(
+                self.cognito.initiate_auth,
                 ClientId=self.client_id,
                 AuthFlow='USER_PASSWORD_AUTH',
                 AuthParameters={
@@ -31,23 +79,55 @@ class CognitoAuth:
                     'PASSWORD': password
                 }
             )
+        except (BotoCoreError, ClientError) as e:
+            print(f"Authentication error: {e}")
+            return None
 
-            if response['AuthenticationResult']:
-                tokens = response['AuthenticationResult']
-                user_info = await self._get_user_info(tokens['AccessToken'])
-                
-                return User(
-                    id=user_info['sub'],
-                    email=user_info['email'],
-                    username=user_info['username'],
-                    last_login=datetime.now()
-                )
+        # チャレンジ（NEW_PASSWORD_REQUIRED など）が返された場合はトークンが無い
+        tokens = response.get('AuthenticationResult')
+        if not tokens or 'IdToken' not in tokens:
+            return None
+        claims = self._id_token_claims(tokens['IdToken'])
+        if claims is None:
             return None
-        except ClientError as e:
+        email = claims.get('email')
+        if email is None:
+            # アプリクライアントに email の読み取り権限が無いとIDトークンに含まれないため、その場合だけ問い合わせる
+            email = await self._get_email(tokens['AccessToken'])
+
+        return User(
+            id=claims['sub'],
+            email=email or '',
+            username=claims.get('preferred_username') or claims.get('cognito:username') or username,
+            roles=list(claims.get('cognito:groups', [])),
+            last_login=datetime.now()
+        )
+
+    def _id_token_claims(self, id_token: str) -> Optional[dict]:
+        """
+        initiate_auth の応答に含まれるIDトークンのクレーム
+
+        Cognitoから直接（TLS上で）受け取ったトークンのため署名は検証せず、このクライアント向けのIDトークンであることだけを確認する
+        """
+        try:
+            claims = jwt.get_unverified_claims(id_token)
+        except JWTError as e:
             print(f"Authentication error: {e}")
             return None
+        if claims.get('token_use') != 'id' or claims.get('aud') != self.client_id or not claims.get('sub'):
+            return None
+        return claims
 
     async def verify_token(self, token: str) -> Optional[dict]:
+        try:
+            header = jwt.get_unverified_header(token)
+        except JWTError:
+            return None
+
+        if header.get('alg') == 'RS256':
+            return await self._verify_cognito_token(token, header.get('kid'))
+
+        # create_token で発行したアプリケーショントークン
         try:
             payload = jwt.decode(
                 token,
@@ -58,17 +138,46 @@ class CognitoAuth:
         except JWTError:
             return None
 
-    async def _get_user_info(self, access_token: str) -> dict:
-        response = self.cognito.get_user(AccessToken=access_token)
-        user_attributes = {
-            attr['Name']: attr['Value']
-            for attr in response['UserAttributes']
-        }
-        return {
-            'sub': user_attributes.get('sub'),
-            'email': user_attributes.get('email'),
-            'username': user_attributes.get('username')
-        }
+    async def _verify_cognito_token(self, token: str, kid: Optional[str]) -> Optional[dict]:
+        key = await self.jwks.get_key(kid)
+        if key is None:
+            return None
+        try:
+            payload = jwt.decode(
+                token,
+                key,
+                algorithms=['RS256'],
+                issuer=self.issuer,
+                options={'verify_aud': False, 'verify_at_hash': False}
+            )
+        except JWTError:
+            return None
+
+        # IDトークンは aud、アクセストークンは client_id でクライアントを確認する
+        token_use = payload.get('token_use')
+        if token_use == 'id':
+            if payload.get('aud') != self.client_id:
+                return None
+        elif token_use == 'access':
+            if payload.get('client_id') != self.client_id:
+                return None
+        else:
+            return None
+
+        payload.setdefault('username', payload.get('cognito:username') or payload.get('username'))
+        payload.setdefault('roles', payload.get('cognito:groups', []))
+        return payload
+
+    async def _get_email(self, access_token: str) -> Optional[str]:
+        try:
+            response = await self._call(self.cognito.get_user, AccessToken=access_token)
+        except (BotoCoreError, ClientError) as e:
+            print(f"Error getting Cognito user: {e}")
+            return None
+        for attr in response['UserAttributes']:
+            if attr['Name'] == 'email':
+                return attr['Value']
+        return None
 
     def create_token(self, user: User) -> str:
         expires_delta = timedelta(minutes=30)
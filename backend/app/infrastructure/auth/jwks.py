@@ -0,0 +1,108 @@
+import asyncio
+import json
+import time
+import urllib.request
+from typing import Awaitable, Callable, Dict, Optional
+
+from jose import jwk
+from jose.backends.base import Key
+
+# JWKS（{"keys": [...]}）を取得する関数。テストではローカルの鍵セットを返す関数を渡せる
+JwksFetcher = Callable[[], Awaitable[dict]]
+
+
+def cognito_jwks_url(region: str, user_pool_id: str) -> str:
+    return f"https://cognito-idp.{region}.amazonaws.com/{user_pool_id}/.well-known/jwks.json"
+
+
+def http_jwks_fetcher(url: str, timeout: float = 5.0) -> JwksFetcher:
+    """URLからJWKSを取得するフェッチャー（ブロッキングI/Oはスレッドで実行する）"""
+
+    def fetch() -> dict:
+        with urllib.request.urlopen(url, timeout=timeout) as response:
+            return json.loads(response.read())
+
+    async def fetcher() -> dict:
+        return await asyncio.to_thread(fetch)
+
+    return fetcher
+
+
+class JwksCache:
+    """
+    JWKSをメモリ上に保持し、kidから検証用の公開鍵を返す
+
+    - 取得から ttl 秒を過ぎた鍵セットは古いものを返しつつバックグラウンドで更新する
+    - 未知の kid を受け取った場合は鍵のローテーションとみなして再取得する
+      （前回の取得から min_refresh_interval 秒以内の再取得は行わず、不正なkidによる連続取得を防ぐ）
+    - 取得に失敗した場合も、min_refresh_interval 秒の間は再取得しない（初回の取得の失敗を含む）
+    - 同時に複数の取得が必要になっても、実際の取得は1回だけ行う（single-flight）
+    """
+
+    def __init__(
+        self,
+        fetcher: JwksFetcher,
+        ttl: float = 3600.0,
+        min_refresh_interval: float = 30.0,
+        algorithm: str = "RS256",
+        clock: Callable[[], float] = time.monotonic
+    ):
+        self.fetcher = fetcher
+        self.ttl = ttl
+        self.min_refresh_interval = min_refresh_interval
+        self.algorithm = algorithm
+        self.clock = clock
+        self._keys: Dict[str, Key] = {}
+        # 最後に取得に成功した時刻と、成否にかかわらず最後に取得を終えた時刻
+        self._fetched_at: Optional[float] = None
+        self._attempted_at: Optional[float] = None
+        self._refresh_task: Optional[asyncio.Task] = None
+        self.refresh_count = 0
+        self.refresh_errors = 0
+
+    def _is_stale(self) -> bool:
+        return self._fetched_at is None or self.clock() - self._fetched_at >= self.ttl
+
+    def _can_refresh(self) -> bool:
+        return self._attempted_at is None or self.clock() - self._attempted_at >= self.min_refresh_interval
+
+    async def _fetch(self) -> None:
+        try:
+            jwks = await self.fetcher()
+            keys = {
+                key_data["kid"]: jwk.construct(key_data, algorithm=self.algorithm)
+                for key_data in jwks.get("keys", [])
+                if key_data.get("kid") and key_data.get("kty") == "RSA"
+            }
+        except Exception as e:
+            self._attempted_at = self.clock()
+            self.refresh_errors += 1
+            print(f"Error fetching JWKS: {e}")
+            return
+        self._keys = keys
+        self._fetched_at = self._attempted_at = self.clock()
+        self.refresh_count += 1
+
+    def refresh(self) -> "asyncio.Task":
+        """鍵セットを再取得する。取得中であれば実行中のタスクを返す"""
+        if self._refresh_task is None or self._refresh_task.done():
+            self._refresh_task = asyncio.create_task(self._fetch())
+        return self._refresh_task
+
+    async def get_key(self, kid: Optional[str]) -> Optional[Key]:
+        if not kid:
+            return None
+
+        if not self._keys:
+            # 初回はリクエスト経路で取得を待つしかない（失敗した直後は待たずに検証できないものとする）
+            if self._can_refresh():
+                await asyncio.shield(self.refresh())
+        elif self._is_stale() and self._can_refresh():
+            # 期限切れでも手元の鍵で検証を続け、更新はバックグラウンドで行う
+            self.refresh()
+
+        key = self._keys.get(kid)
+        if key is None and self._can_refresh():
+            await asyncio.shield(self.refresh())
+            key = self._keys.get(kid)
+        return key
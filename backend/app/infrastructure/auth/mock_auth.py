@@ -3,25 +3,38 @@ from typing import Optional
 
 from jose import jwt
 
-from app.domain.user import User
+from app.domain.user import User, UserRepository
+from app.infrastructure.auth.password_hasher import PasswordHasher
 
 class MockAuth:
-    def __init__(self, secret_key: str):
+    def __init__(self, secret_key: str, password_hasher: Optional[PasswordHasher] = None):
         self.secret_key = secret_key
-        # モックユーザーデータ
+        self.password_hasher = password_hasher or PasswordHasher()
+        # モックユーザー以外はこのリポジトリのパスワードハッシュで照合する（起動時に設定される）
+        self.user_repository: Optional[UserRepository] = None
+        # モックユーザーデータ（パスワードは password123。低いコストのハッシュのため最初のログインで作り直される）
         self.mock_users = {
             "test@example.com": {
-                "password": "password123",
+                "password_hash": "$scrypt$ln=10,r=8,p=1$ehmHwq3OYYnhed9TAeY2lA$wrzw4U8N8lI8tD/SiYplkqMAubK+P6QZ0WABOhyFpBY",
                 "id": "mock-user-1",
                 "username": "testuser"
             }
         }
 
+    async def warm_up(self) -> None:
+        await self.password_hasher.warm_up()
+
     async def authenticate_user(self, username: str, password: str) -> Optional[User]:
         # メールアドレスでユーザーを検索
         user_data = self.mock_users.get(username)
-        if not user_data or user_data["password"] != password:
+        if user_data is None:
+            return await self._authenticate_registered_user(username, password)
+
+        valid, new_hash = await self.password_hasher.verify_and_update(password, user_data["password_hash"])
+        if not valid:
             return None
+        if new_hash:
+            user_data["password_hash"] = new_hash
 
         return User(
             id=user_data["id"],
@@ -30,6 +43,28 @@ class MockAuth:
             last_login=datetime.now()
         )
 
+    async def _authenticate_registered_user(self, email: str, password: str) -> Optional[User]:
+        user = None
+        if self.user_repository is not None:
+            user = await self.user_repository.get_by_email(email)
+        if user is None or not user.is_active:
+            # 登録の有無・無効化されているかが応答時間に表れないよう、ダミーのハッシュと照合してから拒否する
+            await self.password_hasher.verify_dummy(password)
+            return None
+
+        valid, new_hash = await self.password_hasher.verify_and_update(password, user.password_hash)
+        if not valid:
+            return None
+        if new_hash:
+            # コストの古いハッシュを現在の設定で保存し直す（競合した場合は次回のログインで作り直す）
+            try:
+                user = await self.user_repository.update_fields(
+                    user.id, {"password_hash": new_hash}, expected_version=user.version
+                )
+            except ValueError as e:
+                print(f"Error rehashing password: {e}")
+        return user
+
     async def verify_token(self, token: str) -> Optional[dict]:
         try:
             payload = jwt.decode(
@@ -0,0 +1,152 @@
+import asyncio
+import base64
+import hashlib
+import hmac
+import multiprocessing
+import os
+from concurrent.futures import ProcessPoolExecutor
+from typing import Dict, Optional, Tuple
+
+# ハッシュ文字列の形式（PHC 文字列形式）: $scrypt$ln=<log2(N)>,r=<r>,p=<p>$<salt>$<hash>
+_SCHEME = "scrypt"
+_SALT_BYTES = 16
+_HASH_BYTES = 32
+
+
+def _b64encode(value: bytes) -> str:
+    return base64.b64encode(value).decode("ascii").rstrip("=")
+
+
+def _b64decode(value: str) -> bytes:
+    return base64.b64decode(value + "=" * (-len(value) % 4))
+
+
+def _scrypt(password: str, salt: bytes, ln: int, r: int, p: int, dklen: int) -> bytes:
+    n = 1 << ln
+    # OpenSSL の既定のメモリ上限（32MiB）では N=2^15, r=8 でも足りないため、必要量の2倍を許可する
+    return hashlib.scrypt(
+        password.encode("utf-8"), salt=salt, n=n, r=r, p=p, maxmem=256 * n * r * p, dklen=dklen
+    )
+
+
+def _parse(encoded: str) -> Optional[Tuple[int, int, int, bytes, bytes]]:
+    # (ln, r, p, salt, hash)。形式が異なれば None
+    parts = encoded.split("$")
+    if len(parts) != 5 or parts[0] or parts[1] != _SCHEME:
+        return None
+    try:
+        params = dict(item.split("=", 1) for item in parts[2].split(","))
+        return int(params["ln"]), int(params["r"]), int(params["p"]), _b64decode(parts[3]), _b64decode(parts[4])
+    except (KeyError, ValueError):
+        return None
+
+
+# --- ワーカープロセスで実行する関数（ProcessPoolExecutor に渡すためモジュールの最上位に置く） ---
+
+def hash_password(password: str, ln: int, r: int, p: int) -> str:
+    salt = os.urandom(_SALT_BYTES)
+    digest = _scrypt(password, salt, ln, r, p, _HASH_BYTES)
+    return f"${_SCHEME}$ln={ln},r={r},p={p}${_b64encode(salt)}${_b64encode(digest)}"
+
+
+def verify_password(password: str, encoded: str) -> bool:
+    parsed = _parse(encoded)
+    if parsed is None:
+        return False
+    ln, r, p, salt, expected = parsed
+    return hmac.compare_digest(_scrypt(password, salt, ln, r, p, len(expected)), expected)
+
+
+def _ping() -> None:
+    pass
+
+
+class PasswordHasher:
+    """
+    パスワードのハッシュ化と照合（scrypt）を、イベントループを塞がないようプロセスプールで行うサービス
+
+    - 1回のハッシュ化・照合には数十〜数百ミリ秒のCPUを使うため、max_workers 個のワーカープロセスで実行する
+      （同時に実行するのは max_workers 件までで、残りはプールの待ち行列で待つ）
+    - コストは ln（N = 2^ln）・r・p で指定し、ハッシュ文字列に含めて保存する
+    - 保存済みのハッシュのコストが現在の設定と異なる場合、verify_and_update は照合に成功したときに
+      現在の設定で作り直したハッシュを返す（ログイン時に古いハッシュを更新するため）
+    - ワーカーは spawn で起動する（スレッドを持つ親プロセスを fork しない）。最初に使ったときに起動し、close で停止する
+      （spawn は起動スクリプトを読み込み直すため、直接実行するスクリプトは if __name__ == "__main__" で保護する）
+    - 照合できない場合（ユーザーがいない・形式の異なるハッシュなど）も、verify_dummy で現在のコストのダミーのハッシュと
+      照合して同じ時間をかける（応答時間の差から登録済みのメールアドレスを推測させない）
+    """
+
+    def __init__(self, ln: int = 15, r: int = 8, p: int = 1, max_workers: Optional[int] = None):
+        self.ln = ln
+        self.r = r
+        self.p = p
+        self.max_workers = max_workers or os.cpu_count() or 1
+        self._pool: Optional[ProcessPoolExecutor] = None
+        self._dummy_hash: Optional[str] = None
+        self.hashed = 0
+        self.verified = 0
+        self.rehashed = 0
+
+    def _executor(self) -> ProcessPoolExecutor:
+        if self._pool is None:
+            self._pool = ProcessPoolExecutor(
+                max_workers=self.max_workers, mp_context=multiprocessing.get_context("spawn")
+            )
+        return self._pool
+
+    async def _run(self, function, *args):
+        return await asyncio.get_running_loop().run_in_executor(self._executor(), function, *args)
+
+    async def warm_up(self) -> None:
+        """ワーカープロセスを起動しておく（最初のログインで起動時間を待たせない）"""
+        await asyncio.gather(*(self._run(_ping) for _ in range(self.max_workers)))
+        await self._ensure_dummy_hash()
+
+    async def _ensure_dummy_hash(self) -> str:
+        if self._dummy_hash is None:
+            self._dummy_hash = await self._run(hash_password, os.urandom(_SALT_BYTES).hex(), self.ln, self.r, self.p)
+        return self._dummy_hash
+
+    async def hash(self, password: str) -> str:
+        self.hashed += 1
+        return await self._run(hash_password, password, self.ln, self.r, self.p)
+
+    async def verify(self, password: str, encoded: str) -> bool:
+        """形式の異なるハッシュ（空文字を含む）とは常に一致しない（その場合もダミーのハッシュと照合する）"""
+        if _parse(encoded) is None:
+            return await self.verify_dummy(password)
+        self.verified += 1
+        return await self._run(verify_password, password, encoded)
+
+    async def verify_dummy(self, password: str) -> bool:
+        """照合する相手がいないときに、照合1回分の時間をかけて常に False を返す"""
+        encoded = await self._ensure_dummy_hash()
+        self.verified += 1
+        await self._run(verify_password, password, encoded)
+        return False
+
+    def needs_rehash(self, encoded: str) -> bool:
+        parsed = _parse(encoded)
+        return parsed is None or parsed[:3] != (self.ln, self.r, self.p)
+
+    async def verify_and_update(self, password: str, encoded: str) -> Tuple[bool, Optional[str]]:
+        """照合結果と、コストが古ければ現在の設定で作り直したハッシュ（更新不要ならNone）を返す"""
+        if not await self.verify(password, encoded):
+            return False, None
+        if not self.needs_rehash(encoded):
+            return True, None
+        self.rehashed += 1
+        return True, await self.hash(password)
+
+    def close(self) -> None:
+        if self._pool is not None:
+            self._pool.shutdown(wait=False, cancel_futures=True)
+            self._pool = None
+
+    def stats(self) -> Dict[str, int]:
+        return {
+            "workers": self.max_workers,
+            "hashed": self.hashed,
+            "verified": self.verified,
+            "rehashed": self.rehashed,
+        }
@@ -0,0 +1,39 @@
+import hashlib
+import time
+from typing import Dict, Optional
+
+from app.infrastructure.cache import MISSING, TTLCache
+
+
+class VerifiedTokenCache:
+    """
+    検証済みトークンのペイロードを保持するキャッシュ
+    - キーはトークン本体ではなくSHA-256ダイジェスト（メモリ上に生のトークンを残さない）
+    - 各エントリはトークンの exp で失効し、max_ttl より長くは保持しない
+    - 件数上限を超えた場合は最も古く使われたものから追い出す
+    """
+
+    def __init__(self, max_size: int = 10000, max_ttl: float = 300.0):
+        self.max_ttl = max_ttl
+        self._cache = TTLCache(max_size=max_size, default_ttl=max_ttl)
+
+    @staticmethod
+    def _digest(token: str) -> bytes:
+        return hashlib.sha256(token.encode("utf-8")).digest()
+
+    def get(self, token: str) -> Optional[dict]:
+        payload = self._cache.get(self._digest(token))
+        return None if payload is MISSING else payload
+
+    def put(self, token: str, payload: dict) -> None:
+        exp = payload.get("exp")
+        if not isinstance(exp, (int, float)):
+            # 有効期限のないトークンはキャッシュしない
+            return
+        ttl = min(exp - time.time(), self.max_ttl)
+        if ttl <= 0:
+            return
+        self._cache.set(self._digest(token), payload, ttl=ttl)
+
+    def stats(self) -> Dict[str, int]:
+        return self._cache.stats()
@@ -0,0 +1,3 @@
+from app.infrastructure.cache.ttl_cache import MISSING, TTLCache
+
+__all__ = ["MISSING", "TTLCache"]
@@ -0,0 +1,88 @@
+import time
+from collections import OrderedDict
+from typing import Any, Callable, Dict, Hashable, Optional, Tuple
+
+# キャッシュに存在しないことを表す番兵（Noneを値としてキャッシュできるようにする）
+MISSING: Any = object()
+
+
+class TTLCache:
+    """
+    件数上限付きのLRU + TTLキャッシュ
+    - 上限を超えた場合は最も古く使われたエントリから追い出す
+    - エントリごとに有効期限を持ち、期限切れは参照時に取り除く
+    - asyncioの単一スレッド上で使うことを前提とし、ロックは持たない
+    """
+
+    def __init__(
+        self,
+        max_size: int,
+        default_ttl: float,
+        clock: Callable[[], float] = time.monotonic,
+        on_evict: Optional[Callable[[Hashable, Any], None]] = None
+    ):
+        if max_size < 1:
+            raise ValueError("max_size must be >= 1")
+        self.max_size = max_size
+        self.default_ttl = default_ttl
+        self.clock = clock
+        self.on_evict = on_evict
+        self._entries: "OrderedDict[Hashable, Tuple[float, Any]]" = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def get(self, key: Hashable, default: Any = MISSING) -> Any:
+        entry = self._entries.get(key)
+        if entry is None:
+            self.misses += 1
+            return default
+
+        expires_at, value = entry
+        if expires_at <= self.clock():
+            self._remove(key)
+            self.expirations += 1
+            self.misses += 1
+            return default
+
+        self._entries.move_to_end(key)
+        self.hits += 1
+        return value
+
+    def set(self, key: Hashable, value: Any, ttl: Optional[float] = None) -> None:
+        expires_at = self.clock() + (self.default_ttl if ttl is None else ttl)
+        self._entries[key] = (expires_at, value)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_size:
+            oldest_key, (_, oldest_value) = self._entries.popitem(last=False)
+            self.evictions += 1
+            if self.on_evict:
+                self.on_evict(oldest_key, oldest_value)
+
+    def pop(self, key: Hashable, default: Any = MISSING) -> Any:
+        entry = self._entries.pop(key, None)
+        if entry is None:
+            return default
+        return entry[1]
+
+    def clear(self) -> None:
+        self._entries.clear()
+
+    def _remove(self, key: Hashable) -> None:
+        entry = self._entries.pop(key, None)
+        if entry is not None and self.on_evict:
+            self.on_evict(key, entry[1])
+
+    def stats(self) -> Dict[str, int]:
+        return {
+            "size": len(self._entries),
+            "max_size": self.max_size,
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+            "expirations": self.expirations,
+        }
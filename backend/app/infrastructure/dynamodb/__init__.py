@@ -0,0 +1,21 @@
+from app.infrastructure.dynamodb.accounting import (
+    CapacityTrackingClient,
+    RequestUsage,
+    begin_request_usage,
+    current_request_usage,
+    end_request_usage,
+)
+from app.infrastructure.dynamodb.client import DynamoDBClientManager
+from app.infrastructure.dynamodb.parallel_scan import parallel_scan
+from app.infrastructure.dynamodb.retry import UnprocessedItemsError
+
+__all__ = [
+    "CapacityTrackingClient",
+    "DynamoDBClientManager",
+    "RequestUsage",
+    "UnprocessedItemsError",
+    "begin_request_usage",
+    "current_request_usage",
+    "end_request_usage",
+    "parallel_scan",
+]
@@ -0,0 +1,160 @@
+import time
+from contextvars import ContextVar, Token
+from dataclasses import dataclass
+from typing import Any, Dict, List, Optional, Tuple, Union
+
+# 読み取り系・書き込み系の操作（CapacityUnits を RCU / WCU のどちらとして数えるか）
+READ_OPERATIONS = frozenset({
+    "get_item", "batch_get_item", "query", "scan", "transact_get_items",
+})
+WRITE_OPERATIONS = frozenset({
+    "put_item", "update_item", "delete_item", "batch_write_item", "transact_write_items",
+})
+
+_current_usage: ContextVar[Optional["RequestUsage"]] = ContextVar("dynamodb_request_usage", default=None)
+
+
+@dataclass
+class OperationUsage:
+    """1リクエスト内の操作ごとの集計"""
+    calls: int = 0
+    errors: int = 0
+    latency_ms: float = 0.0
+    read_units: float = 0.0
+    write_units: float = 0.0
+
+
+class RequestUsage:
+    """
+    1つのHTTPリクエストの処理中に行われたDynamoDB呼び出しの集計
+
+    LoggingMiddleware がリクエストごとに生成してコンテキスト変数に設定し、
+    CapacityTrackingClient が呼び出しのたびに加算します。
+    並列Scanのように内部でタスクを作る処理も、作成時のコンテキストを引き継ぐため同じ集計に加算されます。
+    """
+
+    def __init__(self, request_id: Optional[str] = None):
+        self.request_id = request_id
+        self.operations: Dict[str, OperationUsage] = {}
+
+    def record(
+        self,
+        operation: str,
+        latency: float,
+        consumed: Union[dict, List[dict], None] = None,
+        error: bool = False
+    ) -> None:
+        usage = self.operations.get(operation)
+        if usage is None:
+            usage = self.operations[operation] = OperationUsage()
+        usage.calls += 1
+        usage.latency_ms += latency * 1000
+        if error:
+            usage.errors += 1
+        # BatchGetItem / BatchWriteItem などはテーブルごとのリストで返る
+        entries = consumed if isinstance(consumed, list) else [consumed] if consumed else []
+        for entry in entries:
+            read_units, write_units = _capacity_units(operation, entry)
+            usage.read_units += read_units
+            usage.write_units += write_units
+
+    @property
+    def calls(self) -> int:
+        return sum(usage.calls for usage in self.operations.values())
+
+    @property
+    def read_units(self) -> float:
+        return sum(usage.read_units for usage in self.operations.values())
+
+    @property
+    def write_units(self) -> float:
+        return sum(usage.write_units for usage in self.operations.values())
+
+    @property
+    def latency_ms(self) -> float:
+        return sum(usage.latency_ms for usage in self.operations.values())
+
+    def to_log(self) -> Dict[str, Any]:
+        """レスポンスログに載せる形式"""
+        return {
+            "calls": self.calls,
+            "latency_ms": round(self.latency_ms, 2),
+            "rcu": round(self.read_units, 2),
+            "wcu": round(self.write_units, 2),
+            "operations": {
+                operation: {
+                    "calls": usage.calls,
+                    "errors": usage.errors,
+                    "latency_ms": round(usage.latency_ms, 2),
+                    "rcu": round(usage.read_units, 2),
+                    "wcu": round(usage.write_units, 2),
+                }
+                for operation, usage in self.operations.items()
+            },
+        }
+
+
+def _capacity_units(operation: str, consumed: dict) -> Tuple[float, float]:
+    read_units = consumed.get("ReadCapacityUnits")
+    write_units = consumed.get("WriteCapacityUnits")
+    if read_units is not None or write_units is not None:
+        return float(read_units or 0.0), float(write_units or 0.0)
+    # ReturnConsumedCapacity=TOTAL では CapacityUnits のみが返るため、操作の種類で振り分ける
+    units = float(consumed.get("CapacityUnits") or 0.0)
+    if operation in WRITE_OPERATIONS:
+        return 0.0, units
+    return units, 0.0
+
+
+def begin_request_usage(request_id: Optional[str] = None) -> Tuple[RequestUsage, Token]:
+    """現在のコンテキストに新しい集計を設定する（終了時は end_request_usage にトークンを渡す）"""
+    usage = RequestUsage(request_id)
+    return usage, _current_usage.set(usage)
+
+
+def end_request_usage(token: Token) -> None:
+    _current_usage.reset(token)
+
+
+def current_request_usage() -> Optional[RequestUsage]:
+    return _current_usage.get()
+
+
+class CapacityTrackingClient:
+    """
+    DynamoDBクライアントのラッパー
+
+    読み書きの各操作に ReturnConsumedCapacity を付けて呼び出し、
+    呼び出し回数・レイテンシ・消費キャパシティを実行中のリクエストの集計（RequestUsage）へ加算します。
+    リクエスト外（起動時の処理など）の呼び出しは集計しません。それ以外の属性はそのまま委譲します。
+    """
+
+    def __init__(self, client: Any, return_consumed_capacity: str = "TOTAL"):
+        self.client = client
+        self.return_consumed_capacity = return_consumed_capacity
+        self._wrapped: Dict[str, Any] = {}
+
+    def __getattr__(self, name: str) -> Any:
+        if name not in READ_OPERATIONS and name not in WRITE_OPERATIONS:
+            return getattr(self.client, name)
+        wrapped = self._wrapped.get(name)
+        if wrapped is None:
+            wrapped = self._wrapped[name] = self._wrap(name, getattr(self.client, name))
+        return wrapped
+
+    def _wrap(self, operation: str, method: Any) -> Any:
+        async def call(**params: Any) -> dict:
+            params.setdefault("ReturnConsumedCapacity", self.return_consumed_capacity)
+            usage = _current_usage.get()
+            start_time = time.perf_counter()
+            try:
+                response = await method(**params)
+            except Exception:
+                if usage is not None:
+                    usage.record(operation, time.perf_counter() - start_time, error=True)
+                raise
+            if usage is not None:
+                usage.record(operation, time.perf_counter() - start_time, response.get("ConsumedCapacity"))
+            return response
+
+        return call
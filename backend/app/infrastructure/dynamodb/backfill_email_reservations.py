@@ -0,0 +1,55 @@
+"""
+予約テーブルを導入する前に作成されたユーザーのメールアドレスを、予約テーブルに登録するバックフィル
+
+ユーザーテーブルを走査し、予約がないユーザーの予約を条件付きの PutItem で作成します（何度実行してもよい）。
+同じメールアドレスを複数のユーザーが使っている場合は、先に予約したユーザー以外を表示し、終了コード 1 で終了します
+（重複は手作業で解消してから、もう一度実行してください）。
+
+テーブル名・エンドポイントは API と同じ環境変数（DYNAMODB_TABLE_NAME / DYNAMODB_EMAIL_TABLE_NAME /
+DYNAMODB_ENDPOINT / AWS_REGION）から読み込みます。
+
+使用例:
+    python -m app.infrastructure.dynamodb.backfill_email_reservations
+    python -m app.infrastructure.dynamodb.backfill_email_reservations --segments 8 --concurrency 32
+"""
+import argparse
+import asyncio
+import os
+import sys
+
+from app.infrastructure.dynamodb.client import DynamoDBClientManager
+from app.infrastructure.repositories.dynamodb_user_repository import DynamoDBUserRepository
+
+
+async def backfill(args: argparse.Namespace) -> int:
+    dynamodb = DynamoDBClientManager(
+        region_name=os.getenv("AWS_REGION"),
+        endpoint_url=os.getenv("DYNAMODB_ENDPOINT") or None
+    )
+    await dynamodb.start()
+    try:
+        table_name = os.getenv("DYNAMODB_TABLE_NAME", "users")
+        repository = DynamoDBUserRepository(
+            client=dynamodb.client,
+            table_name=table_name,
+            scan_segments=args.segments,
+            scan_concurrency=args.segments,
+            email_table_name=os.getenv("DYNAMODB_EMAIL_TABLE_NAME") or f"{table_name}-emails"
+        )
+        counts = await repository.backfill_email_reservations(concurrency=args.concurrency)
+    finally:
+        await dynamodb.close()
+    print(f"reserved {counts['reserved']} emails, {counts['conflicts']} conflicts")
+    return 1 if counts["conflicts"] else 0
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--segments", type=int, default=4)
+    parser.add_argument("--concurrency", type=int, default=16)
+    args = parser.parse_args()
+    sys.exit(asyncio.run(backfill(args)))
+
+
+if __name__ == "__main__":
+    main()
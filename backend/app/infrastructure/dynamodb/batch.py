@@ -0,0 +1,52 @@
+import asyncio
+from typing import Any, Dict, List, Optional
+
+from app.infrastructure.dynamodb.retry import UnprocessedItemsError, backoff_delay
+
+# BatchGetItem の1リクエストあたりのキー数上限
+BATCH_GET_MAX_KEYS = 100
+
+
+def _chunks(values: List[Any], size: int) -> List[List[Any]]:
+    return [values[i:i + size] for i in range(0, len(values), size)]
+
+
+async def batch_get_items(
+    client: Any,
+    table_name: str,
+    keys: List[dict],
+    projection: Optional[Dict[str, Any]] = None,
+    max_retries: int = 5,
+    base_delay: float = 0.05,
+    max_delay: float = 2.0,
+    max_concurrency: int = 4
+) -> List[dict]:
+    """
+    BatchGetItem でアイテムをまとめて取得する
+    - 100件ごとに分割し、max_concurrency 件まで並行してリクエストする
+    - UnprocessedKeys は指数バックオフで再試行し、上限を超えたら UnprocessedItemsError
+    - 返す順序は保証しない（呼び出し側でキーから並べ直す）
+    """
+    semaphore = asyncio.Semaphore(max_concurrency)
+
+    async def fetch(chunk: List[dict]) -> List[dict]:
+        request: Dict[str, Any] = {table_name: dict(projection or {}, Keys=chunk)}
+        found: List[dict] = []
+        attempt = 0
+        async with semaphore:
+            while request:
+                response = await client.batch_get_item(RequestItems=request)
+                found.extend(response.get('Responses', {}).get(table_name, []))
+                request = response.get('UnprocessedKeys') or {}
+                if not request:
+                    break
+                if attempt >= max_retries:
+                    remaining = len(request.get(table_name, {}).get('Keys', []))
+                    raise UnprocessedItemsError('BatchGetItem', remaining)
+                await asyncio.sleep(backoff_delay(attempt, base_delay, max_delay))
+                attempt += 1
+        return found
+
+    results = await asyncio.gather(*(fetch(chunk) for chunk in _chunks(keys, BATCH_GET_MAX_KEYS)))
+    return [item for chunk in results for item in chunk]
+
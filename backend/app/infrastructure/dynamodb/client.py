@@ -0,0 +1,61 @@
+from contextlib import AsyncExitStack
+from typing import Any, Optional
+
+from aiobotocore.config import AioConfig
+from aiobotocore.session import get_session
+
+
+class DynamoDBClientManager:
+    """
+    aiobotocoreのDynamoDBクライアントをプロセス内で共有するためのマネージャ
+    FastAPIのlifespanで start()/close() を呼び出し、接続プールを使い回します
+    """
+
+    def __init__(
+        self,
+        region_name: Optional[str] = None,
+        endpoint_url: Optional[str] = None,
+        max_pool_connections: int = 50,
+        connect_timeout: float = 2.0,
+        read_timeout: float = 5.0,
+        max_attempts: int = 3
+    ):
+        self.region_name = region_name
+        self.endpoint_url = endpoint_url
+        self.config = AioConfig(
+            max_pool_connections=max_pool_connections,
+            connect_timeout=connect_timeout,
+            read_timeout=read_timeout,
+            retries={"max_attempts": max_attempts, "mode": "standard"}
+        )
+        self._exit_stack: Optional[AsyncExitStack] = None
+        self._client: Any = None
+
+    async def start(self) -> None:
+        """クライアントを生成し、接続プールを開く"""
+        if self._client is not None:
+            return
+
+        session = get_session()
+        self._exit_stack = AsyncExitStack()
+        self._client = await self._exit_stack.enter_async_context(
+            session.create_client(
+                "dynamodb",
+                region_name=self.region_name,
+                endpoint_url=self.endpoint_url,
+                config=self.config
+            )
+        )
+
+    async def close(self) -> None:
+        """接続プールを閉じる"""
+        if self._exit_stack is not None:
+            await self._exit_stack.aclose()
+        self._exit_stack = None
+        self._client = None
+
+    @property
+    def client(self) -> Any:
+        if self._client is None:
+            raise RuntimeError("DynamoDB client is not started")
+        return self._client
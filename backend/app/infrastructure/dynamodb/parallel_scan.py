@@ -0,0 +1,84 @@
+import asyncio
+from typing import Any, AsyncIterator, List, Optional
+
+from botocore.exceptions import ClientError
+
+from app.infrastructure.dynamodb.retry import backoff_delay, is_retryable_error
+
+_SEGMENT_DONE = object()
+
+
+async def parallel_scan(
+    client: Any,
+    scan_params: dict,
+    total_segments: int,
+    max_concurrency: Optional[int] = None,
+    max_retries: int = 5,
+    base_delay: float = 0.05,
+    max_delay: float = 2.0,
+    max_buffered_pages: Optional[int] = None
+) -> AsyncIterator[dict]:
+    """
+    Segment/TotalSegments でテーブルを分割し、並列にScanした結果を1つのストリームにまとめる
+
+    - 同時に実行するセグメント数は max_concurrency で制限する
+    - スロットリング等の一時的なエラーはページ単位で指数バックオフして再試行する
+    - 取得済みページのバッファは max_buffered_pages で上限を設け、消費側が遅い場合は読み込みを待たせる
+    - 返す順序はセグメント間で保証しない
+    """
+    if total_segments < 1:
+        raise ValueError("total_segments must be >= 1")
+
+    concurrency = max_concurrency or total_segments
+    semaphore = asyncio.Semaphore(concurrency)
+    pages: asyncio.Queue = asyncio.Queue(maxsize=max_buffered_pages or concurrency * 2)
+
+    async def scan_segment(segment: int) -> None:
+        params = dict(scan_params, Segment=segment, TotalSegments=total_segments)
+        try:
+            async with semaphore:
+                while True:
+                    attempt = 0
+                    while True:
+                        try:
+                            response = await client.scan(**params)
+                            break
+                        except ClientError as e:
+                            if not is_retryable_error(e) or attempt >= max_retries:
+                                raise
+                            await asyncio.sleep(backoff_delay(attempt, base_delay, max_delay))
+                            attempt += 1
+
+                    items = response.get("Items", [])
+                    if items:
+                        await pages.put(items)
+                    last_key = response.get("LastEvaluatedKey")
+                    if not last_key:
+                        break
+                    params["ExclusiveStartKey"] = last_key
+            await pages.put(_SEGMENT_DONE)
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            await pages.put(e)
+
+    workers: List[asyncio.Task] = [
+        asyncio.create_task(scan_segment(segment))
+        for segment in range(total_segments)
+    ]
+    try:
+        remaining = total_segments
+        while remaining:
+            page = await pages.get()
+            if page is _SEGMENT_DONE:
+                remaining -= 1
+                continue
+            if isinstance(page, Exception):
+                raise page
+            for item in page:
+                yield item
+    finally:
+        # 消費側が途中で終了した場合や例外時は残りのセグメントを止める
+        for worker in workers:
+            worker.cancel()
+        await asyncio.gather(*workers, return_exceptions=True)
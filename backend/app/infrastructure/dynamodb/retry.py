@@ -0,0 +1,30 @@
+import random
+
+from botocore.exceptions import ClientError
+
+# スロットリングや一時的な障害として再試行してよいエラーコード
+RETRYABLE_ERROR_CODES = frozenset({
+    "ProvisionedThroughputExceededException",
+    "ThrottlingException",
+    "RequestLimitExceeded",
+    "InternalServerError",
+    "ServiceUnavailable",
+})
+
+
+class UnprocessedItemsError(Exception):
+    """バッチ操作で再試行しても未処理のキー・アイテムが残った場合の例外"""
+
+    def __init__(self, operation: str, unprocessed: int):
+        super().__init__(f"{operation}: {unprocessed} unprocessed item(s) remained after retries")
+        self.operation = operation
+        self.unprocessed = unprocessed
+
+
+def is_retryable_error(error: ClientError) -> bool:
+    return error.response.get("Error", {}).get("Code") in RETRYABLE_ERROR_CODES
+
+
+def backoff_delay(attempt: int, base_delay: float, max_delay: float) -> float:
+    """Full Jitter 方式の指数バックオフ"""
+    return random.uniform(0, min(max_delay, base_delay * (2 ** attempt)))
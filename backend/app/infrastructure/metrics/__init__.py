@@ -0,0 +1,21 @@
+from app.infrastructure.metrics.multiprocess import MultiProcessMetricsStore
+from app.infrastructure.metrics.registry import (
+    DEFAULT_BUCKETS,
+    Counter,
+    Gauge,
+    Histogram,
+    MetricsRegistry,
+    merge_snapshots,
+    render_prometheus,
+)
+
+__all__ = [
+    "DEFAULT_BUCKETS",
+    "Counter",
+    "Gauge",
+    "Histogram",
+    "MetricsRegistry",
+    "MultiProcessMetricsStore",
+    "merge_snapshots",
+    "render_prometheus",
+]
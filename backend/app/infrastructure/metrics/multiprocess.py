@@ -0,0 +1,126 @@
+import asyncio
+import glob
+import json
+import os
+import tempfile
+import time
+from typing import Any, Dict, List, Optional
+
+from app.infrastructure.metrics.registry import MetricsRegistry, merge_snapshots
+
+_FILE_PREFIX = "metrics_"
+
+
+def _pid_alive(pid: int) -> bool:
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        return True
+    return True
+
+
+class MultiProcessMetricsStore:
+    """
+    uvicorn のワーカープロセス間でメトリクスを集計するためのファイルストア
+
+    - 各ワーカーは自分のスナップショットを directory/metrics_<pid>.json に定期的に書き出す
+      （一時ファイルへ書いてから rename するため、読み手が書きかけのファイルを見ることはない）
+    - /metrics を受けたワーカーは、自分の最新値と他ワーカーのファイルを合算して返す
+    - 終了したワーカーのカウンタ・ヒストグラムは合計に残し、ゲージ（処理中リクエスト数など）は除外する
+    - 他ワーカーの値は最大 flush_interval 秒遅れる
+    directory はデプロイ（サーバー起動）のたびに空にしておくこと
+    """
+
+    def __init__(self, registry: MetricsRegistry, directory: str, flush_interval: float = 2.0):
+        self.registry = registry
+        self.directory = directory
+        self.flush_interval = flush_interval
+        self.pid = os.getpid()
+        self._task: Optional[asyncio.Task] = None
+        self.flush_errors = 0
+
+    @property
+    def path(self) -> str:
+        return os.path.join(self.directory, f"{_FILE_PREFIX}{self.pid}.json")
+
+    def write(self, snapshot: Optional[Dict[str, Any]] = None) -> None:
+        """このワーカーのスナップショットをファイルに書き出す"""
+        if snapshot is None:
+            snapshot = self.registry.snapshot()
+        data = json.dumps({"pid": self.pid, "written_at": time.time(), "metrics": snapshot})
+        fd, tmp_path = tempfile.mkstemp(dir=self.directory, prefix=".tmp_")
+        try:
+            with os.fdopen(fd, "w") as f:
+                f.write(data)
+            os.replace(tmp_path, self.path)
+        except Exception:
+            try:
+                os.unlink(tmp_path)
+            except OSError:
+                pass
+            raise
+
+    def _read_others(self) -> List[Dict[str, Any]]:
+        snapshots = []
+        for path in glob.glob(os.path.join(self.directory, f"{_FILE_PREFIX}*.json")):
+            try:
+                with open(path) as f:
+                    data = json.load(f)
+            except (OSError, ValueError) as e:
+                print(f"Error reading metrics file {path}: {e}")
+                continue
+            pid = data.get("pid")
+            if pid == self.pid:
+                continue
+            metrics = data.get("metrics", {})
+            if not _pid_alive(pid):
+                # 終了したワーカーのゲージは現在値として意味を持たない
+                metrics = {name: metric for name, metric in metrics.items() if metric["type"] != "gauge"}
+            snapshots.append(metrics)
+        return snapshots
+
+    def _exchange(self, own: Dict[str, Any]) -> List[Dict[str, Any]]:
+        try:
+            self.write(own)
+        except Exception as e:
+            self.flush_errors += 1
+            print(f"Error writing metrics file: {e}")
+        return self._read_others()
+
+    async def collect(self) -> Dict[str, Any]:
+        """全ワーカー分を合算したスナップショットを返す（自分の分は最新値を使う）"""
+        own = self.registry.snapshot()
+        others = await asyncio.to_thread(self._exchange, own)
+        return merge_snapshots([own] + others)
+
+    async def _run(self) -> None:
+        while True:
+            await asyncio.sleep(self.flush_interval)
+            try:
+                # コレクターはイベントループ上で実行し、ファイル書き込みだけをスレッドに回す
+                await asyncio.to_thread(self.write, self.registry.snapshot())
+            except Exception as e:
+                self.flush_errors += 1
+                print(f"Error writing metrics file: {e}")
+
+    def start(self) -> None:
+        os.makedirs(self.directory, exist_ok=True)
+        self.pid = os.getpid()
+        if self._task is None or self._task.done():
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self) -> None:
+        """定期書き出しを止め、最終値を書き出す"""
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+        try:
+            await asyncio.to_thread(self.write, self.registry.snapshot())
+        except Exception as e:
+            print(f"Error writing metrics file: {e}")
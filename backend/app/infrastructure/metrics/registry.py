@@ -0,0 +1,303 @@
+import threading
+from bisect import bisect_left
+from typing import Any, Callable, Dict, Iterable, List, Optional, Sequence, Tuple
+
+# ラベル値の組（labelnames と同じ順序）
+LabelValues = Tuple[str, ...]
+
+# レイテンシ用の既定バケット（秒）
+DEFAULT_BUCKETS: Tuple[float, ...] = (
+    0.005, 0.01, 0.025, 0.05, 0.075, 0.1, 0.25, 0.5, 0.75, 1.0, 2.5, 5.0, 7.5, 10.0
+)
+
+
+class _Metric:
+    type_name = ""
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = ()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._lock = threading.Lock()
+
+    def _check(self, labels: LabelValues) -> LabelValues:
+        if len(labels) != len(self.labelnames):
+            raise ValueError(f"{self.name}: expected labels {self.labelnames}, got {labels}")
+        return labels
+
+    def describe(self) -> Dict[str, Any]:
+        return {
+            "type": self.type_name,
+            "help": self.documentation,
+            "labelnames": list(self.labelnames),
+        }
+
+
+class Counter(_Metric):
+    """単調増加するカウンタ"""
+
+    type_name = "counter"
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = ()):
+        super().__init__(name, documentation, labelnames)
+        self._values: Dict[LabelValues, float] = {}
+
+    def inc(self, labels: LabelValues = (), amount: float = 1.0) -> None:
+        with self._lock:
+            current = self._values.get(labels)
+            if current is None:
+                self._check(labels)
+                current = 0.0
+            self._values[labels] = current + amount
+
+    def set(self, labels: LabelValues, value: float) -> None:
+        """他のオブジェクトが持つ累積値をそのまま反映する（コレクター用）"""
+        with self._lock:
+            self._values[self._check(labels)] = float(value)
+
+    def samples(self) -> List[list]:
+        with self._lock:
+            return [[list(labels), value] for labels, value in self._values.items()]
+
+
+class Gauge(_Metric):
+    """増減する現在値（処理中のリクエスト数、キャッシュの件数など）"""
+
+    type_name = "gauge"
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = ()):
+        super().__init__(name, documentation, labelnames)
+        self._values: Dict[LabelValues, float] = {}
+
+    def inc(self, labels: LabelValues = (), amount: float = 1.0) -> None:
+        with self._lock:
+            current = self._values.get(labels)
+            if current is None:
+                self._check(labels)
+                current = 0.0
+            self._values[labels] = current + amount
+
+    def dec(self, labels: LabelValues = (), amount: float = 1.0) -> None:
+        self.inc(labels, -amount)
+
+    def set(self, labels: LabelValues, value: float) -> None:
+        with self._lock:
+            self._values[self._check(labels)] = float(value)
+
+    def samples(self) -> List[list]:
+        with self._lock:
+            return [[list(labels), value] for labels, value in self._values.items()]
+
+
+class Histogram(_Metric):
+    """
+    固定バケットのヒストグラム
+
+    バケットごとの件数（累積ではない）と合計値・件数を保持し、
+    出力時に Prometheus の累積バケット形式へ変換する
+    """
+
+    type_name = "histogram"
+
+    def __init__(
+        self,
+        name: str,
+        documentation: str,
+        labelnames: Sequence[str] = (),
+        buckets: Sequence[float] = DEFAULT_BUCKETS
+    ):
+        super().__init__(name, documentation, labelnames)
+        self.buckets = tuple(sorted(buckets))
+        # ラベルごとに [バケット別件数..., +Inf の件数] と [合計, 件数]
+        self._counts: Dict[LabelValues, List[int]] = {}
+        self._sums: Dict[LabelValues, List[float]] = {}
+
+    def observe(self, labels: LabelValues, value: float) -> None:
+        index = bisect_left(self.buckets, value)
+        with self._lock:
+            counts = self._counts.get(labels)
+            if counts is None:
+                self._check(labels)
+                counts = self._counts[labels] = [0] * (len(self.buckets) + 1)
+                self._sums[labels] = [0.0, 0]
+            counts[index] += 1
+            total = self._sums[labels]
+            total[0] += value
+            total[1] += 1
+
+    def describe(self) -> Dict[str, Any]:
+        return dict(super().describe(), buckets=list(self.buckets))
+
+    def samples(self) -> List[list]:
+        with self._lock:
+            return [
+                [list(labels), list(counts), self._sums[labels][0], self._sums[labels][1]]
+                for labels, counts in self._counts.items()
+            ]
+
+
+class MetricsRegistry:
+    """
+    プロセス内のメトリクスを保持するレジストリ
+
+    - counter / gauge / histogram は同じ名前で再度呼ばれると登録済みのものを返す
+    - add_collector で登録した関数はスナップショット取得の直前に呼ばれ、
+      キャッシュの統計など他のオブジェクトが持つ値をメトリクスへ反映する
+    - snapshot() はJSONに変換できる辞書を返し、ワーカー間の集計に使う
+    """
+
+    def __init__(self):
+        self._metrics: Dict[str, _Metric] = {}
+        self._collectors: List[Callable[[], None]] = []
+        self._lock = threading.Lock()
+
+    def _register(self, cls: type, name: str, *args: Any, **kwargs: Any) -> Any:
+        with self._lock:
+            metric = self._metrics.get(name)
+            if metric is None:
+                metric = self._metrics[name] = cls(name, *args, **kwargs)
+            elif not isinstance(metric, cls):
+                raise ValueError(f"Metric {name} is already registered as {metric.type_name}")
+            return metric
+
+    def counter(self, name: str, documentation: str, labelnames: Sequence[str] = ()) -> Counter:
+        return self._register(Counter, name, documentation, labelnames)
+
+    def gauge(self, name: str, documentation: str, labelnames: Sequence[str] = ()) -> Gauge:
+        return self._register(Gauge, name, documentation, labelnames)
+
+    def histogram(
+        self,
+        name: str,
+        documentation: str,
+        labelnames: Sequence[str] = (),
+        buckets: Sequence[float] = DEFAULT_BUCKETS
+    ) -> Histogram:
+        return self._register(Histogram, name, documentation, labelnames, buckets=buckets)
+
+    def add_collector(self, collector: Callable[[], None]) -> None:
+        self._collectors.append(collector)
+
+    def add_stats_collector(
+        self,
+        prefix: str,
+        stats: Callable[[], Dict[str, float]],
+        gauge_keys: Sequence[str] = ()
+    ) -> None:
+        """
+        stats() が返す辞書をメトリクスとして公開する
+        gauge_keys に含まれるキーは <prefix>_<key> のゲージ、それ以外は <prefix>_<key>_total のカウンタになる
+        """
+        gauges = frozenset(gauge_keys)
+
+        def collector() -> None:
+            for key, value in stats().items():
+                if key in gauges:
+                    self.gauge(f"{prefix}_{key}", f"{prefix} {key}.").set((), value)
+                else:
+                    self.counter(f"{prefix}_{key}_total", f"{prefix} {key}.").set((), value)
+
+        self.add_collector(collector)
+
+    def collect(self) -> None:
+        for collector in list(self._collectors):
+            try:
+                collector()
+            except Exception as e:
+                print(f"Error collecting metrics: {e}")
+
+    def snapshot(self) -> Dict[str, Any]:
+        """コレクターを実行し、全メトリクスの現在値を返す"""
+        self.collect()
+        with self._lock:
+            metrics = list(self._metrics.values())
+        return {
+            metric.name: dict(metric.describe(), samples=metric.samples())
+            for metric in metrics
+        }
+
+
+def merge_snapshots(snapshots: Iterable[Dict[str, Any]]) -> Dict[str, Any]:
+    """
+    複数ワーカーのスナップショットを1つにまとめる
+
+    カウンタ・ゲージ・ヒストグラムはいずれもラベルごとに合計する
+    （処理中リクエスト数やキャッシュ件数はワーカー全体の合計として扱う）
+    """
+    merged: Dict[str, Dict[str, Any]] = {}
+    values: Dict[str, Dict[LabelValues, Any]] = {}
+    for snapshot in snapshots:
+        for name, metric in snapshot.items():
+            if name not in merged:
+                merged[name] = {key: value for key, value in metric.items() if key != "samples"}
+                values[name] = {}
+            elif merged[name]["type"] != metric["type"] or merged[name].get("buckets") != metric.get("buckets"):
+                # 定義の異なるスナップショット（デプロイ途中の旧ワーカーなど）は混ぜない
+                continue
+            target = values[name]
+            for sample in metric["samples"]:
+                labels = tuple(sample[0])
+                if metric["type"] == "histogram":
+                    current = target.get(labels)
+                    if current is None:
+                        target[labels] = [list(sample[1]), sample[2], sample[3]]
+                    else:
+                        current[0] = [a + b for a, b in zip(current[0], sample[1])]
+                        current[1] += sample[2]
+                        current[2] += sample[3]
+                else:
+                    target[labels] = target.get(labels, 0.0) + sample[1]
+
+    for name, metric in merged.items():
+        if metric["type"] == "histogram":
+            metric["samples"] = [
+                [list(labels), counts, total, count]
+                for labels, (counts, total, count) in values[name].items()
+            ]
+        else:
+            metric["samples"] = [[list(labels), value] for labels, value in values[name].items()]
+    return merged
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _format_labels(names: Sequence[str], values: Sequence[str], extra: Optional[Tuple[str, str]] = None) -> str:
+    pairs = [f'{name}="{_escape(str(value))}"' for name, value in zip(names, values)]
+    if extra is not None:
+        pairs.append(f'{extra[0]}="{extra[1]}"')
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+def _format_value(value: float) -> str:
+    if value == float("inf"):
+        return "+Inf"
+    if float(value).is_integer():
+        return str(int(value))
+    return repr(float(value))
+
+
+def render_prometheus(snapshot: Dict[str, Any]) -> str:
+    """スナップショットを Prometheus のテキスト形式（version 0.0.4）に変換する"""
+    lines: List[str] = []
+    for name in sorted(snapshot):
+        metric = snapshot[name]
+        labelnames = metric["labelnames"]
+        lines.append(f"# HELP {name} {metric['help']}")
+        lines.append(f"# TYPE {name} {metric['type']}")
+        samples = sorted(metric["samples"], key=lambda sample: sample[0])
+        if metric["type"] != "histogram":
+            for labels, value in samples:
+                lines.append(f"{name}{_format_labels(labelnames, labels)} {_format_value(value)}")
+            continue
+        bounds = list(metric["buckets"]) + [float("inf")]
+        for labels, counts, total, count in samples:
+            cumulative = 0
+            for bound, bucket_count in zip(bounds, counts):
+                cumulative += bucket_count
+                le = ("le", _format_value(bound) if bound == float("inf") else repr(float(bound)))
+                lines.append(f"{name}_bucket{_format_labels(labelnames, labels, le)} {cumulative}")
+            lines.append(f"{name}_sum{_format_labels(labelnames, labels)} {_format_value(total)}")
+            lines.append(f"{name}_count{_format_labels(labelnames, labels)} {_format_value(count)}")
+    return "\n".join(lines) + "\n"
@@ -0,0 +1,245 @@
+from typing import Any, AsyncIterator, Dict, Hashable, List, Optional, Sequence
+
+from app.domain.user import User, UserBatch
+from app.domain.user import BulkCreateResult, UserPage, UserRepository
+from app.infrastructure.cache import MISSING, TTLCache
+
+
+class CachingUserRepository(UserRepository):
+    """
+    任意の UserRepository をラップするリードスルーキャッシュ
+
+    - get_by_id / get_by_email の結果をIDキーとメールキーの両方でキャッシュする
+    - 見つからなかった結果（None）も negative_ttl の間だけキャッシュする
+    - create_user / update_user / update_fields / delete_user では関連する両方のキーを無効化する
+    - 読み込みを始めてから結果が返るまでの間に無効化があった場合は、その結果をキャッシュしない
+      （書き込み前に読んだ古い値や見つからなかった結果を、無効化の後に ttl の間残さないため）
+    - キャッシュはプロセス内のみで共有されるため、他ワーカーの書き込みは ttl の間反映されない
+      （最新の値が必要な場合は get_by_id(consistent=True) でキャッシュを通さずに読む）
+    """
+
+    def __init__(
+        self,
+        repository: UserRepository,
+        max_size: int = 10000,
+        ttl: float = 30.0,
+        negative_ttl: float = 5.0
+    ):
+        self.repository = repository
+        self.negative_ttl = negative_ttl
+        self.negative_hits = 0
+        self.invalidations = 0
+        self.discarded_fetches = 0
+        # invalidate のたびに増える世代。読み込みの前後で変わっていれば結果をキャッシュしない
+        self._epoch = 0
+        self._cache = TTLCache(
+            max_size=max_size,
+            default_ttl=ttl,
+            on_evict=self._evict_sibling
+        )
+
+    @staticmethod
+    def _id_key(user_id: str) -> Hashable:
+        return ("id", user_id)
+
+    @staticmethod
+    def _email_key(email: str) -> Hashable:
+        return ("email", email)
+
+    @staticmethod
+    def _copy(user: User) -> User:
+        # 呼び出し側での変更がキャッシュに漏れないよう複製を返す
+        return user.copy()
+
+    def _evict_sibling(self, key: Hashable, value: Any) -> None:
+        # IDキーとメールキーは対で保持し、片方が追い出されたらもう片方も取り除く
+        if isinstance(value, User):
+            sibling = self._email_key(value.email) if key[0] == "id" else self._id_key(value.id)
+            self._cache.pop(sibling)
+
+    def _store(self, key: Hashable, user: Optional[User]) -> None:
+        if user is None:
+            self._cache.set(key, None, ttl=self.negative_ttl)
+            return
+        cached = self._copy(user)
+        self._cache.set(self._id_key(user.id), cached)
+        self._cache.set(self._email_key(user.email), cached)
+
+    def _lookup(self, key: Hashable) -> Any:
+        value = self._cache.get(key)
+        if value is None:
+            self.negative_hits += 1
+            return None
+        if value is MISSING:
+            return MISSING
+        return self._copy(value)
+
+    def invalidate(self, user_id: Optional[str] = None, email: Optional[str] = None) -> None:
+        """指定したID・メールアドレスに関するキャッシュを取り除く"""
+        self.invalidations += 1
+        self._epoch += 1
+        for key in (
+            self._id_key(user_id) if user_id else None,
+            self._email_key(email) if email else None,
+        ):
+            if key is None:
+                continue
+            value = self._cache.pop(key)
+            if isinstance(value, User):
+                self._evict_sibling(key, value)
+
+    def _store_fetched(
+        self,
+        key: Hashable,
+        user: Optional[User],
+        fields: Optional[Sequence[str]],
+        epoch: int
+    ) -> None:
+        # 読み込みの間に無効化があった場合、その結果は無効化より前の値かもしれないためキャッシュしない
+        if epoch != self._epoch:
+            self.discarded_fetches += 1
+            return
+        # fields を指定して読み込んだユーザーは一部のフィールドしか持たないため、見つからなかった結果だけをキャッシュする
+        if fields is None or user is None:
+            self._store(key, user)
+
+    async def get_by_id(
+        self,
+        user_id: str,
+        fields: Optional[Sequence[str]] = None,
+        consistent: bool = False
+    ) -> Optional[User]:
+        # キャッシュにあれば fields の指定にかかわらず全フィールドを持つユーザーを返す（consistent の場合は読み直して入れ替える）
+        key = self._id_key(user_id)
+        if not consistent:
+            cached = self._lookup(key)
+            if cached is not MISSING:
+                return cached
+        epoch = self._epoch
+        user = await self.repository.get_by_id(user_id, fields=fields, consistent=consistent)
+        self._store_fetched(key, user, fields, epoch)
+        return user
+
+    async def get_many(
+        self,
+        user_ids: List[str],
+        fields: Optional[Sequence[str]] = None
+    ) -> List[Optional[User]]:
+        found: Dict[str, Optional[User]] = {}
+        missing: List[str] = []
+        for user_id in dict.fromkeys(user_ids):
+            cached = self._lookup(self._id_key(user_id))
+            if cached is MISSING:
+                missing.append(user_id)
+            else:
+                found[user_id] = cached
+
+        if missing:
+            epoch = self._epoch
+            fetched = await self.repository.get_many(missing, fields=fields)
+            for user_id, user in zip(missing, fetched):
+                self._store_fetched(self._id_key(user_id), user, fields, epoch)
+                found[user_id] = user
+
+        # 同じIDが複数回指定された場合も別々のインスタンスを返す
+        return [
+            self._copy(found[user_id]) if found[user_id] else None
+            for user_id in user_ids
+        ]
+
+    async def get_by_email(self, email: str) -> Optional[User]:
+        key = self._email_key(email)
+        cached = self._lookup(key)
+        if cached is not MISSING:
+            return cached
+        epoch = self._epoch
+        user = await self.repository.get_by_email(email)
+        self._store_fetched(key, user, None, epoch)
+        return user
+
+    async def get_revision(self, user_id: str) -> Optional[str]:
+        # キャッシュにあればリポジトリを呼ばない（見つからない場合の結果は get_by_id と同様にキャッシュする）
+        key = self._id_key(user_id)
+        value = self._cache.get(key)
+        if value is None:
+            self.negative_hits += 1
+            return None
+        if value is not MISSING:
+            return value.revision()
+        epoch = self._epoch
+        user = await self.repository.get_by_id(user_id)
+        self._store_fetched(key, user, None, epoch)
+        return user.revision() if user else None
+
+    async def collection_revision(self) -> Optional[str]:
+        return await self.repository.collection_revision()
+
+    async def create_user(self, user: User) -> User:
+        # 直前のnegativeキャッシュが残らないよう、書き込み後に両キーを無効化する
+        try:
+            return await self.repository.create_user(user)
+        finally:
+            self.invalidate(user_id=user.id, email=user.email)
+
+    async def create_users(self, users: Sequence[User]) -> BulkCreateResult:
+        try:
+            return await self.repository.create_users(users)
+        finally:
+            if isinstance(users, UserBatch):
+                keys = zip(users.ids, users.emails)
+            else:
+                keys = ((user.id, user.email) for user in users)
+            for user_id, email in keys:
+                self.invalidate(user_id=user_id, email=email)
+
+    async def update_user(self, user: User) -> User:
+        try:
+            return await self.repository.update_user(user)
+        finally:
+            # メールアドレス変更時は、IDキーと対になった旧メールキーも合わせて無効化される
+            self.invalidate(user_id=user.id, email=user.email)
+
+    async def update_fields(
+        self, user_id: str, changes: Dict[str, Any], expected_version: Optional[int] = None
+    ) -> User:
+        try:
+            return await self.repository.update_fields(user_id, changes, expected_version)
+        finally:
+            # 旧メールキーはIDキーと対になって無効化される。新しいメールアドレスのnegativeキャッシュも取り除く
+            self.invalidate(user_id=user_id, email=changes.get("email"))
+
+    async def delete_user(self, user_id: str) -> bool:
+        try:
+            return await self.repository.delete_user(user_id)
+        finally:
+            self.invalidate(user_id=user_id)
+
+    async def list_users(self) -> List[User]:
+        return await self.repository.list_users()
+
+    async def list_users_page(
+        self,
+        limit: int,
+        cursor: Optional[str] = None,
+        fields: Optional[Sequence[str]] = None
+    ) -> UserPage:
+        return await self.repository.list_users_page(limit=limit, cursor=cursor, fields=fields)
+
+    def iter_users(self, page_size: int = 1000) -> AsyncIterator[User]:
+        return self.repository.iter_users(page_size=page_size)
+
+    def iter_user_batches(
+        self,
+        batch_size: int = 1000,
+        fields: Optional[Sequence[str]] = None
+    ) -> AsyncIterator[UserBatch]:
+        return self.repository.iter_user_batches(batch_size=batch_size, fields=fields)
+
+    def stats(self) -> Dict[str, int]:
+        """ヒット・ミス・追い出しなどのカウンタ"""
+        return dict(
+            self._cache.stats(),
+            negative_hits=self.negative_hits,
+            invalidations=self.invalidations,
+            discarded_fetches=self.discarded_fetches
+        )
@@ -1,20 +1,109 @@
+import asyncio
+import base64
+import json
+import sys
 from datetime import datetime
-from typing import List, Optional
+from typing import Any, AsyncIterator, Dict, List, Optional, Sequence
 
-import boto3
+from boto3.dynamodb.types import TypeDeserializer, TypeSerializer
 from botocore.exceptions import ClientError
 
-from app.domain.user import User
-from app.domain.user import UserRepository
+from app.domain.user import User, UserBatch
+from app.domain.user import BulkCreateResult, EmailAlreadyRegisteredError, UserNotFoundError, UserPage, UserRepository, UserVersionConflictError
+from app.domain.user.entity import make_revision
+from app.domain.user.repository import EMAIL_ALREADY_REGISTERED, check_update_fields, projection_fields
+from app.infrastructure.dynamodb.accounting import CapacityTrackingClient
+from app.infrastructure.dynamodb.batch import batch_get_items
+from app.infrastructure.dynamodb.parallel_scan import parallel_scan
+
+_serializer = TypeSerializer()
+_deserializer = TypeDeserializer()
+
+
+def _value(attribute: Optional[dict]) -> Any:
+    # 文字列・真偽値・NULL は直接取り出し、それ以外の型だけ TypeDeserializer に任せる
+    if attribute is None:
+        return None
+    if 'S' in attribute:
+        return attribute['S']
+    if 'BOOL' in attribute:
+        return attribute['BOOL']
+    if 'NULL' in attribute:
+        return None
+    return _deserializer.deserialize(attribute)
+
+
+def _version(attribute: Optional[dict]) -> int:
+    # version 属性がない（この属性を追加する前に書き込まれた）アイテムは0とみなす
+    return int(attribute['N']) if attribute and 'N' in attribute else 0
+
+
+def _attribute_value(value: Any) -> dict:
+    if isinstance(value, datetime):
+        value = value.isoformat()
+    elif isinstance(value, tuple):
+        value = list(value)
+    return _serializer.serialize(value)
+
+
+def _projection(fields: Optional[Sequence[str]]) -> Dict[str, Any]:
+    """fields（と版の判定に必要なフィールド）だけを読み込む ProjectionExpression のパラメータ"""
+    if not fields:
+        return {}
+    names = {f'#p{index}': name for index, name in enumerate(projection_fields(fields))}
+    return {'ProjectionExpression': ', '.join(names), 'ExpressionAttributeNames': names}
+
+
+def _roles(attribute: Optional[dict]) -> List[str]:
+    # ロール名は種類が少ないため intern して同じ文字列を共有する
+    if not attribute:
+        return []
+    if 'L' in attribute:
+        return [sys.intern(value['S']) for value in attribute['L']]
+    return [sys.intern(role) for role in _value(attribute) or []]
+
 
 class DynamoDBUserRepository(UserRepository):
-    def __init__(self, table_name: str):
-        self.dynamodb = boto3.resource('dynamodb')
-        self.table = self.dynamodb.Table(table_name)
+    """
+    aiobotocoreの低レベルクライアントを使った非同期リポジトリ
+    クライアントはlifespanで生成された共有インスタンスを受け取ります
+    scan_segments が2以上の場合、全件走査は並列Scanで行います
+    すべての呼び出しで消費キャパシティを取得し、実行中のリクエストの集計に加算します
+    更新は変更されたフィールドだけを UpdateItem で書き込み、version の条件で他の更新との競合を検出します
+    メールアドレスの一意性は、email をキーとする予約テーブル（email_table_name）のアイテムで保証します
+    （作成・メールアドレスの変更ではユーザーと予約を同じ TransactWriteItems で書き込みます）
+    """
+
+    # create_users の TransactWriteItems 1回あたりのユーザー数（ユーザーと予約の2件ずつで、上限の100件）
+    TRANSACT_USERS = 50
 
-    async def get_by_id(self, user_id: str) -> Optional[User]:
+    def __init__(
+        self,
+        client: Any,
+        table_name: str,
+        scan_segments: int = 1,
+        scan_concurrency: Optional[int] = None,
+        email_table_name: Optional[str] = None
+    ):
+        self.client = client if isinstance(client, CapacityTrackingClient) else CapacityTrackingClient(client)
+        self.table_name = table_name
+        self.email_table_name = email_table_name or f"{table_name}-emails"
+        self.scan_segments = scan_segments
+        self.scan_concurrency = scan_concurrency
+
+    async def get_by_id(
+        self,
+        user_id: str,
+        fields: Optional[Sequence[str]] = None,
+        consistent: bool = False
+    ) -> Optional[User]:
         try:
-            response = self.table.get_item(Key={'id': user_id})
+            response = await self.client.get_item(
+                TableName=self.table_name,
+                Key={'id': {'S': user_id}},
+                ConsistentRead=consistent,
+                **_projection(fields)
+            )
             item = response.get('Item')
             if not item:
                 return None
@@ -23,12 +112,57 @@ class DynamoDBUserRepository(UserRepository):
             print(f"Error getting user: {e}")
             return None
 
+    async def get_revision(self, user_id: str) -> Optional[str]:
+        # 版の判定に必要な日時だけを取得する（消費RCUはアイテム全体のサイズで決まるが、転送量と変換を省ける）
+        try:
+            response = await self.client.get_item(
+                TableName=self.table_name,
+                Key={'id': {'S': user_id}},
+                ProjectionExpression='#id, #created_at, #updated_at, #version',
+                ExpressionAttributeNames={
+                    '#id': 'id',
+                    '#created_at': 'created_at',
+                    '#updated_at': 'updated_at',
+                    '#version': 'version'
+                }
+            )
+        except ClientError as e:
+            print(f"Error getting user revision: {e}")
+            return None
+        item = response.get('Item')
+        if not item:
+            return None
+        return make_revision(_version(item.get('version')), _value(item.get('updated_at')), _value(item['created_at']))
+
+    async def get_many(
+        self,
+        user_ids: List[str],
+        fields: Optional[Sequence[str]] = None
+    ) -> List[Optional[User]]:
+        # BatchGetItem は重複キーを受け付けないため、一意にしてから取得する
+        unique_ids = list(dict.fromkeys(user_ids))
+        if not unique_ids:
+            return []
+        try:
+            items = await batch_get_items(
+                self.client,
+                self.table_name,
+                [{'id': {'S': user_id}} for user_id in unique_ids],
+                projection=_projection(fields)
+            )
+        except ClientError as e:
+            print(f"Error getting users: {e}")
+            raise
+        users = {item['id']['S']: self._item_to_user(item) for item in items}
+        return [users.get(user_id) for user_id in user_ids]
+
     async def get_by_email(self, email: str) -> Optional[User]:
         try:
-            response = self.table.query(
+            response = await self.client.query(
+                TableName=self.table_name,
                 IndexName='email-index',
                 KeyConditionExpression='email = :email',
-                ExpressionAttributeValues={':email': email}
+                ExpressionAttributeValues={':email': {'S': email}}
             )
             items = response.get('Items', [])
             if not items:
@@ -40,61 +174,481 @@ class DynamoDBUserRepository(UserRepository):
 
     async def list_users(self) -> List[User]:
         try:
-            response = self.table.scan()
-            items = response.get('Items', [])
-            return [self._item_to_user(item) for item in items]
+            return [user async for user in self.iter_users()]
         except ClientError as e:
             print(f"Error listing users: {e}")
             return []
 
+    async def list_users_page(
+        self,
+        limit: int,
+        cursor: Optional[str] = None,
+        fields: Optional[Sequence[str]] = None
+    ) -> UserPage:
+        params = {'TableName': self.table_name, 'Limit': limit, **_projection(fields)}
+        if cursor:
+            params['ExclusiveStartKey'] = self._decode_cursor(cursor)
+        try:
+            response = await self.client.scan(**params)
+        except ClientError as e:
+            print(f"Error listing users: {e}")
+            raise
+        return UserPage(
+            items=self._items_to_batch(response.get('Items', [])),
+            next_cursor=self._encode_cursor(response.get('LastEvaluatedKey'))
+        )
+
+    async def iter_users(self, page_size: int = 1000) -> AsyncIterator[User]:
+        if self.scan_segments > 1:
+            async for user in self.parallel_scan(page_size=page_size):
+                yield user
+            return
+
+        # 1MBのページ上限で打ち切られないよう LastEvaluatedKey を最後まで辿る
+        params = {'TableName': self.table_name, 'Limit': page_size}
+        while True:
+            response = await self.client.scan(**params)
+            for item in response.get('Items', []):
+                yield self._item_to_user(item)
+            last_key = response.get('LastEvaluatedKey')
+            if not last_key:
+                return
+            params['ExclusiveStartKey'] = last_key
+
+    async def iter_user_batches(
+        self,
+        batch_size: int = 1000,
+        fields: Optional[Sequence[str]] = None
+    ) -> AsyncIterator[UserBatch]:
+        scan_params = {'TableName': self.table_name, 'Limit': batch_size, **_projection(fields)}
+        if self.scan_segments > 1:
+            items = []
+            async for item in parallel_scan(
+                self.client,
+                scan_params,
+                total_segments=self.scan_segments,
+                max_concurrency=self.scan_concurrency
+            ):
+                items.append(item)
+                if len(items) >= batch_size:
+                    yield self._items_to_batch(items)
+                    items = []
+            if items:
+                yield self._items_to_batch(items)
+            return
+
+        # Scan の1ページを1つのバッチにする
+        params = dict(scan_params)
+        while True:
+            response = await self.client.scan(**params)
+            items = response.get('Items', [])
+            if items:
+                yield self._items_to_batch(items)
+            last_key = response.get('LastEvaluatedKey')
+            if not last_key:
+                return
+            params['ExclusiveStartKey'] = last_key
+
+    async def parallel_scan(
+        self,
+        total_segments: Optional[int] = None,
+        max_concurrency: Optional[int] = None,
+        page_size: int = 1000
+    ) -> AsyncIterator[User]:
+        """テーブル全体を Segment/TotalSegments で分割して並列に走査する（順序は保証しない）"""
+        items = parallel_scan(
+            self.client,
+            {'TableName': self.table_name, 'Limit': page_size},
+            total_segments=total_segments or self.scan_segments,
+            max_concurrency=max_concurrency or self.scan_concurrency
+        )
+        async for item in items:
+            yield self._item_to_user(item)
+
+    def _email_item(self, email: str, user_id: str) -> dict:
+        return {'email': {'S': email}, 'user_id': {'S': user_id}}
+
+    def _reserve_email(self, email: str, user_id: str) -> dict:
+        # メールアドレスが未使用のときだけ予約する
+        return {'Put': {
+            'TableName': self.email_table_name,
+            'Item': self._email_item(email, user_id),
+            'ConditionExpression': 'attribute_not_exists(#email)',
+            'ExpressionAttributeNames': {'#email': 'email'},
+        }}
+
+    def _release_email(self, email: str, user_id: str) -> dict:
+        # 予約がないか、このユーザーの予約であるときだけ取り除く
+        return {'Delete': {
+            'TableName': self.email_table_name,
+            'Key': {'email': {'S': email}},
+            'ConditionExpression': 'attribute_not_exists(#email) OR #user_id = :user_id',
+            'ExpressionAttributeNames': {'#email': 'email', '#user_id': 'user_id'},
+            'ExpressionAttributeValues': {':user_id': {'S': user_id}},
+        }}
+
+    @staticmethod
+    def _cancellation_codes(error: ClientError) -> Optional[List[str]]:
+        """TransactWriteItems が取り消された場合に、各書き込みの理由コードを返す"""
+        if error.response.get('Error', {}).get('Code') != 'TransactionCanceledException':
+            return None
+        return [reason.get('Code', 'None') for reason in error.response.get('CancellationReasons', [])]
+
     async def create_user(self, user: User) -> User:
+        # ユーザーとメールアドレスの予約を1回の TransactWriteItems で書き込む（どちらかの条件に反すれば両方とも書き込まれない）
         try:
-            item = self._user_to_item(user)
-            self.table.put_item(Item=item)
+            await self.client.transact_write_items(TransactItems=[
+                {'Put': {
+                    'TableName': self.table_name,
+                    'Item': self._user_to_item(user),
+                    'ConditionExpression': 'attribute_not_exists(#id)',
+                    'ExpressionAttributeNames': {'#id': 'id'},
+                }},
+                self._reserve_email(user.email, user.id),
+            ])
+            user.mark_clean()
             return user
         except ClientError as e:
-            print(f"Error creating user: {e}")
-            raise
+            codes = self._cancellation_codes(e)
+            if codes is None:
+                print(f"Error creating user: {e}")
+                raise
+            if codes[1:2] == ['ConditionalCheckFailed']:
+                raise EmailAlreadyRegisteredError(EMAIL_ALREADY_REGISTERED)
+            if codes[:1] == ['ConditionalCheckFailed']:
+                raise ValueError("ユーザーIDが既に存在します")
+            raise ValueError(f"ユーザーを作成できませんでした（{', '.join(codes)}）")
+
+    async def create_users(self, users: Sequence[User]) -> BulkCreateResult:
+        """
+        ユーザーとメールアドレスの予約を、TRANSACT_USERS 人ずつの TransactWriteItems で create_user と同じ条件で書き込む
+        トランザクションが条件違反で取り消された場合は、違反したユーザーを errors に移して残りを書き込み直す
+        （BatchWriteItem は条件を指定できず、予約の重複を防げないため使わない。書き込みは1人あたり2件分の2倍のWCUを消費する）
+        """
+        if isinstance(users, UserBatch):
+            entries = [(row[0], row[1], self._row_to_item(row)) for row in users.rows()]
+        else:
+            entries = [(user.id, user.email, self._user_to_item(user)) for user in users]
+        errors: Dict[str, str] = {}
+        await asyncio.gather(*(
+            self._create_chunk(entries[start:start + self.TRANSACT_USERS], errors)
+            for start in range(0, len(entries), self.TRANSACT_USERS)
+        ))
+        result = BulkCreateResult.excluding(users, errors)
+        if not isinstance(users, UserBatch):
+            for user in result.created:
+                user.mark_clean()
+        return result
+
+    async def _create_chunk(self, entries: List[tuple], errors: Dict[str, str]) -> None:
+        # 1つのトランザクションで同じアイテムを2回書き込めないため、同じメールアドレスは先の行だけを書き込む
+        pending = []
+        emails = set()
+        for entry in entries:
+            if entry[1] in emails:
+                errors[entry[0]] = EMAIL_ALREADY_REGISTERED
+            else:
+                emails.add(entry[1])
+                pending.append(entry)
+        while pending:
+            transact_items = []
+            for user_id, email, item in pending:
+                transact_items.append({'Put': {
+                    'TableName': self.table_name,
+                    'Item': item,
+                    'ConditionExpression': 'attribute_not_exists(#id)',
+                    'ExpressionAttributeNames': {'#id': 'id'},
+                }})
+                transact_items.append(self._reserve_email(email, user_id))
+            try:
+                await self.client.transact_write_items(TransactItems=transact_items)
+                return
+            except ClientError as e:
+                codes = self._cancellation_codes(e)
+                if codes is None:
+                    print(f"Error creating users: {e}")
+                    for user_id, _, _ in pending:
+                        errors[user_id] = f"ユーザーを作成できませんでした（{e}）"
+                    return
+            remaining = []
+            for (user_id, email, item), user_code, email_code in zip(pending, codes[0::2], codes[1::2]):
+                if email_code == 'ConditionalCheckFailed':
+                    errors[user_id] = EMAIL_ALREADY_REGISTERED
+                elif user_code == 'ConditionalCheckFailed':
+                    errors[user_id] = "ユーザーIDが既に存在します"
+                else:
+                    remaining.append((user_id, email, item))
+            if len(remaining) == len(pending):
+                # 条件違反以外（他のトランザクションとの競合など）で取り消された
+                reason = f"ユーザーを作成できませんでした（{', '.join(sorted(set(codes) - {'None'}))}）"
+                for user_id, _, _ in pending:
+                    errors[user_id] = reason
+                return
+            pending = remaining
+
+    async def backfill_email_reservations(self, concurrency: int = 16) -> Dict[str, int]:
+        """
+        予約テーブルに予約がないユーザーの予約を作る（予約テーブルを導入する前に作成されたユーザー向け。何度実行してもよい）
+        他のユーザーが同じメールアドレスを予約している場合は作らずに conflicts に数え、両方のユーザーIDを表示する
+        """
+        counts = {"reserved": 0, "conflicts": 0}
+        semaphore = asyncio.Semaphore(concurrency)
+
+        async def reserve(user_id: str, email: str) -> None:
+            async with semaphore:
+                try:
+                    await self.client.put_item(
+                        TableName=self.email_table_name,
+                        Item=self._email_item(email, user_id),
+                        ConditionExpression='attribute_not_exists(#email) OR #user_id = :user_id',
+                        ExpressionAttributeNames={'#email': 'email', '#user_id': 'user_id'},
+                        ExpressionAttributeValues={':user_id': {'S': user_id}},
+                        ReturnValuesOnConditionCheckFailure='ALL_OLD'
+                    )
+                except ClientError as e:
+                    if e.response.get('Error', {}).get('Code') != 'ConditionalCheckFailedException':
+                        raise
+                    counts["conflicts"] += 1
+                    owner = _value(e.response.get('Item', {}).get('user_id'))
+                    print(f"Error reserving email: {email} of user {user_id} is reserved by user {owner}")
+                    return
+            counts["reserved"] += 1
+
+        async for batch in self.iter_user_batches(fields=("email",)):
+            await asyncio.gather(*(reserve(user_id, email) for user_id, email in zip(batch.ids, batch.emails)))
+        return counts
 
     async def update_user(self, user: User) -> User:
-        try:
-            user.updated_at = datetime.now()
-            item = self._user_to_item(user)
-            self.table.put_item(Item=item)
+        changes = user.changes()
+        if not changes:
             return user
+        updated_at = datetime.now()
+        await self._update_item(user.id, changes, user.version, updated_at, return_values='NONE')
+        user.version += 1
+        user.updated_at = updated_at
+        user.mark_clean()
+        return user
+
+    async def update_fields(
+        self,
+        user_id: str,
+        changes: Dict[str, Any],
+        expected_version: Optional[int] = None
+    ) -> User:
+        # 読み込まずに1回の UpdateItem で書き込み、更新後のアイテムをそのまま受け取る
+        check_update_fields(changes)
+        item = await self._update_item(user_id, changes, expected_version, datetime.now(), return_values='ALL_NEW')
+        return self._item_to_user(item)
+
+    def _update_params(
+        self,
+        user_id: str,
+        changes: Dict[str, Any],
+        expected_version: Optional[int],
+        updated_at: datetime
+    ) -> Dict[str, Any]:
+        """
+        changes の属性と updated_at だけを SET し、version を1増やす UpdateItem のパラメータ
+        expected_version を指定した場合は保存されている version が一致するときだけ書き込む
+        """
+        names = {'#id': 'id', '#updated_at': 'updated_at', '#version': 'version'}
+        values = {
+            ':updated_at': _attribute_value(updated_at),
+            ':zero': {'N': '0'},
+            ':one': {'N': '1'},
+        }
+        assignments = ['#updated_at = :updated_at', '#version = if_not_exists(#version, :zero) + :one']
+        for index, (name, value) in enumerate(changes.items()):
+            names[f'#f{index}'] = name
+            values[f':f{index}'] = _attribute_value(value)
+            assignments.append(f'#f{index} = :f{index}')
+
+        condition = 'attribute_exists(#id)'
+        if expected_version is not None:
+            values[':expected'] = {'N': str(expected_version)}
+            if expected_version == 0:
+                condition += ' AND (attribute_not_exists(#version) OR #version = :expected)'
+            else:
+                condition += ' AND #version = :expected'
+
+        return {
+            'TableName': self.table_name,
+            'Key': {'id': {'S': user_id}},
+            'UpdateExpression': 'SET ' + ', '.join(assignments),
+            'ConditionExpression': condition,
+            'ExpressionAttributeNames': names,
+            'ExpressionAttributeValues': values,
+            # 条件に反した場合に、存在しないのか version が違うのかを区別する
+            'ReturnValuesOnConditionCheckFailure': 'ALL_OLD',
+        }
+
+    async def _update_item(
+        self,
+        user_id: str,
+        changes: Dict[str, Any],
+        expected_version: Optional[int],
+        updated_at: datetime,
+        return_values: str
+    ) -> dict:
+        if 'email' in changes:
+            return await self._update_item_with_email(user_id, changes, expected_version, updated_at)
+        try:
+            response = await self.client.update_item(
+                **self._update_params(user_id, changes, expected_version, updated_at),
+                ReturnValues=return_values
+            )
+        except ClientError as e:
+            if e.response.get('Error', {}).get('Code') == 'ConditionalCheckFailedException':
+                if e.response.get('Item'):
+                    raise UserVersionConflictError("ユーザーは他の更新により変更されています")
+                raise UserNotFoundError("ユーザーが存在しません")
+            print(f"Error updating user: {e}")
+            raise
+        return response.get('Attributes', {})
+
+    async def _update_item_with_email(
+        self,
+        user_id: str,
+        changes: Dict[str, Any],
+        expected_version: Optional[int],
+        updated_at: datetime
+    ) -> dict:
+        """
+        メールアドレスの変更は、予約の付け替えと同じ TransactWriteItems で書き込む
+        旧アドレスを知るために先に読み込み、読み込んだ version を条件にする（トランザクションは更新後の値を返さないため、
+        読み込んだアイテムに変更を反映して返す）
+        """
+        try:
+            response = await self.client.get_item(
+                TableName=self.table_name,
+                Key={'id': {'S': user_id}},
+                ConsistentRead=True
+            )
         except ClientError as e:
             print(f"Error updating user: {e}")
             raise
+        current = response.get('Item')
+        if not current:
+            raise UserNotFoundError("ユーザーが存在しません")
+        version = _version(current.get('version'))
+        if expected_version is not None and version != expected_version:
+            raise UserVersionConflictError("ユーザーは他の更新により変更されています")
+
+        old_email, new_email = current['email']['S'], changes['email']
+        transact_items = [{'Update': self._update_params(user_id, changes, version, updated_at)}]
+        if new_email != old_email:
+            transact_items.append(self._reserve_email(new_email, user_id))
+            transact_items.append(self._release_email(old_email, user_id))
+        try:
+            await self.client.transact_write_items(TransactItems=transact_items)
+        except ClientError as e:
+            codes = self._cancellation_codes(e)
+            if codes is None:
+                print(f"Error updating user: {e}")
+                raise
+            if codes[1:2] == ['ConditionalCheckFailed']:
+                raise EmailAlreadyRegisteredError(EMAIL_ALREADY_REGISTERED)
+            if codes[:1] == ['ConditionalCheckFailed']:
+                raise UserVersionConflictError("ユーザーは他の更新により変更されています")
+            raise ValueError(f"ユーザーを更新できませんでした（{', '.join(codes)}）")
+
+        item = dict(current)
+        for name, value in changes.items():
+            item[name] = _attribute_value(value)
+        item['updated_at'] = _attribute_value(updated_at)
+        item['version'] = {'N': str(version + 1)}
+        return item
 
     async def delete_user(self, user_id: str) -> bool:
         try:
-            self.table.delete_item(
-                Key={'id': user_id},
-                ConditionExpression='attribute_exists(id)'
+            response = await self.client.delete_item(
+                TableName=self.table_name,
+                Key={'id': {'S': user_id}},
+                ConditionExpression='attribute_exists(id)',
+                ReturnValues='ALL_OLD'
             )
-            return True
         except ClientError as e:
             print(f"Error deleting user: {e}")
             return False
+        email = response.get('Attributes', {}).get('email', {}).get('S')
+        if email:
+            # 予約の削除に失敗してもユーザーの削除は取り消さない（そのメールアドレスが再利用できないだけ）
+            try:
+                await self.client.delete_item(**self._release_email(email, user_id)['Delete'])
+            except ClientError as e:
+                print(f"Error releasing email: {e}")
+        return True
+
+    @staticmethod
+    def _encode_cursor(last_evaluated_key: Optional[dict]) -> Optional[str]:
+        if not last_evaluated_key:
+            return None
+        raw = json.dumps(last_evaluated_key, separators=(',', ':')).encode('utf-8')
+        return base64.urlsafe_b64encode(raw).decode('ascii').rstrip('=')
+
+    @staticmethod
+    def _decode_cursor(cursor: str) -> dict:
+        try:
+            padded = cursor + '=' * (-len(cursor) % 4)
+            key = json.loads(base64.urlsafe_b64decode(padded.encode('ascii')))
+        except (ValueError, UnicodeEncodeError):
+            raise ValueError("無効なカーソルです")
+        # テーブルのキー（id）以外を含むカーソルは ExclusiveStartKey として使えないため、改ざんとみなす
+        if not isinstance(key, dict) or set(key) != {'id'} or not isinstance(key['id'], dict) \
+                or set(key['id']) != {'S'} or not isinstance(key['id']['S'], str) or not key['id']['S']:
+            raise ValueError("無効なカーソルです")
+        return key
 
     def _user_to_item(self, user: User) -> dict:
-        return {
-            'id': user.id,
-            'email': user.email,
-            'username': user.username,
-            'is_active': user.is_active,
-            'created_at': user.created_at.isoformat(),
-            'updated_at': user.updated_at.isoformat() if user.updated_at else None,
-            'last_login': user.last_login.isoformat() if user.last_login else None
+        return self._row_to_item(user.raw_values())
+
+    @staticmethod
+    def _row_to_item(row: tuple) -> dict:
+        # 日時は未解析の文字列ならそのまま書き込む
+        user_id, email, username, password_hash, is_active, roles, created_at, updated_at, last_login, version = row
+        item = {
+            'id': user_id,
+            'email': email,
+            'username': username,
+            'password_hash': password_hash,
+            'is_active': is_active,
+            'roles': list(roles),
+            'created_at': created_at.isoformat() if isinstance(created_at, datetime) else created_at,
+            'updated_at': updated_at.isoformat() if isinstance(updated_at, datetime) else updated_at,
+            'last_login': last_login.isoformat() if isinstance(last_login, datetime) else last_login,
+            'version': version
         }
+        return {key: _serializer.serialize(value) for key, value in item.items()}
 
     def _item_to_user(self, item: dict) -> User:
+        # 日時は文字列のまま渡し、参照されたときに User 側で解析する
+        # 射影して読み込んだアイテムにない属性は None（パスワードハッシュは空文字列、ロールは空）になる
         return User(
-            id=item['id'],
-            email=item['email'],
-            username=item['username'],
-            is_active=item['is_active'],
-            created_at=datetime.fromisoformat(item['created_at']),
-            updated_at=datetime.fromisoformat(item['updated_at']) if item.get('updated_at') else None,
-            last_login=datetime.fromisoformat(item['last_login']) if item.get('last_login') else None
-        ) 
\ No newline at end of file
+            id=item['id']['S'],
+            email=_value(item.get('email')),
+            username=_value(item.get('username')),
+            password_hash=_value(item.get('password_hash')) or '',
+            is_active=_value(item.get('is_active')),
+            roles=_roles(item.get('roles')),
+            created_at=_value(item['created_at']),
+            updated_at=_value(item.get('updated_at')),
+            last_login=_value(item.get('last_login')),
+            version=_version(item.get('version'))
+        )
+
+    def _items_to_batch(self, items: List[dict]) -> UserBatch:
+        batch = UserBatch()
+        for item in items:
+            batch.append(
+                item['id']['S'],
+                _value(item.get('email')),
+                _value(item.get('username')),
+                _value(item.get('password_hash')) or '',
+                _value(item.get('is_active')),
+                _roles(item.get('roles')),
+                _value(item['created_at']),
+                _value(item.get('updated_at')),
+                _value(item.get('last_login')),
+                _version(item.get('version'))
+            )
+        return batch
@@ -0,0 +1,382 @@
+import asyncio
+import base64
+import os
+import pickle
+import tempfile
+import uuid
+from bisect import bisect_left, bisect_right, insort
+from datetime import datetime
+from typing import Any, AsyncIterator, Dict, List, Optional, Sequence, Tuple
+
+from app.domain.user import User, UserBatch
+from app.domain.user import BulkCreateResult, EmailAlreadyRegisteredError, UserNotFoundError, UserPage, UserRepository, UserVersionConflictError
+from app.domain.user.repository import EMAIL_ALREADY_REGISTERED, check_update_fields
+
+# スナップショットファイルの形式バージョン（各行は _to_row の順のタプル）
+SNAPSHOT_VERSION = 1
+
+# これより多い件数をまとめて追加する場合は、1件ずつ挿入せずに索引を作り直す
+_BULK_REBUILD_THRESHOLD = 1000
+
+_SnapshotRow = tuple
+
+
+class InMemoryUserRepository(UserRepository):
+    """
+    プロセス内のメモリにユーザーを保持するリポジトリ
+
+    - id と email はハッシュ索引、username は（正規化した username, id）のソート済み索引を持つ
+    - ページングは id 順で、カーソルは最後に返した id をエンコードした不透明な文字列
+    - 書き込みは asyncio.Lock の下で条件を確認してから反映する
+      （create_user は id・メールアドレスの重複、update_user / update_fields は存在・version・メールアドレスの重複を確認し、違反は ValueError）
+    - 更新は変更されたフィールドだけを保存内容に反映し、version を1増やす
+    - save_snapshot / load_snapshot でファイルに保存・復元できる
+    - 書き込みのたびに増えるカウンタを持ち、collection_revision で集合の版として返す
+    - 返すユーザーは常に複製で、呼び出し側での変更は保存内容に影響しない
+      （list_users_page / iter_user_batches は値を写した UserBatch を返すため、1件ずつの複製を作らない）
+    AUTH_TYPE=local の既定のバックエンドであり、ベンチマークではレイテンシ0の基準として使います
+    """
+
+    def __init__(self, users: Optional[List[User]] = None):
+        self._users: Dict[str, User] = {}
+        self._ids_by_email: Dict[str, str] = {}
+        self._sorted_ids: List[str] = []
+        self._username_index: List[Tuple[str, str]] = []
+        self._lock = asyncio.Lock()
+        # インスタンスごとの識別子と書き込み回数（再起動後に以前の版と取り違えないよう識別子を含める）
+        self._epoch = uuid.uuid4().hex[:12]
+        self._revision = 0
+        if users:
+            self._bulk_put(users)
+
+    def __len__(self) -> int:
+        return len(self._users)
+
+    @staticmethod
+    def _copy(user: User) -> User:
+        return user.copy()
+
+    @staticmethod
+    def _username_key(username: str) -> str:
+        return username.casefold()
+
+    @staticmethod
+    def _encode_cursor(last_id: str) -> str:
+        return base64.urlsafe_b64encode(last_id.encode("utf-8")).decode("ascii").rstrip("=")
+
+    @staticmethod
+    def _decode_cursor(cursor: str) -> str:
+        try:
+            padded = cursor + "=" * (-len(cursor) % 4)
+            last_id = base64.b64decode(padded.encode("ascii"), altchars=b"-_", validate=True).decode("utf-8")
+        except (ValueError, UnicodeError):
+            raise ValueError("無効なカーソルです")
+        if not last_id:
+            raise ValueError("無効なカーソルです")
+        return last_id
+
+    # --- 索引の更新（いずれもロック内、またはイベントループ外からの初期化時にのみ呼ぶ） ---
+
+    def _index(self, user: User) -> None:
+        self._revision += 1
+        self._users[user.id] = user
+        self._ids_by_email[user.email] = user.id
+        insort(self._sorted_ids, user.id)
+        insort(self._username_index, (self._username_key(user.username), user.id))
+
+    def _unindex(self, user: User) -> None:
+        self._revision += 1
+        del self._users[user.id]
+        if self._ids_by_email.get(user.email) == user.id:
+            del self._ids_by_email[user.email]
+        position = bisect_left(self._sorted_ids, user.id)
+        del self._sorted_ids[position]
+        position = bisect_left(self._username_index, (self._username_key(user.username), user.id))
+        del self._username_index[position]
+
+    def _bulk_put(self, users: Sequence[User]) -> None:
+        # UserBatch から取り出した User は新しいインスタンスなので複製しない
+        owned = isinstance(users, UserBatch)
+        if len(users) < _BULK_REBUILD_THRESHOLD:
+            for user in users:
+                existing = self._users.get(user.id)
+                if existing is not None:
+                    self._unindex(existing)
+                self._index(user if owned else self._copy(user))
+            return
+        for user in users:
+            existing = self._users.get(user.id)
+            if existing is not None and self._ids_by_email.get(existing.email) == user.id:
+                del self._ids_by_email[existing.email]
+            self._users[user.id] = user if owned else self._copy(user)
+            self._ids_by_email[user.email] = user.id
+        self._revision += 1
+        self._rebuild_sorted_indexes()
+
+    def _rebuild_sorted_indexes(self) -> None:
+        self._sorted_ids = sorted(self._users)
+        self._username_index = sorted(
+            (self._username_key(user.username), user.id) for user in self._users.values()
+        )
+
+    # --- 読み取り ---
+
+    # メモリ上では全フィールドを返しても読み込みのコストは変わらないため、fields は使わない
+
+    async def get_by_id(
+        self,
+        user_id: str,
+        fields: Optional[Sequence[str]] = None,
+        consistent: bool = False
+    ) -> Optional[User]:
+        user = self._users.get(user_id)
+        return self._copy(user) if user else None
+
+    async def get_many(
+        self,
+        user_ids: List[str],
+        fields: Optional[Sequence[str]] = None
+    ) -> List[Optional[User]]:
+        return [
+            self._copy(self._users[user_id]) if user_id in self._users else None
+            for user_id in user_ids
+        ]
+
+    async def get_revision(self, user_id: str) -> Optional[str]:
+        user = self._users.get(user_id)
+        return user.revision() if user else None
+
+    async def collection_revision(self) -> Optional[str]:
+        return f"{self._epoch}-{self._revision}"
+
+    async def get_by_email(self, email: str) -> Optional[User]:
+        user_id = self._ids_by_email.get(email)
+        return self._copy(self._users[user_id]) if user_id else None
+
+    async def find_by_username_prefix(self, prefix: str, limit: int = 20) -> List[User]:
+        """username の前方一致でユーザーを返す（大文字小文字を区別しない、username 順）"""
+        key = self._username_key(prefix)
+        users = []
+        position = bisect_left(self._username_index, (key, ""))
+        while position < len(self._username_index) and len(users) < limit:
+            username, user_id = self._username_index[position]
+            if not username.startswith(key):
+                break
+            users.append(self._copy(self._users[user_id]))
+            position += 1
+        return users
+
+    async def list_users(self) -> List[User]:
+        return [self._copy(self._users[user_id]) for user_id in self._sorted_ids]
+
+    async def list_users_page(
+        self,
+        limit: int,
+        cursor: Optional[str] = None,
+        fields: Optional[Sequence[str]] = None
+    ) -> UserPage:
+        start = bisect_right(self._sorted_ids, self._decode_cursor(cursor)) if cursor else 0
+        page_ids = self._sorted_ids[start:start + limit]
+        has_more = start + limit < len(self._sorted_ids)
+        return UserPage(
+            items=UserBatch.from_users(self._users[user_id] for user_id in page_ids),
+            next_cursor=self._encode_cursor(page_ids[-1]) if has_more and page_ids else None
+        )
+
+    async def iter_users(self, page_size: int = 1000) -> AsyncIterator[User]:
+        # ページごとに直前のIDの次から取り出すため、走査中の書き込みがあっても位置を見失わない
+        last_id: Optional[str] = None
+        while True:
+            start = bisect_right(self._sorted_ids, last_id) if last_id is not None else 0
+            page_ids = self._sorted_ids[start:start + page_size]
+            if not page_ids:
+                return
+            for user_id in page_ids:
+                user = self._users.get(user_id)
+                if user is not None:
+                    yield self._copy(user)
+            last_id = page_ids[-1]
+            # 大きなテーブルの走査中も他のリクエストを処理できるようにする
+            await asyncio.sleep(0)
+
+    async def iter_user_batches(
+        self,
+        batch_size: int = 1000,
+        fields: Optional[Sequence[str]] = None
+    ) -> AsyncIterator[UserBatch]:
+        last_id: Optional[str] = None
+        while True:
+            start = bisect_right(self._sorted_ids, last_id) if last_id is not None else 0
+            page_ids = self._sorted_ids[start:start + batch_size]
+            if not page_ids:
+                return
+            yield UserBatch.from_users(
+                self._users[user_id] for user_id in page_ids if user_id in self._users
+            )
+            last_id = page_ids[-1]
+            await asyncio.sleep(0)
+
+    # --- 書き込み ---
+
+    async def create_user(self, user: User) -> User:
+        async with self._lock:
+            if user.id in self._users:
+                raise ValueError("ユーザーIDが既に存在します")
+            if user.email in self._ids_by_email:
+                raise EmailAlreadyRegisteredError(EMAIL_ALREADY_REGISTERED)
+            self._index(self._copy(user))
+        # 保存した内容と一致するため、以降の update_user では変更したフィールドだけを書き込む
+        user.mark_clean()
+        return user
+
+    async def create_users(self, users: Sequence[User]) -> BulkCreateResult:
+        # create_user と同じ条件で、既存のID・使用済みのメールアドレスのユーザーを除いて書き込む
+        if isinstance(users, UserBatch):
+            keys = zip(users.ids, users.emails)
+        else:
+            keys = ((user.id, user.email) for user in users)
+        async with self._lock:
+            errors: Dict[str, str] = {}
+            reserved = set()
+            for user_id, email in keys:
+                if user_id in self._users:
+                    errors[user_id] = "ユーザーIDが既に存在します"
+                elif email in self._ids_by_email or email in reserved:
+                    errors[user_id] = EMAIL_ALREADY_REGISTERED
+                else:
+                    reserved.add(email)
+            result = BulkCreateResult.excluding(users, errors)
+            self._bulk_put(result.created)
+        return result
+
+    def _checked_existing(self, user_id: str, expected_version: Optional[int]) -> User:
+        existing = self._users.get(user_id)
+        if existing is None:
+            raise UserNotFoundError("ユーザーが存在しません")
+        if expected_version is not None and existing.version != expected_version:
+            raise UserVersionConflictError("ユーザーは他の更新により変更されています")
+        return existing
+
+    def _apply(self, existing: User, changes: Dict[str, Any]) -> User:
+        # ロック内で呼ぶ。変更したフィールドだけを反映した新しいインスタンスで置き換える
+        if "email" in changes:
+            owner = self._ids_by_email.get(changes["email"])
+            if owner is not None and owner != existing.id:
+                raise EmailAlreadyRegisteredError(EMAIL_ALREADY_REGISTERED)
+        if "roles" in changes:
+            changes = dict(changes, roles=list(changes["roles"]))
+        updated = existing.copy(**changes)
+        updated.version = existing.version + 1
+        updated.updated_at = datetime.now()
+        self._unindex(existing)
+        self._index(updated)
+        return updated
+
+    async def update_user(self, user: User) -> User:
+        changes = user.changes()
+        async with self._lock:
+            existing = self._checked_existing(user.id, user.version)
+            if not changes:
+                return user
+            updated = self._apply(existing, changes)
+        user.version = updated.version
+        user.updated_at = updated.updated_at
+        user.mark_clean()
+        return user
+
+    async def update_fields(
+        self,
+        user_id: str,
+        changes: Dict[str, Any],
+        expected_version: Optional[int] = None
+    ) -> User:
+        check_update_fields(changes)
+        async with self._lock:
+            existing = self._checked_existing(user_id, expected_version)
+            updated = self._apply(existing, changes) if changes else existing
+        return self._copy(updated)
+
+    async def delete_user(self, user_id: str) -> bool:
+        async with self._lock:
+            existing = self._users.get(user_id)
+            if existing is None:
+                return False
+            self._unindex(existing)
+        return True
+
+    # --- スナップショット ---
+
+    @staticmethod
+    def _to_row(user: User) -> _SnapshotRow:
+        # 日時は未解析の文字列ならそのまま保存する
+        user_id, email, username, password_hash, is_active, roles, created_at, updated_at, last_login, version = \
+            user.raw_values()
+        return (
+            user_id, email, username, password_hash, is_active,
+            tuple(roles), created_at, updated_at, last_login, version,
+        )
+
+    @staticmethod
+    def _from_row(row: _SnapshotRow) -> User:
+        user_id, email, username, password_hash, is_active, roles, created_at, updated_at, last_login, version = row
+        return User(
+            id=user_id,
+            email=email,
+            username=username,
+            password_hash=password_hash,
+            is_active=is_active,
+            roles=list(roles),
+            created_at=created_at,
+            updated_at=updated_at,
+            last_login=last_login,
+            version=version
+        )
+
+    async def save_snapshot(self, path: str) -> int:
+        """全ユーザーをファイルに保存し、保存した件数を返す（書き出しはスレッドで行う）"""
+        async with self._lock:
+            rows = [self._to_row(user) for user in self._users.values()]
+        await asyncio.to_thread(_write_snapshot, path, rows)
+        return len(rows)
+
+    async def load_snapshot(self, path: str) -> int:
+        """
+        ファイルから全ユーザーを読み込み、現在の内容を置き換える
+        スナップショットは pickle 形式のため、自分で保存した信頼できるファイルのみを読み込むこと
+        """
+        loaded = await asyncio.to_thread(self._load_state, path)
+        async with self._lock:
+            self._users, self._ids_by_email, self._sorted_ids, self._username_index = loaded
+            self._revision += 1
+        return len(self._users)
+
+    @classmethod
+    def _load_state(cls, path: str) -> tuple:
+        # ファイルの読み込みから索引の構築まで、イベントループを止めないようスレッドで行う
+        users = {row[0]: cls._from_row(row) for row in _read_snapshot(path)}
+        ids_by_email = {user.email: user.id for user in users.values()}
+        username_index = sorted((cls._username_key(user.username), user.id) for user in users.values())
+        return users, ids_by_email, sorted(users), username_index
+
+
+def _write_snapshot(path: str, rows: List[_SnapshotRow]) -> None:
+    directory = os.path.dirname(os.path.abspath(path))
+    fd, tmp_path = tempfile.mkstemp(dir=directory, prefix=".users_snapshot_")
+    try:
+        with os.fdopen(fd, "wb") as f:
+            pickle.dump({"version": SNAPSHOT_VERSION, "users": rows}, f, protocol=pickle.HIGHEST_PROTOCOL)
+        os.replace(tmp_path, path)
+    except Exception:
+        try:
+            os.unlink(tmp_path)
+        except OSError:
+            pass
+        raise
+
+
+def _read_snapshot(path: str) -> List[_SnapshotRow]:
+    with open(path, "rb") as f:
+        data = pickle.load(f)
+    if not isinstance(data, dict) or data.get("version") != SNAPSHOT_VERSION:
+        raise ValueError(f"Unsupported user snapshot: {path}")
+    return data["users"]
@@ -0,0 +1,133 @@
+import time
+from contextlib import asynccontextmanager, contextmanager
+from typing import Any, AsyncIterator, Dict, Iterator, List, Optional, Sequence
+
+from app.domain.user import User, UserBatch
+from app.domain.user import BulkCreateResult, UserPage, UserRepository
+from app.infrastructure.metrics import MetricsRegistry
+
+# リポジトリ呼び出しは HTTP より短いので、下側のバケットを細かくとる
+REPOSITORY_BUCKETS = (
+    0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0
+)
+
+
+@asynccontextmanager
+async def _aclosing(iterator: AsyncIterator[Any]) -> AsyncIterator[AsyncIterator[Any]]:
+    # contextlib.aclosing（Python 3.10 以降）の代わり。抜けるときに非同期ジェネレーターを閉じる
+    try:
+        yield iterator
+    finally:
+        await iterator.aclose()
+
+
+class InstrumentedUserRepository(UserRepository):
+    """
+    任意の UserRepository をラップし、操作ごとの呼び出し回数と処理時間を記録する
+
+    - user_repository_call_duration_seconds: 操作名（get_by_id など）と結果（ok / error）ごとの処理時間
+    - iter_users / iter_user_batches は最後の1件を返し終えるまで（または呼び出し側が途中で止めるまで）を1回として計測する
+    """
+
+    def __init__(self, repository: UserRepository, registry: MetricsRegistry):
+        self.repository = repository
+        self.call_duration = registry.histogram(
+            "user_repository_call_duration_seconds",
+            "User repository call latency by operation and outcome.",
+            ("operation", "outcome"),
+            buckets=REPOSITORY_BUCKETS
+        )
+
+    @contextmanager
+    def _measure(self, operation: str) -> Iterator[None]:
+        start_time = time.perf_counter()
+        outcome = "error"
+        try:
+            yield
+            outcome = "ok"
+        except GeneratorExit:
+            # 呼び出し側が iter_users を途中で止めた場合はエラーとして扱わない
+            outcome = "ok"
+            raise
+        finally:
+            self.call_duration.observe((operation, outcome), time.perf_counter() - start_time)
+
+    async def create_user(self, user: User) -> User:
+        with self._measure("create_user"):
+            return await self.repository.create_user(user)
+
+    async def create_users(self, users: Sequence[User]) -> BulkCreateResult:
+        with self._measure("create_users"):
+            return await self.repository.create_users(users)
+
+    async def get_by_id(
+        self,
+        user_id: str,
+        fields: Optional[Sequence[str]] = None,
+        consistent: bool = False
+    ) -> Optional[User]:
+        with self._measure("get_by_id"):
+            return await self.repository.get_by_id(user_id, fields=fields, consistent=consistent)
+
+    async def get_many(
+        self,
+        user_ids: List[str],
+        fields: Optional[Sequence[str]] = None
+    ) -> List[Optional[User]]:
+        with self._measure("get_many"):
+            return await self.repository.get_many(user_ids, fields=fields)
+
+    async def get_by_email(self, email: str) -> Optional[User]:
+        with self._measure("get_by_email"):
+            return await self.repository.get_by_email(email)
+
+    async def get_revision(self, user_id: str) -> Optional[str]:
+        with self._measure("get_revision"):
+            return await self.repository.get_revision(user_id)
+
+    async def collection_revision(self) -> Optional[str]:
+        with self._measure("collection_revision"):
+            return await self.repository.collection_revision()
+
+    async def update_user(self, user: User) -> User:
+        with self._measure("update_user"):
+            return await self.repository.update_user(user)
+
+    async def update_fields(
+        self, user_id: str, changes: Dict[str, Any], expected_version: Optional[int] = None
+    ) -> User:
+        with self._measure("update_fields"):
+            return await self.repository.update_fields(user_id, changes, expected_version)
+
+    async def delete_user(self, user_id: str) -> bool:
+        with self._measure("delete_user"):
+            return await self.repository.delete_user(user_id)
+
+    async def list_users(self) -> List[User]:
+        with self._measure("list_users"):
+            return await self.repository.list_users()
+
+    async def list_users_page(
+        self,
+        limit: int,
+        cursor: Optional[str] = None,
+        fields: Optional[Sequence[str]] = None
+    ) -> UserPage:
+        with self._measure("list_users_page"):
+            return await self.repository.list_users_page(limit=limit, cursor=cursor, fields=fields)
+
+    async def iter_users(self, page_size: int = 1000) -> AsyncIterator[User]:
+        with self._measure("iter_users"):
+            async with _aclosing(self.repository.iter_users(page_size=page_size)) as users:
+                async for user in users:
+                    yield user
+
+    async def iter_user_batches(
+        self,
+        batch_size: int = 1000,
+        fields: Optional[Sequence[str]] = None
+    ) -> AsyncIterator[UserBatch]:
+        with self._measure("iter_user_batches"):
+            async with _aclosing(self.repository.iter_user_batches(batch_size=batch_size, fields=fields)) as batches:
+                async for batch in batches:
+                    yield batch
@@ -0,0 +1,93 @@
+from typing import Any, AsyncIterator, Dict, List, Optional, Sequence
+
+from app.domain.user import User, UserBatch
+from app.domain.user import BulkCreateResult, UserPage, UserRepository
+from app.infrastructure.search import UserSearchIndex
+
+
+class SearchIndexingUserRepository(UserRepository):
+    """
+    任意の UserRepository をラップし、成功した書き込みを UserSearchIndex に反映する
+
+    - create_user / create_users / update_user / update_fields / delete_user の結果を索引に反映する
+    - 読み込みはそのまま委譲する
+    - 索引はプロセス内のみのため、他ワーカーの書き込みは次の再読み込み（load）まで反映されない
+      （アプリケーションは USER_SEARCH_RELOAD_INTERVAL_SECONDS ごとに作り直す）
+    """
+
+    def __init__(self, repository: UserRepository, index: UserSearchIndex):
+        self.repository = repository
+        self.index = index
+
+    async def create_user(self, user: User) -> User:
+        created = await self.repository.create_user(user)
+        self.index.apply(created)
+        return created
+
+    async def create_users(self, users: Sequence[User]) -> BulkCreateResult:
+        result = await self.repository.create_users(users)
+        self.index.apply_many(result.created)
+        return result
+
+    async def update_user(self, user: User) -> User:
+        updated = await self.repository.update_user(user)
+        self.index.apply(updated)
+        return updated
+
+    async def update_fields(
+        self, user_id: str, changes: Dict[str, Any], expected_version: Optional[int] = None
+    ) -> User:
+        updated = await self.repository.update_fields(user_id, changes, expected_version)
+        self.index.apply(updated)
+        return updated
+
+    async def delete_user(self, user_id: str) -> bool:
+        deleted = await self.repository.delete_user(user_id)
+        if deleted:
+            self.index.remove(user_id)
+        return deleted
+
+    async def get_by_id(
+        self,
+        user_id: str,
+        fields: Optional[Sequence[str]] = None,
+        consistent: bool = False
+    ) -> Optional[User]:
+        return await self.repository.get_by_id(user_id, fields=fields, consistent=consistent)
+
+    async def get_many(
+        self,
+        user_ids: List[str],
+        fields: Optional[Sequence[str]] = None
+    ) -> List[Optional[User]]:
+        return await self.repository.get_many(user_ids, fields=fields)
+
+    async def get_by_email(self, email: str) -> Optional[User]:
+        return await self.repository.get_by_email(email)
+
+    async def get_revision(self, user_id: str) -> Optional[str]:
+        return await self.repository.get_revision(user_id)
+
+    async def collection_revision(self) -> Optional[str]:
+        return await self.repository.collection_revision()
+
+    async def list_users(self) -> List[User]:
+        return await self.repository.list_users()
+
+    async def list_users_page(
+        self,
+        limit: int,
+        cursor: Optional[str] = None,
+        fields: Optional[Sequence[str]] = None
+    ) -> UserPage:
+        return await self.repository.list_users_page(limit=limit, cursor=cursor, fields=fields)
+
+    def iter_users(self, page_size: int = 1000) -> AsyncIterator[User]:
+        return self.repository.iter_users(page_size=page_size)
+
+    def iter_user_batches(
+        self,
+        batch_size: int = 1000,
+        fields: Optional[Sequence[str]] = None
+    ) -> AsyncIterator[UserBatch]:
+        return self.repository.iter_user_batches(batch_size=batch_size, fields=fields)
@@ -0,0 +1,3 @@
+from app.infrastructure.search.user_search_index import SEARCH_FIELDS, UserSearchIndex
+
+__all__ = ["SEARCH_FIELDS", "UserSearchIndex"]
@@ -0,0 +1,185 @@
+from bisect import bisect_left, bisect_right
+from typing import Any, AsyncIterator, Dict, List, Optional, Sequence, Set, Tuple
+
+from app.domain.user import User, UserBatch
+
+# 索引に読み込むフィールド（リポジトリにはこのフィールドだけを射影して読ませる）
+SEARCH_FIELDS: Tuple[str, ...] = ("id", "username", "email", "is_active", "roles")
+
+# これより多い件数をまとめて反映する場合は、1件ずつ挿入せずに配列を作り直す
+_BULK_REBUILD_THRESHOLD = 1000
+
+# (username, email, is_active, roles)
+_Entry = Tuple[str, str, bool, Tuple[str, ...]]
+
+
+def _search_key(value: Optional[str]) -> str:
+    # 大文字小文字を区別しない。casefold しても変わらない場合は元の文字列を共有する
+    value = value or ""
+    folded = value.casefold()
+    return value if folded == value else folded
+
+
+class _SortedKeys:
+    """キーの昇順に並べたキーとIDの2本のリスト（タプルを作らずに済むよう別々に持つ）"""
+
+    __slots__ = ("keys", "ids")
+
+    def __init__(self, pairs: Sequence[Tuple[str, str]] = ()):
+        self.keys: List[str] = [key for key, _ in pairs]
+        self.ids: List[str] = [user_id for _, user_id in pairs]
+
+    def insert(self, key: str, user_id: str) -> None:
+        position = bisect_right(self.keys, key)
+        self.keys.insert(position, key)
+        self.ids.insert(position, user_id)
+
+    def remove(self, key: str, user_id: str) -> None:
+        start = bisect_left(self.keys, key)
+        end = bisect_right(self.keys, key, start)
+        position = self.ids.index(user_id, start, end)
+        del self.keys[position]
+        del self.ids[position]
+
+
+class UserSearchIndex:
+    """
+    username / email の前方一致でユーザーを探すプロセス内の索引（管理画面の入力補完向け）
+
+    - casefold した username と email のそれぞれについてキーの昇順に並べた配列を持ち、
+      二分探索で前方一致の先頭を求めてから順に走査する（1回の検索は O(log n + 走査件数)）
+    - 各ユーザーの username / email / is_active / roles を持ち、検索結果はリポジトリを読まずに返す
+    - load でリポジトリの全件から作り直し、以降は apply / remove で書き込みを1件ずつ反映する
+      （load の途中に反映された書き込みは、読み込んだ内容より優先する）
+    - is_active / role で絞り込む場合の走査は max_scan 件で打ち切る（条件に合うユーザーが少ないと limit 件に満たないことがある）
+    - asyncio の単一スレッド上で使うことを前提とし、ロックは持たない
+    """
+
+    def __init__(self, max_scan: int = 10000):
+        self.max_scan = max_scan
+        self._entries: Dict[str, _Entry] = {}
+        self._usernames = _SortedKeys()
+        self._emails = _SortedKeys()
+        self._roles: Dict[Tuple[str, ...], Tuple[str, ...]] = {}
+        # load の途中に apply / remove されたID（load 中でなければNone）
+        self._touched: Optional[Set[str]] = None
+        # 最初の load が終わるまでは False（検索結果が揃っていない）
+        self.ready = False
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def _entry(self, username: str, email: str, is_active: bool, roles: Sequence[str]) -> _Entry:
+        # 同じロールの組み合わせは1つのタプルを共有する
+        key = tuple(roles or ())
+        return username or "", email or "", bool(is_active), self._roles.setdefault(key, key)
+
+    def _rebuild(self) -> None:
+        entries = self._entries
+        self._usernames = _SortedKeys(sorted((_search_key(entry[0]), user_id) for user_id, entry in entries.items()))
+        self._emails = _SortedKeys(sorted((_search_key(entry[1]), user_id) for user_id, entry in entries.items()))
+
+    # --- 読み込みと更新 ---
+
+    async def load(self, batches: AsyncIterator[UserBatch]) -> int:
+        """リポジトリの全件（iter_user_batches(fields=SEARCH_FIELDS)）から索引を作り直し、件数を返す"""
+        self._touched = set()
+        entries: Dict[str, _Entry] = {}
+        try:
+            async for batch in batches:
+                for user_id, username, email, is_active, roles in zip(
+                    batch.ids, batch.usernames, batch.emails, batch.is_active, batch.roles
+                ):
+                    entries[user_id] = self._entry(username, email, is_active, roles)
+            # 読み込み中に書き込まれたユーザーは、索引に反映済みの内容（削除を含む）を使う
+            for user_id in self._touched:
+                live = self._entries.get(user_id)
+                if live is None:
+                    entries.pop(user_id, None)
+                else:
+                    entries[user_id] = live
+        finally:
+            self._touched = None
+        self._entries = entries
+        self._rebuild()
+        self.ready = True
+        return len(entries)
+
+    def apply(self, user: User) -> None:
+        """作成・更新されたユーザーを反映する"""
+        if self._touched is not None:
+            self._touched.add(user.id)
+        entry = self._entry(user.username, user.email, user.is_active, user.roles)
+        existing = self._entries.get(user.id)
+        self._entries[user.id] = entry
+        # 配列への挿入・削除は O(n) のため、キーが変わった配列だけを更新する
+        for position, index in ((0, self._usernames), (1, self._emails)):
+            if existing is not None:
+                if existing[position] == entry[position]:
+                    continue
+                index.remove(_search_key(existing[position]), user.id)
+            index.insert(_search_key(entry[position]), user.id)
+
+    def apply_many(self, users: Sequence[User]) -> None:
+        """まとめて作成されたユーザーを反映する（件数が多い場合は配列を作り直す）"""
+        if len(users) < _BULK_REBUILD_THRESHOLD:
+            for user in users:
+                self.apply(user)
+            return
+        if isinstance(users, UserBatch):
+            rows = zip(users.ids, users.usernames, users.emails, users.is_active, users.roles)
+        else:
+            rows = ((user.id, user.username, user.email, user.is_active, user.roles) for user in users)
+        for user_id, username, email, is_active, roles in rows:
+            if self._touched is not None:
+                self._touched.add(user_id)
+            self._entries[user_id] = self._entry(username, email, is_active, roles)
+        self._rebuild()
+
+    def remove(self, user_id: str) -> None:
+        """削除されたユーザーを取り除く"""
+        if self._touched is not None:
+            self._touched.add(user_id)
+        existing = self._entries.pop(user_id, None)
+        if existing is not None:
+            self._usernames.remove(_search_key(existing[0]), user_id)
+            self._emails.remove(_search_key(existing[1]), user_id)
+
+    # --- 検索 ---
+
+    def search(
+        self,
+        query: str,
+        limit: int = 20,
+        is_active: Optional[bool] = None,
+        role: Optional[str] = None
+    ) -> List[Dict[str, Any]]:
+        """
+        username または email が query で始まるユーザーを最大 limit 件返す（大文字小文字を区別しない）
+        username で一致したユーザーを username 順に、続けて email だけで一致したユーザーを email 順に返す
+        """
+        prefix = query.casefold()
+        results: Dict[str, Dict[str, Any]] = {}
+        for index in (self._usernames, self._emails):
+            keys, ids = index.keys, index.ids
+            position = bisect_left(keys, prefix)
+            end = min(len(keys), position + self.max_scan)
+            while position < end and len(results) < limit:
+                if not keys[position].startswith(prefix):
+                    break
+                user_id = ids[position]
+                position += 1
+                if user_id in results:
+                    continue
+                username, email, active, roles = self._entries[user_id]
+                if is_active is not None and active != is_active:
+                    continue
+                if role is not None and role not in roles:
+                    continue
+                results[user_id] = {
+                    "id": user_id, "username": username, "email": email, "is_active": active, "roles": roles,
+                }
+        return list(results.values())
+
+    def stats(self) -> Dict[str, int]:
+        return {"size": len(self._entries), "ready": int(self.ready)}
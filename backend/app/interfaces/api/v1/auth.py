@@ -4,6 +4,7 @@ from pydantic import BaseModel
 
 from app.domain.user import User
 from app.interfaces.api.v1.dependencies import get_current_user, oauth2_scheme
+from app.interfaces.api.v1.serializers import UserSchema
 from app.main import get_auth_service
 
 router = APIRouter()
@@ -14,7 +15,7 @@ class Token(BaseModel):
 
 class LoginResponse(BaseModel):
     token: Token
-    user: User
+    user: UserSchema
 
 @router.post("/login", response_model=LoginResponse)
 async def login(
@@ -35,7 +36,7 @@ async def login(
         user=user
     )
 
-@router.get("/me", response_model=User)
+@router.get("/me", response_model=UserSchema)
 async def read_users_me(
     current_user: User = Depends(get_current_user)
 ):
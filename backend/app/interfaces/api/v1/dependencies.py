@@ -4,7 +4,7 @@ from typing import List, Optional, Union
 from jose import JWTError
 
 from app.domain.user import User
-from app.main import get_auth_service
+from app.main import get_auth_service, get_token_cache
 
 oauth2_scheme = OAuth2PasswordBearer(tokenUrl="/api/v1/login")
 
@@ -12,10 +12,15 @@ async def get_current_user(token: str = Depends(oauth2_scheme)) -> User:
     """
     現在の認証済みユーザーを取得する依存関係
     """
-    auth_service = get_auth_service()
+    token_cache = get_token_cache()
     
     try:
-        payload = await auth_service.verify_token(token)
+        # 検証済みのトークンはキャッシュから取得し、署名検証を省略する
+        payload = token_cache.get(token)
+        if payload is None:
+            payload = await get_auth_service().verify_token(token)
+            if payload:
+                token_cache.put(token, payload)
         if not payload:
             raise HTTPException(
                 status_code=status.HTTP_401_UNAUTHORIZED,
@@ -0,0 +1,110 @@
+import hashlib
+from typing import Iterable, Optional, Sequence
+
+from fastapi import Request, Response, status
+
+from app.domain.user import UserBatch, UserPage
+
+# 認証付きのレスポンスのため共有キャッシュには置かせず、ブラウザには毎回 ETag で再検証させる
+CACHE_CONTROL = "private, no-cache"
+
+
+def _digest(parts: Iterable[str]) -> str:
+    digest = hashlib.blake2b(digest_size=16)
+    for part in parts:
+        digest.update(part.encode("utf-8"))
+        digest.update(b"\0")
+    return digest.hexdigest()
+
+
+def make_etag(*parts: str) -> str:
+    """parts から強いETagを作る"""
+    return f'"{_digest(parts)}"'
+
+
+def _fields_part(fields: Optional[Sequence[str]]) -> Iterable[str]:
+    # フィールドを絞った表現は別のETagにする（全フィールドの場合は従来と同じ値になる）
+    return ("fields", ",".join(fields)) if fields else ()
+
+
+def user_etag(user_id: str, version: int, fields: Optional[Sequence[str]] = None) -> str:
+    """
+    ユーザー1件のETag（"<version>-<ID・version・フィールドのハッシュ>"）
+
+    version は更新のたびに増えるため、ID と version だけで表現が決まる。
+    If-Match からは読み込まずに version を取り出せる（if_match_version）
+    """
+    return f'"{version}-{_digest(("user", user_id, str(version), *_fields_part(fields)))}"'
+
+
+def if_match_version(header: str, user_id: str) -> Optional[int]:
+    """
+    If-Match のうち、このユーザーの全フィールドの表現のETagに強い比較で一致するものの version
+    （一致しうるものが無ければ None。複数あれば最初のもの）
+    """
+    for candidate in header.split(","):
+        tag = candidate.strip()
+        version, separator, _ = tag[1:].partition("-")
+        if tag.startswith('"') and separator and version.isdigit() and tag == user_etag(user_id, int(version)):
+            return int(version)
+    return None
+
+
+def collection_etag(
+    collection_revision: str,
+    limit: int,
+    cursor: Optional[str],
+    fields: Optional[Sequence[str]] = None
+) -> str:
+    """集合の版から一覧1ページ分のETagを作る（ページを読み込まずに求められる）"""
+    return make_etag("users", collection_revision, str(limit), cursor or "", *_fields_part(fields))
+
+
+def page_etag(page: UserPage, fields: Optional[Sequence[str]] = None) -> str:
+    """ページ内の各ユーザーのIDと版、次ページのカーソルから一覧1ページ分のETagを作る"""
+    items = page.items
+    if isinstance(items, UserBatch):
+        ids: Iterable[str] = items.ids
+        revisions: Iterable[str] = items.revisions()
+    else:
+        ids = [user.id for user in items]
+        revisions = [user.revision() for user in items]
+    parts = ["page", page.next_cursor or "", *_fields_part(fields)]
+    for user_id, revision in zip(ids, revisions):
+        parts.append(user_id)
+        parts.append(revision)
+    return make_etag(*parts)
+
+
+def if_none_match(request: Request) -> Optional[str]:
+    return request.headers.get("if-none-match")
+
+
+def if_match(request: Request) -> Optional[str]:
+    return request.headers.get("if-match")
+
+
+def etag_matches(header: Optional[str], etag: str) -> bool:
+    """If-None-Match の値に etag が含まれるか（RFC 9110 の弱い比較、* はすべてに一致）"""
+    if not header:
+        return False
+    if header.strip() == "*":
+        return True
+    opaque = etag.removeprefix("W/")
+    return any(candidate.strip().removeprefix("W/") == opaque for candidate in header.split(","))
+
+
+def etag_matches_strong(header: str, etag: str) -> bool:
+    """If-Match の値に etag が含まれるか（RFC 9110 の強い比較、* は存在するすべての表現に一致）"""
+    if header.strip() == "*":
+        return True
+    return not etag.startswith("W/") and any(candidate.strip() == etag for candidate in header.split(","))
+
+
+def cache_headers(etag: str) -> dict:
+    return {"ETag": etag, "Cache-Control": CACHE_CONTROL}
+
+
+def not_modified(etag: str) -> Response:
+    """ボディを持たない 304 Not Modified"""
+    return Response(status_code=status.HTTP_304_NOT_MODIFIED, headers=cache_headers(etag))
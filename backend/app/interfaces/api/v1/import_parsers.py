@@ -0,0 +1,98 @@
+import csv
+import json
+from typing import AsyncIterator, Optional, Tuple
+
+from app.usecases.user_management.bulk_import import ImportRow
+
+# 1行あたりの最大バイト数（改行のない巨大な入力でメモリを使い切らないための上限）
+MAX_LINE_BYTES = 64 * 1024
+
+_LINE_TOO_LONG = f"1行が{MAX_LINE_BYTES}バイトを超えています"
+
+
+def _decode_line(line: bytes) -> Optional[Tuple[Optional[str], Optional[str]]]:
+    # (行, None) または (None, 読めない理由)。空行は None
+    if len(line) > MAX_LINE_BYTES:
+        return None, _LINE_TOO_LONG
+    try:
+        text = line.decode("utf-8-sig").rstrip("\r")
+    except UnicodeDecodeError:
+        return None, "UTF-8として解析できません"
+    if not text.strip():
+        return None
+    return text, None
+
+
+async def iter_lines(chunks: AsyncIterator[bytes]) -> AsyncIterator[Tuple[Optional[str], Optional[str]]]:
+    """
+    受信したチャンクを行単位に分割し、(行, None) を返す（空行は読み飛ばす）
+    MAX_LINE_BYTES を超える行・UTF-8として解析できない行は (None, 理由) を返し、次の行から読み続ける
+    （超えた行の残りは改行まで読み捨てるため、バッファは MAX_LINE_BYTES 程度に収まる）
+    """
+    buffer = b""
+    skipping = False
+    async for chunk in chunks:
+        buffer += chunk
+        *lines, buffer = buffer.split(b"\n")
+        if skipping:
+            if not lines:
+                buffer = b""
+                continue
+            # 最初の改行までは、上限を超えた行の残り
+            lines = lines[1:]
+            skipping = False
+        for line in lines:
+            decoded = _decode_line(line)
+            if decoded:
+                yield decoded
+        if len(buffer) > MAX_LINE_BYTES:
+            yield None, _LINE_TOO_LONG
+            buffer = b""
+            skipping = True
+    if not skipping:
+        decoded = _decode_line(buffer)
+        if decoded:
+            yield decoded
+
+
+async def parse_ndjson_rows(chunks: AsyncIterator[bytes]) -> AsyncIterator[ImportRow]:
+    """1行1オブジェクトのNDJSONを逐次解析する"""
+    row = 0
+    async for line, error in iter_lines(chunks):
+        row += 1
+        if error:
+            yield ImportRow(row=row, parse_error=error)
+            continue
+        try:
+            data = json.loads(line)
+        except ValueError:
+            yield ImportRow(row=row, parse_error="JSONとして解析できません")
+            continue
+        if not isinstance(data, dict):
+            yield ImportRow(row=row, parse_error="各行はJSONオブジェクトである必要があります")
+            continue
+        yield ImportRow(row=row, data={key: str(value) for key, value in data.items() if value is not None})
+
+
+async def parse_csv_rows(chunks: AsyncIterator[bytes]) -> AsyncIterator[ImportRow]:
+    """
+    ヘッダー行付きのCSVを逐次解析する
+    行番号はヘッダーを除いたデータ行の番号（クォート内の改行には対応しない）
+    """
+    header = None
+    row = 0
+    async for line, error in iter_lines(chunks):
+        if header is None:
+            if error:
+                raise ValueError(f"ヘッダー行を読み込めません: {error}")
+            header = [value.strip() for value in next(csv.reader([line]))]
+            continue
+        row += 1
+        if error:
+            yield ImportRow(row=row, parse_error=error)
+            continue
+        values = next(csv.reader([line]))
+        if len(values) != len(header):
+            yield ImportRow(row=row, parse_error="列数がヘッダーと一致しません")
+            continue
+        yield ImportRow(row=row, data=dict(zip(header, values)))
@@ -0,0 +1,163 @@
+import json
+from datetime import datetime
+from typing import Annotated, Any, AsyncIterator, Dict, Iterable, Iterator, List, Optional, Sequence, Tuple
+
+from fastapi.responses import Response
+from pydantic import GetPydanticSchema
+from pydantic_core import core_schema
+from typing_extensions import TypedDict
+
+from app.domain.user import User, UserBatch
+
+try:
+    import orjson
+except ImportError:  # orjson が無い環境では標準のjsonを使う
+    orjson = None
+
+# ストリーミング時に1回の送信へまとめるユーザー数
+USER_CHUNK_SIZE = 500
+
+# APIで返すユーザーのフィールド（password_hash は返さない。?fields= で指定できるのもこのフィールドのみ）
+OUTPUT_FIELDS: Tuple[str, ...] = tuple(name for name in User.FIELDS if name != "password_hash")
+
+
+# OpenAPI のスキーマ名を User にするため、関数形式で名前を付ける
+_UserFields = TypedDict("User", {
+    "id": str,
+    "email": str,
+    "username": str,
+    "is_active": bool,
+    "roles": List[str],
+    "created_at": datetime,
+    "updated_at": Optional[datetime],
+    "last_login": Optional[datetime],
+    "version": int,
+})
+
+
+def _user_core_schema(source: Any, handler: Any) -> core_schema.CoreSchema:
+    fields = handler.generate_schema(_UserFields)
+    from_fields = core_schema.no_info_after_validator_function(lambda data: User(**data), fields)
+    return core_schema.json_or_python_schema(
+        json_schema=from_fields,
+        python_schema=core_schema.union_schema([core_schema.is_instance_schema(User), from_fields]),
+        serialization=core_schema.plain_serializer_function_ser_schema(
+            lambda user: {name: getattr(user, name) for name in OUTPUT_FIELDS}, return_schema=fields
+        )
+    )
+
+
+# response_model やレスポンスモデルのフィールドで User を使うための型（OpenAPI のスキーマ名は User）
+UserSchema = Annotated[User, GetPydanticSchema(_user_core_schema)]
+
+
+def _row_values(rows: Iterable[tuple]) -> List[Dict[str, Any]]:
+    # 日時は未解析の文字列ならそのまま出力する（キーを直接書いた dict リテラルが最も速い）。password_hash は出力しない
+    return [
+        {
+            "id": id, "email": email, "username": username,
+            "is_active": is_active, "roles": roles,
+            "created_at": created_at, "updated_at": updated_at, "last_login": last_login, "version": version,
+        }
+        for id, email, username, password_hash, is_active, roles, created_at, updated_at, last_login, version in rows
+    ]
+
+
+def _projected_values(users: Sequence[Optional[User]], fields: Sequence[str]) -> List[Optional[Dict[str, Any]]]:
+    # fields のフィールドだけを出力する（UserBatch は必要な列だけを取り出す）
+    if isinstance(users, UserBatch):
+        return [dict(zip(fields, values)) for values in zip(*(users.column(name) for name in fields))]
+    indexes = [User.FIELDS.index(name) for name in fields]
+    values = []
+    for user in users:
+        if user is None:
+            values.append(None)
+            continue
+        row = user.raw_values()
+        values.append({name: row[index] for name, index in zip(fields, indexes)})
+    return values
+
+
+def _default(value: Any) -> Any:
+    if isinstance(value, datetime):
+        return value.isoformat()
+    if isinstance(value, tuple):
+        return list(value)
+    raise TypeError(f"Object of type {type(value).__name__} is not JSON serializable")
+
+
+def _dumps(value: Any) -> bytes:
+    if orjson is not None:
+        # orjson は datetime・タプルを直接エンコードできる
+        return orjson.dumps(value)
+    return json.dumps(value, default=_default, ensure_ascii=False, separators=(",", ":")).encode("utf-8")
+
+
+def _to_values(
+    users: Sequence[Optional[User]],
+    fields: Optional[Sequence[str]] = None
+) -> List[Optional[Dict[str, Any]]]:
+    if fields:
+        return _projected_values(users, fields)
+    if isinstance(users, UserBatch):
+        return _row_values(users.rows())
+    values = _row_values(user.raw_values() for user in users if user is not None)
+    if len(values) == len(users):
+        return values
+    # get_many の結果など、存在しない要素（None）を含む場合は位置を保って null にする
+    found = iter(values)
+    return [next(found) if user is not None else None for user in users]
+
+
+def dumps_users(users: Sequence[Optional[User]], fields: Optional[Sequence[str]] = None) -> bytes:
+    """
+    リポジトリから取得したユーザー（List[User] または UserBatch）をJSON配列にエンコードする
+
+    response_model による pydantic の検証・変換を通さず、フィールドの値をそのまま出力する。
+    出力は response_model=List[User] の場合と同じ（datetime はISO 8601、存在しない要素は null）
+    fields を指定した場合はそのフィールドだけを出力する
+    """
+    return _dumps(_to_values(users, fields))
+
+
+def dumps_user(user: User, fields: Optional[Sequence[str]] = None) -> bytes:
+    if fields:
+        return _dumps(_projected_values([user], fields)[0])
+    return _dumps(_row_values([user.raw_values()])[0])
+
+
+def iter_json_array(
+    users: Sequence[User],
+    chunk_size: int = USER_CHUNK_SIZE,
+    fields: Optional[Sequence[str]] = None
+) -> Iterator[bytes]:
+    """ユーザーを chunk_size 件ずつエンコードし、全体で1つのJSON配列になるバイト列を順に返す"""
+    yield b"["
+    for start in range(0, len(users), chunk_size):
+        encoded = dumps_users(users[start:start + chunk_size], fields)[1:-1]
+        yield encoded if start == 0 else b"," + encoded
+    yield b"]"
+
+
+def _ndjson(users: Sequence[Optional[User]], fields: Optional[Sequence[str]] = None) -> bytes:
+    return b"".join(_dumps(values) + b"\n" for values in _to_values(users, fields))
+
+
+async def iter_ndjson(
+    batches: AsyncIterator[UserBatch],
+    fields: Optional[Sequence[str]] = None
+) -> AsyncIterator[bytes]:
+    """UserBatch ごとに、1行1ユーザーのNDJSONをまとめて返す"""
+    async for batch in batches:
+        yield _ndjson(batch, fields)
+
+
+class UserJSONResponse(Response):
+    """エンコード済みのユーザーJSONをそのまま返すレスポンス"""
+
+    media_type = "application/json"
+
+    def render(self, content: Any) -> bytes:
+        if isinstance(content, bytes):
+            return content
+        return _dumps(content)
@@ -1,12 +1,46 @@
-from typing import List
+from typing import Iterator, List, Optional, Tuple
+import json
+import tempfile
 import uuid
 
-from fastapi import APIRouter, Depends, HTTPException, status
-from pydantic import BaseModel
+from fastapi import APIRouter, Depends, HTTPException, Query, Request, status
+from fastapi.responses import StreamingResponse
+from pydantic import BaseModel, Field
+from starlette.background import BackgroundTask
 
 from app.domain.user import User
 from app.domain.user import UserRepository
+from app.domain.user import UserNotFoundError, UserVersionConflictError
+from app.domain.user.entity import revision_version
+from app.domain.user.repository import check_fields
 from app.interfaces.api.v1.dependencies import get_current_user, has_role
+from app.interfaces.api.v1.etags import (
+    cache_headers,
+    collection_etag,
+    etag_matches,
+    etag_matches_strong,
+    if_match,
+    if_match_version,
+    if_none_match,
+    not_modified,
+    page_etag,
+    user_etag,
+)
+from app.interfaces.api.v1.import_parsers import parse_csv_rows, parse_ndjson_rows
+from app.interfaces.api.v1.serializers import (
+    OUTPUT_FIELDS,
+    USER_CHUNK_SIZE,
+    UserJSONResponse,
+    UserSchema,
+    dumps_user,
+    dumps_users,
+    iter_json_array,
+    iter_ndjson,
+)
+from app.infrastructure.search import UserSearchIndex
+from app.infrastructure.auth.password_hasher import PasswordHasher
+from app.main import get_password_hasher, get_user_repository, get_user_search_index
+from app.usecases.user_management.bulk_import import BulkUserImportUseCase
 
 router = APIRouter()
 
@@ -20,81 +54,315 @@ class UserUpdate(BaseModel):
     username: str | None = None
     is_active: bool | None = None
 
-@router.get("/users", response_model=List[User])
+class UserBatchGetRequest(BaseModel):
+    ids: List[str] = Field(..., min_length=1, max_length=1000)
+
+class UserBatchGetResponse(BaseModel):
+    # リクエストのIDと同じ順序で、存在しないIDはnull
+    users: List[Optional[UserSchema]]
+
+class UserSearchResult(BaseModel):
+    id: str
+    username: str
+    email: str
+    is_active: bool
+    roles: List[str]
+
+NDJSON_MEDIA_TYPE = "application/x-ndjson"
+
+# 検索索引の読み込み中に返す Retry-After（秒）
+SEARCH_RETRY_AFTER_SECONDS = 5
+
+def _wants_ndjson(request: Request) -> bool:
+    return NDJSON_MEDIA_TYPE in request.headers.get("accept", "")
+
+FIELDS_DESCRIPTION = (
+    "返すフィールドのカンマ区切り（例: id,username,is_active）。"
+    "指定したフィールドだけを読み込んで返す（省略時はすべてのフィールド）"
+)
+
+def _parse_fields(fields: Optional[str]) -> Optional[Tuple[str, ...]]:
+    """?fields= を重複を除いたフィールド名のタプルにする（未指定ならNone、OUTPUT_FIELDS 以外のフィールドは400）"""
+    if not fields:
+        return None
+    names = tuple(dict.fromkeys(name.strip() for name in fields.split(",") if name.strip()))
+    try:
+        check_fields(names, OUTPUT_FIELDS)
+    except ValueError as e:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=str(e)
+        )
+    return names or None
+
+async def _paginated_users(
+    request: Request,
+    limit: int,
+    cursor: Optional[str],
+    user_repository: UserRepository,
+    fields: Optional[Tuple[str, ...]] = None
+):
+    """
+    ユーザー一覧の共通処理
+    - Accept: application/x-ndjson の場合は全ページを辿りながら1行1ユーザーで逐次返す
+    - それ以外は1ページ分を返し、続きがあれば X-Next-Cursor ヘッダーにカーソルを設定する
+    - 1ページ分のレスポンスには ETag を付け、If-None-Match が一致すれば 304 を返す
+      （リポジトリが集合の版を返せる場合はページを読まずに判定し、返せない場合はページ内の各ユーザーの版から求める）
+    - fields を指定した場合はリポジトリにそのフィールドだけを読み込ませ、そのフィールドだけを返す
+    リポジトリのユーザーは検証済みのため、response_model による再検証を通さずに直接JSONへエンコードする
+    （response_model は OpenAPI のスキーマのためだけに残している）
+    """
+    if _wants_ndjson(request):
+        return StreamingResponse(
+            iter_ndjson(user_repository.iter_user_batches(fields=fields), fields),
+            media_type=NDJSON_MEDIA_TYPE
+        )
+
+    # 集合の版はページより先に読む（間に書き込みがあっても、古い版で新しい内容を返すだけで済む）
+    revision = await user_repository.collection_revision()
+    etag = collection_etag(revision, limit, cursor, fields) if revision is not None else None
+    if etag is not None and etag_matches(if_none_match(request), etag):
+        return not_modified(etag)
+
+    try:
+        page = await user_repository.list_users_page(limit=limit, cursor=cursor, fields=fields)
+    except ValueError as e:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=str(e)
+        )
+    if etag is None:
+        etag = page_etag(page, fields)
+        if etag_matches(if_none_match(request), etag):
+            return not_modified(etag)
+    headers = cache_headers(etag)
+    if page.next_cursor:
+        headers["X-Next-Cursor"] = page.next_cursor
+    if len(page.items) > USER_CHUNK_SIZE:
+        # 大きなページは USER_CHUNK_SIZE 件ずつエンコードして送る
+        return StreamingResponse(
+            iter_json_array(page.items, fields=fields),
+            media_type=UserJSONResponse.media_type,
+            headers=headers
+        )
+    return UserJSONResponse(dumps_users(page.items, fields), headers=headers)
+
+@router.get("/users", response_model=List[UserSchema])
 async def list_users(
+    request: Request,
+    limit: int = Query(100, ge=1, le=1000),
+    cursor: Optional[str] = None,
+    fields: Optional[str] = Query(None, description=FIELDS_DESCRIPTION),
     current_user: User = Depends(get_current_user),
-    user_repository: UserRepository = Depends()
+    user_repository: UserRepository = Depends(get_user_repository)
 ):
-    return await user_repository.list_users()
+    return await _paginated_users(request, limit, cursor, user_repository, _parse_fields(fields))
 
-@router.post("/users", response_model=User)
+@router.post("/users", response_model=UserSchema)
 async def create_user(
     user_create: UserCreate,
     current_user: User = Depends(get_current_user),
-    user_repository: UserRepository = Depends()
+    user_repository: UserRepository = Depends(get_user_repository),
+    password_hasher: PasswordHasher = Depends(get_password_hasher)
 ):
-    # 既存ユーザーのチェック
-    existing_user = await user_repository.get_by_email(user_create.email)
-    if existing_user:
-        raise HTTPException(
-            status_code=status.HTTP_400_BAD_REQUEST,
-            detail="Email already registered"
-        )
-    
-    # ユーザーの作成
+    """
+    メールアドレスの重複はリポジトリが書き込みと同時に確認する（事前の検索はしない）
+    パスワードはワーカープロセスでハッシュ化してから保存する
+    """
     user = User(
         id=str(uuid.uuid4()),
         email=user_create.email,
         username=user_create.username,
-        password_hash=""  # 実際には適切なパスワードハッシュを生成する必要があります
+        password_hash=await password_hasher.hash(user_create.password)
     )
     
-    return await user_repository.create_user(user)
+    try:
+        return await user_repository.create_user(user)
+    except ValueError as e:
+        # メールアドレスが使用済みの場合や、DynamoDB のトランザクションが取り消された場合
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=str(e)
+        )
+
+@router.post("/users:batchGet", response_model=UserBatchGetResponse)
+async def batch_get_users(
+    batch_request: UserBatchGetRequest,
+    fields: Optional[str] = Query(None, description=FIELDS_DESCRIPTION),
+    current_user: User = Depends(get_current_user),
+    user_repository: UserRepository = Depends(get_user_repository)
+):
+    """複数ユーザーを1回のリクエストで取得する"""
+    projection = _parse_fields(fields)
+    users = await user_repository.get_many(batch_request.ids, fields=projection)
+    return UserJSONResponse(b'{"users":' + dumps_users(users, projection) + b"}")
+
+def _iter_file(file, chunk_size: int = 64 * 1024) -> Iterator[bytes]:
+    while True:
+        chunk = file.read(chunk_size)
+        if not chunk:
+            return
+        yield chunk
 
-@router.get("/users/{user_id}", response_model=User)
+@router.post("/users:import", dependencies=[Depends(has_role("admin"))])
+async def import_users(
+    request: Request,
+    user_repository: UserRepository = Depends(get_user_repository)
+):
+    """
+    CSV（text/csv）またはNDJSON（application/x-ndjson）のユーザー一覧を一括で取り込む
+    リクエストボディは逐次解析し、行ごとの結果をNDJSONで返す（最終行は集計。読み込みが中断した場合はその理由を含む）
+    結果は一時ファイルに書き出すため、行数が増えてもメモリ使用量は一定
+    """
+    content_type = request.headers.get("content-type", "").split(";")[0].strip()
+    if content_type == "text/csv":
+        rows = parse_csv_rows(request.stream())
+    elif content_type == NDJSON_MEDIA_TYPE:
+        rows = parse_ndjson_rows(request.stream())
+    else:
+        raise HTTPException(
+            status_code=status.HTTP_415_UNSUPPORTED_MEDIA_TYPE,
+            detail="Content-Type must be text/csv or application/x-ndjson"
+        )
+
+    results = tempfile.SpooledTemporaryFile(max_size=1024 * 1024)
+
+    def report(result: dict) -> None:
+        results.write((json.dumps(result, ensure_ascii=False) + "\n").encode("utf-8"))
+
+    try:
+        # 読み込みの途中で失敗した場合も、それまでの結果と中断の理由（summary の error）を返す
+        summary = await BulkUserImportUseCase(user_repository).execute(rows, report)
+    except BaseException:
+        # 書き込み中のバッチはユースケースが取り消してから戻るため、ここで閉じても report は呼ばれない
+        results.close()
+        raise
+    report({"summary": summary})
+    results.seek(0)
+
+    return StreamingResponse(
+        _iter_file(results),
+        media_type=NDJSON_MEDIA_TYPE,
+        background=BackgroundTask(results.close)
+    )
+
+@router.get("/users/search", response_model=List[UserSearchResult])
+async def search_users(
+    q: str = Query(..., max_length=256, description="username または email の先頭（大文字小文字を区別しない）"),
+    limit: int = Query(20, ge=1, le=100),
+    is_active: Optional[bool] = Query(None),
+    role: Optional[str] = Query(None),
+    current_user: User = Depends(get_current_user),
+    search_index: Optional[UserSearchIndex] = Depends(get_user_search_index)
+):
+    """入力補完向けに、プロセス内の索引から前方一致するユーザーを返す（リポジトリは読まない）"""
+    if search_index is None or not search_index.ready:
+        raise HTTPException(
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+            detail="User search is not available",
+            headers={"Retry-After": str(SEARCH_RETRY_AFTER_SECONDS)}
+        )
+    return UserJSONResponse(search_index.search(q, limit=limit, is_active=is_active, role=role))
+
+@router.get("/users/{user_id}", response_model=UserSchema)
 async def get_user(
     user_id: str,
+    request: Request,
+    fields: Optional[str] = Query(None, description=FIELDS_DESCRIPTION),
     current_user: User = Depends(get_current_user),
-    user_repository: UserRepository = Depends()
+    user_repository: UserRepository = Depends(get_user_repository)
 ):
-    user = await user_repository.get_by_id(user_id)
+    """ETag を付けて返す。If-None-Match があれば先に版だけを確認し、一致すれば本体を読まずに 304 を返す"""
+    projection = _parse_fields(fields)
+    condition = if_none_match(request)
+    if condition:
+        revision = await user_repository.get_revision(user_id)
+        if revision is not None:
+            etag = user_etag(user_id, revision_version(revision), projection)
+            if etag_matches(condition, etag):
+                return not_modified(etag)
+
+    user = await user_repository.get_by_id(user_id, fields=projection)
     if not user:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
             detail="User not found"
         )
     
-    return user
+    etag = user_etag(user.id, user.version, projection)
+    return UserJSONResponse(dumps_user(user, projection), headers=cache_headers(etag))
 
-@router.put("/users/{user_id}", response_model=User)
+def _update_changes(user_update: UserUpdate) -> dict:
+    # 空のメールアドレス・ユーザー名と未指定（None）のフィールドは変更しない
+    changes = {}
+    if user_update.email:
+        changes["email"] = user_update.email
+    if user_update.username:
+        changes["username"] = user_update.username
+    if user_update.is_active is not None:
+        changes["is_active"] = user_update.is_active
+    return changes
+
+@router.put("/users/{user_id}", response_model=UserSchema)
 async def update_user(
     user_id: str,
     user_update: UserUpdate,
+    request: Request,
     current_user: User = Depends(get_current_user),
-    user_repository: UserRepository = Depends()
+    user_repository: UserRepository = Depends(get_user_repository)
 ):
-    user = await user_repository.get_by_id(user_id)
-    if not user:
+    """
+    変更されたフィールドだけを書き込む
+    - If-Match があれば、ETag から version を取り出して（ETag は ID と version だけから求まる）、
+      読み込まずに version を条件とした1回の条件付き更新で書き込む。このユーザーの現在の ETag に一致しうるものが無い場合や、
+      その間に他の更新があった場合は 412 を返す（If-Match: * は存在だけを条件にする）
+    - If-Match がなければ読み込まずに、変更されたフィールドだけを1回の条件付き更新（存在の確認のみ）で書き込む
+    - 変更が無ければ、キャッシュを通さない強い整合性の読み込みで現在のユーザーを返す
+    """
+    changes = _update_changes(user_update)
+    condition = if_match(request)
+    expected_version = None
+    if condition and condition.strip() != "*":
+        expected_version = if_match_version(condition, user_id)
+        if expected_version is None:
+            raise HTTPException(
+                status_code=status.HTTP_412_PRECONDITION_FAILED,
+                detail="User has been modified"
+            )
+
+    try:
+        if changes:
+            user = await user_repository.update_fields(user_id, changes, expected_version)
+        else:
+            user = await user_repository.get_by_id(user_id, consistent=True)
+            if not user:
+                raise UserNotFoundError("ユーザーが存在しません")
+            if condition and not etag_matches_strong(condition, user_etag(user.id, user.version)):
+                raise UserVersionConflictError("ユーザーは他の更新により変更されています")
+    except UserNotFoundError:
         raise HTTPException(
-            status_code=status.HTTP_404_NOT_FOUND,
+            status_code=status.HTTP_412_PRECONDITION_FAILED if condition else status.HTTP_404_NOT_FOUND,
             detail="User not found"
         )
-    
-    # ユーザー情報の更新
-    if user_update.email:
-        user.email = user_update.email
-    if user_update.username:
-        user.username = user_update.username
-    if user_update.is_active is not None:
-        user.is_active = user_update.is_active
-    
-    return await user_repository.update_user(user)
+    except UserVersionConflictError as e:
+        raise HTTPException(
+            status_code=status.HTTP_412_PRECONDITION_FAILED if condition else status.HTTP_409_CONFLICT,
+            detail=str(e)
+        )
+    except ValueError as e:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=str(e)
+        )
+
+    etag = user_etag(user.id, user.version)
+    return UserJSONResponse(dumps_user(user), headers=cache_headers(etag))
 
 @router.delete("/users/{user_id}")
 async def delete_user(
     user_id: str,
     current_user: User = Depends(get_current_user),
-    user_repository: UserRepository = Depends()
+    user_repository: UserRepository = Depends(get_user_repository)
 ):
     success = await user_repository.delete_user(user_id)
     if not success:
@@ -106,9 +374,13 @@ async def delete_user(
     return {"message": "User deleted successfully"}
 
 # 管理者専用エンドポイント
-@router.get("/admin/users", dependencies=[Depends(has_role("admin"))])
+@router.get("/admin/users", response_model=List[UserSchema], dependencies=[Depends(has_role("admin"))])
 async def list_all_users(
-    user_repository: UserRepository = Depends()
+    request: Request,
+    limit: int = Query(100, ge=1, le=1000),
+    cursor: Optional[str] = None,
+    fields: Optional[str] = Query(None, description=FIELDS_DESCRIPTION),
+    user_repository: UserRepository = Depends(get_user_repository)
 ):
     """管理者のみがアクセスできる全ユーザー一覧取得"""
-    return await user_repository.list_users() 
\ No newline at end of file
+    return await _paginated_users(request, limit, cursor, user_repository, _parse_fields(fields))
@@ -1,11 +1,32 @@
+import asyncio
 import os
 import logging
-from fastapi import FastAPI
+from contextlib import asynccontextmanager
+from functools import lru_cache
+from typing import Optional
+from fastapi import FastAPI, Request
+from fastapi.responses import PlainTextResponse
 from fastapi.middleware.cors import CORSMiddleware
 
+from app.domain.user import UserRepository
 from app.infrastructure.auth.auth_factory import AuthFactory
+from app.infrastructure.auth.mock_auth import MockAuth
+from app.infrastructure.auth.password_hasher import PasswordHasher
+from app.infrastructure.auth.token_cache import VerifiedTokenCache
+from app.infrastructure.dynamodb import DynamoDBClientManager
+from app.infrastructure.dynamodb.retry import backoff_delay
+from app.infrastructure.metrics import MetricsRegistry, MultiProcessMetricsStore, render_prometheus
+from app.infrastructure.repositories.caching_user_repository import CachingUserRepository
 from app.infrastructure.repositories.dynamodb_user_repository import DynamoDBUserRepository
+from app.infrastructure.repositories.in_memory_user_repository import InMemoryUserRepository
+from app.infrastructure.repositories.instrumented_user_repository import InstrumentedUserRepository
+from app.infrastructure.repositories.search_indexing_user_repository import SearchIndexingUserRepository
+from app.infrastructure.search import SEARCH_FIELDS, UserSearchIndex
+from app.middleware.admission_middleware import AdmissionController, AdmissionControlMiddleware, AdmissionLimits
+from app.middleware.compression_middleware import CompressionMiddleware
+from app.middleware.log_pipeline import LogPipeline
 from app.middleware.logging_middleware import LoggingMiddleware
+from app.middleware.metrics_middleware import MetricsMiddleware
 
 # ロギング設定
 logging.basicConfig(
@@ -16,12 +37,262 @@ logging.basicConfig(
 api_logger = logging.getLogger("api")
 api_logger.setLevel(logging.INFO)
 
+# 環境変数の取得
+AUTH_TYPE = os.getenv("AUTH_TYPE", "local")
+# ユーザーの保存先（dynamodb / memory）。ローカル環境ではDynamoDB Localなしで動かせるようメモリを既定にする
+USER_REPOSITORY = os.getenv("USER_REPOSITORY", "memory" if AUTH_TYPE == "local" else "dynamodb")
+USER_REPOSITORY_SNAPSHOT_PATH = os.getenv("USER_REPOSITORY_SNAPSHOT_PATH") or None
+DYNAMODB_TABLE_NAME = os.getenv("DYNAMODB_TABLE_NAME", "users")
+# メールアドレスの予約テーブル（パーティションキー email）
+DYNAMODB_EMAIL_TABLE_NAME = os.getenv("DYNAMODB_EMAIL_TABLE_NAME") or f"{DYNAMODB_TABLE_NAME}-emails"
+DYNAMODB_ENDPOINT = os.getenv("DYNAMODB_ENDPOINT") or None
+DYNAMODB_MAX_POOL_CONNECTIONS = int(os.getenv("DYNAMODB_MAX_POOL_CONNECTIONS", "50"))
+DYNAMODB_SCAN_SEGMENTS = int(os.getenv("DYNAMODB_SCAN_SEGMENTS", "4"))
+DYNAMODB_SCAN_CONCURRENCY = int(os.getenv("DYNAMODB_SCAN_CONCURRENCY", "4"))
+USER_CACHE_ENABLED = os.getenv("USER_CACHE_ENABLED", "true").lower() == "true"
+USER_CACHE_MAX_SIZE = int(os.getenv("USER_CACHE_MAX_SIZE", "10000"))
+USER_CACHE_TTL_SECONDS = float(os.getenv("USER_CACHE_TTL_SECONDS", "30"))
+USER_CACHE_NEGATIVE_TTL_SECONDS = float(os.getenv("USER_CACHE_NEGATIVE_TTL_SECONDS", "5"))
+# ユーザー検索（GET /users/search）のプロセス内索引。絞り込み時に1回の検索で走査する最大件数
+USER_SEARCH_ENABLED = os.getenv("USER_SEARCH_ENABLED", "true").lower() == "true"
+USER_SEARCH_MAX_SCAN = int(os.getenv("USER_SEARCH_MAX_SCAN", "10000"))
+# 索引の読み込みに失敗した場合に再試行するまでの待ち時間（指数バックオフの初期値と上限）
+USER_SEARCH_LOAD_RETRY_BASE_SECONDS = float(os.getenv("USER_SEARCH_LOAD_RETRY_BASE_SECONDS", "1"))
+USER_SEARCH_LOAD_RETRY_MAX_SECONDS = float(os.getenv("USER_SEARCH_LOAD_RETRY_MAX_SECONDS", "60"))
+# 索引は各ワーカーのプロセス内にあり、他ワーカーの書き込みは反映されないため、この間隔で全件から作り直す（0 以下なら起動時の1回のみ）
+USER_SEARCH_RELOAD_INTERVAL_SECONDS = float(os.getenv("USER_SEARCH_RELOAD_INTERVAL_SECONDS", "300"))
+# レスポンス圧縮。最小サイズ未満の単一チャンクのレスポンスは圧縮しない
+COMPRESSION_ENABLED = os.getenv("COMPRESSION_ENABLED", "true").lower() == "true"
+COMPRESSION_MINIMUM_SIZE = int(os.getenv("COMPRESSION_MINIMUM_SIZE", "1024"))
+COMPRESSION_GZIP_LEVEL = int(os.getenv("COMPRESSION_GZIP_LEVEL", "5"))
+COMPRESSION_BROTLI_QUALITY = int(os.getenv("COMPRESSION_BROTLI_QUALITY", "4"))
+COMPRESSION_ZSTD_LEVEL = int(os.getenv("COMPRESSION_ZSTD_LEVEL", "3"))
+# アドミッション制御（ルート区分ごとの同時実行数を処理時間から調整し、溢れたリクエストは 503 で打ち切る）
+ADMISSION_CONTROL_ENABLED = os.getenv("ADMISSION_CONTROL_ENABLED", "true").lower() == "true"
+ADMISSION_QUEUE_TIMEOUT_SECONDS = float(os.getenv("ADMISSION_QUEUE_TIMEOUT_SECONDS", "2"))
+ADMISSION_RETRY_AFTER_SECONDS = int(os.getenv("ADMISSION_RETRY_AFTER_SECONDS", "1"))
+# パスワードハッシュ（scrypt, N = 2^LN）のコストと、ハッシュ化・照合を行うワーカープロセス数（0 はCPU数）
+PASSWORD_HASH_SCRYPT_LN = int(os.getenv("PASSWORD_HASH_SCRYPT_LN", "15"))
+PASSWORD_HASH_SCRYPT_R = int(os.getenv("PASSWORD_HASH_SCRYPT_R", "8"))
+PASSWORD_HASH_SCRYPT_P = int(os.getenv("PASSWORD_HASH_SCRYPT_P", "1"))
+PASSWORD_HASH_WORKERS = int(os.getenv("PASSWORD_HASH_WORKERS", "0"))
+# Cognitoへのログイン呼び出しに使う接続プール（とスレッド）の大きさ
+COGNITO_MAX_POOL_CONNECTIONS = int(os.getenv("COGNITO_MAX_POOL_CONNECTIONS", "10"))
+TOKEN_CACHE_MAX_SIZE = int(os.getenv("TOKEN_CACHE_MAX_SIZE", "10000"))
+TOKEN_CACHE_MAX_TTL_SECONDS = float(os.getenv("TOKEN_CACHE_MAX_TTL_SECONDS", "300"))
+LOG_SUCCESS_SAMPLE_RATE = float(os.getenv("LOG_SUCCESS_SAMPLE_RATE", "1.0"))
+LOG_SLOW_THRESHOLD_MS = float(os.getenv("LOG_SLOW_THRESHOLD_MS", "1000"))
+LOG_QUEUE_SIZE = int(os.getenv("LOG_QUEUE_SIZE", "10000"))
+METRICS_MULTIPROC_DIR = os.getenv("METRICS_MULTIPROC_DIR") or None
+METRICS_FLUSH_INTERVAL_SECONDS = float(os.getenv("METRICS_FLUSH_INTERVAL_SECONDS", "2"))
+
+# charset は Starlette が付与する
+PROMETHEUS_CONTENT_TYPE = "text/plain; version=0.0.4"
+
+# リクエストログはバックグラウンドスレッドでまとめて書き出す
+log_pipeline = LogPipeline(
+    max_queue_size=LOG_QUEUE_SIZE,
+    success_sample_rate=LOG_SUCCESS_SAMPLE_RATE,
+    slow_threshold_ms=LOG_SLOW_THRESHOLD_MS
+)
+
+# メトリクスはプロセスごとに集計し、複数ワーカーの場合はファイル経由で合算する
+metrics_registry = MetricsRegistry()
+metrics_registry.add_stats_collector("log_pipeline", log_pipeline.stats, gauge_keys=("queued",))
+metrics_store = (
+    MultiProcessMetricsStore(
+        metrics_registry,
+        directory=METRICS_MULTIPROC_DIR,
+        flush_interval=METRICS_FLUSH_INTERVAL_SECONDS
+    )
+    if METRICS_MULTIPROC_DIR else None
+)
+
+def decorate_user_repository(
+    user_repository: UserRepository,
+    cache: bool = USER_CACHE_ENABLED
+) -> UserRepository:
+    """バックエンドのリポジトリに計測とキャッシュを重ねる"""
+    # キャッシュの内側で計測し、バックエンドへの実際の呼び出しのレイテンシを記録する
+    user_repository = InstrumentedUserRepository(user_repository, metrics_registry)
+    if cache:
+        user_repository = CachingUserRepository(
+            user_repository,
+            max_size=USER_CACHE_MAX_SIZE,
+            ttl=USER_CACHE_TTL_SECONDS,
+            negative_ttl=USER_CACHE_NEGATIVE_TTL_SECONDS
+        )
+        metrics_registry.add_stats_collector(
+            "user_cache", user_repository.stats, gauge_keys=("size", "max_size")
+        )
+    return user_repository
+
+async def _load_user_search_index(index: UserSearchIndex, user_repository: UserRepository) -> None:
+    """読み込めるまで指数バックオフで再試行する（その間の検索は 503。終了時に lifespan が取り消す）"""
+    attempt = 0
+    while True:
+        try:
+            loaded = await index.load(user_repository.iter_user_batches(fields=SEARCH_FIELDS))
+            api_logger.info(f"Loaded {loaded} users into the search index")
+            return
+        except Exception as e:
+            delay = backoff_delay(attempt, USER_SEARCH_LOAD_RETRY_BASE_SECONDS, USER_SEARCH_LOAD_RETRY_MAX_SECONDS)
+            attempt += 1
+            api_logger.warning(f"Error loading user search index (attempt {attempt}), retrying in {delay:.1f}s: {e}")
+            await asyncio.sleep(delay)
+
+async def _refresh_user_search_index(index: UserSearchIndex, user_repository: UserRepository, interval: float) -> None:
+    """
+    起動時に読み込み、以降は interval 秒ごとに全件から作り直す（0 以下なら1回だけ）
+    作り直している間も検索は直前の索引で続け、その間の書き込みは作り直した索引にも反映される
+    """
+    await _load_user_search_index(index, user_repository)
+    while interval > 0:
+        await asyncio.sleep(interval)
+        await _load_user_search_index(index, user_repository)
+
+def attach_user_search(app: FastAPI, user_repository: UserRepository) -> UserRepository:
+    """
+    ユーザー検索の索引を作ってバックグラウンドで全件を読み込み（DynamoDBでは並列Scan）、
+    以降の書き込みを索引に反映するリポジトリを返す（読み込みが終わるまで検索は 503）
+    他ワーカーの書き込みは USER_SEARCH_RELOAD_INTERVAL_SECONDS ごとの再読み込みで反映する
+    """
+    if not USER_SEARCH_ENABLED:
+        app.state.user_search_index = None
+        return user_repository
+    index = UserSearchIndex(max_scan=USER_SEARCH_MAX_SCAN)
+    app.state.user_search_index = index
+    app.state.user_search_load = asyncio.create_task(
+        _refresh_user_search_index(index, user_repository, USER_SEARCH_RELOAD_INTERVAL_SECONDS)
+    )
+    metrics_registry.add_stats_collector("user_search", index.stats, gauge_keys=("size", "ready"))
+    return SearchIndexingUserRepository(user_repository, index)
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    """
+    ユーザーリポジトリをプロセス内で1つだけ生成する
+    DynamoDBを使う場合は終了時に接続プールを閉じ、メモリを使う場合はスナップショットを読み込み・保存する
+    """
+    log_pipeline.start()
+    if metrics_store is not None:
+        metrics_store.start()
+    dynamodb = None
+    if USER_REPOSITORY == "memory":
+        user_repository = InMemoryUserRepository()
+        if USER_REPOSITORY_SNAPSHOT_PATH and os.path.exists(USER_REPOSITORY_SNAPSHOT_PATH):
+            loaded = await user_repository.load_snapshot(USER_REPOSITORY_SNAPSHOT_PATH)
+            api_logger.info(f"Loaded {loaded} users from {USER_REPOSITORY_SNAPSHOT_PATH}")
+        # メモリ上のリポジトリにキャッシュを重ねても速くならない
+        app.state.user_repository = attach_user_search(app, decorate_user_repository(user_repository, cache=False))
+    else:
+        dynamodb = DynamoDBClientManager(
+            region_name=os.getenv("AWS_REGION"),
+            endpoint_url=DYNAMODB_ENDPOINT,
+            max_pool_connections=DYNAMODB_MAX_POOL_CONNECTIONS
+        )
+        await dynamodb.start()
+        app.state.dynamodb = dynamodb
+        user_repository = DynamoDBUserRepository(
+            client=dynamodb.client,
+            table_name=DYNAMODB_TABLE_NAME,
+            scan_segments=DYNAMODB_SCAN_SEGMENTS,
+            scan_concurrency=DYNAMODB_SCAN_CONCURRENCY,
+            email_table_name=DYNAMODB_EMAIL_TABLE_NAME
+        )
+        app.state.user_repository = attach_user_search(app, decorate_user_repository(user_repository))
+
+    auth_service = get_auth_service()
+    # ローカル認証では、登録済みのユーザーもリポジトリのパスワードハッシュで照合する
+    if isinstance(auth_service, MockAuth):
+        auth_service.user_repository = app.state.user_repository
+    # 認証サービスが事前準備（JWKSの取得、パスワードハッシュのワーカー起動など）を持つ場合は起動時に済ませておく
+    warm_up = getattr(auth_service, "warm_up", None)
+    if warm_up:
+        await warm_up()
+    try:
+        yield
+    finally:
+        search_load = getattr(app.state, "user_search_load", None)
+        if search_load is not None:
+            search_load.cancel()
+        if dynamodb is not None:
+            await dynamodb.close()
+        if USER_REPOSITORY_SNAPSHOT_PATH and isinstance(user_repository, InMemoryUserRepository):
+            await user_repository.save_snapshot(USER_REPOSITORY_SNAPSHOT_PATH)
+        if metrics_store is not None:
+            await metrics_store.stop()
+        get_password_hasher().close()
+        close_auth = getattr(auth_service, "close", None)
+        if close_auth:
+            close_auth()
+        log_pipeline.stop()
+
 app = FastAPI(
     title="Admin API",
     description="Admin API with Fast-API and Clean Architecture",
-    version="1.0.0"
+    version="1.0.0",
+    lifespan=lifespan
 )
 
+# レスポンス圧縮（最も内側に置き、アプリのレスポンスボディを直接圧縮する）
+if COMPRESSION_ENABLED:
+    app.add_middleware(
+        CompressionMiddleware,
+        minimum_size=COMPRESSION_MINIMUM_SIZE,
+        levels={"gzip": COMPRESSION_GZIP_LEVEL, "br": COMPRESSION_BROTLI_QUALITY, "zstd": COMPRESSION_ZSTD_LEVEL}
+    )
+
+# Accept: application/x-ndjson で全件を逐次書き出す一覧（長時間かかるため一括処理として扱う）
+_NDJSON_EXPORT_PATHS = ("/api/v1/users", "/api/v1/admin/users")
+
+def _accepts_ndjson(scope) -> bool:
+    return any(name == b"accept" and b"application/x-ndjson" in value for name, value in scope["headers"])
+
+def classify_request(scope) -> str:
+    """アドミッション制御のルート区分（一括処理・ログイン・読み取り・書き込み）"""
+    path = scope["path"]
+    if path.endswith(":import") or path.startswith("/api/v1/admin/"):
+        return "bulk"
+    if path == "/api/v1/login":
+        return "auth"
+    if scope["method"] in ("GET", "HEAD"):
+        return "bulk" if path in _NDJSON_EXPORT_PATHS and _accepts_ndjson(scope) else "read"
+    return "write"
+
+def _admission_limits(route_class: str, max_limit: int, target_latency: float, queue_size: int) -> AdmissionLimits:
+    # ADMISSION_<区分>_MAX_CONCURRENCY などで区分ごとに上書きできる
+    prefix = f"ADMISSION_{route_class.upper()}_"
+    max_limit = int(os.getenv(f"{prefix}MAX_CONCURRENCY", str(max_limit)))
+    return AdmissionLimits(
+        initial_limit=min(20, max_limit),
+        max_limit=max_limit,
+        queue_size=int(os.getenv(f"{prefix}QUEUE_SIZE", str(queue_size))),
+        queue_timeout=ADMISSION_QUEUE_TIMEOUT_SECONDS,
+        target_latency=float(os.getenv(f"{prefix}TARGET_LATENCY_SECONDS", str(target_latency)))
+    )
+
+# アドミッション制御（CORSの内側に置き、503 にもCORSヘッダーを付ける）
+if ADMISSION_CONTROL_ENABLED:
+    admission_controller = AdmissionController(
+        {
+            "read": _admission_limits("read", 200, 0.25, 200),
+            "write": _admission_limits("write", 100, 0.5, 100),
+            "auth": _admission_limits("auth", 20, 1.0, 50),
+            "bulk": _admission_limits("bulk", 4, 30.0, 8),
+        },
+        classify=classify_request
+    )
+    metrics_registry.add_stats_collector(
+        "admission", admission_controller.stats, gauge_keys=admission_controller.gauge_keys()
+    )
+    app.add_middleware(
+        AdmissionControlMiddleware,
+        controller=admission_controller,
+        exclude_paths=["/health", "/metrics", "/docs", "/redoc", "/openapi.json"],
+        retry_after=ADMISSION_RETRY_AFTER_SECONDS
+    )
+
 # CORS設定
 app.add_middleware(
     CORSMiddleware,
@@ -29,6 +300,7 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=["X-Next-Cursor"],
 )
 
 # ロギングミドルウェアの追加
@@ -36,11 +308,16 @@ app.add_middleware(
     LoggingMiddleware,
     log_level=logging.INFO,
     exclude_paths=["/health", "/metrics", "/docs", "/redoc", "/openapi.json"],
-    exclude_methods=["OPTIONS"]
+    exclude_methods=["OPTIONS"],
+    pipeline=log_pipeline
 )
 
-# 環境変数の取得
-AUTH_TYPE = os.getenv("AUTH_TYPE", "local")
+# メトリクスミドルウェアの追加（最も外側で計測する）
+app.add_middleware(
+    MetricsMiddleware,
+    registry=metrics_registry,
+    exclude_paths=["/metrics"]
+)
 
 def get_env_prefix(auth_type: str) -> str:
     if auth_type == "local":
@@ -48,16 +325,22 @@ def get_env_prefix(auth_type: str) -> str:
     return f"{auth_type.upper()}_"
 
 # 依存関係の注入
-def get_user_repository():
-    return DynamoDBUserRepository(table_name="users")
+def get_user_repository(request: Request) -> UserRepository:
+    return request.app.state.user_repository
 
+def get_user_search_index(request: Request) -> Optional[UserSearchIndex]:
+    return request.app.state.user_search_index
+
+# 認証サービス（Cognitoクライアントを含む）はプロセスごとに1つだけ生成する
+@lru_cache(maxsize=1)
 def get_auth_service():
     env_prefix = get_env_prefix(AUTH_TYPE)
     
     if AUTH_TYPE == "local":
         return AuthFactory.create_auth(
             auth_type="local",
-            secret_key=os.getenv(f"{env_prefix}LOCAL_SECRET_KEY")
+            secret_key=os.getenv(f"{env_prefix}LOCAL_SECRET_KEY"),
+            password_hasher=get_password_hasher()
         )
     
     return AuthFactory.create_auth(
@@ -65,8 +348,34 @@ def get_auth_service():
         user_pool_id=os.getenv(f"{env_prefix}AWS_COGNITO_USER_POOL_ID"),
         client_id=os.getenv(f"{env_prefix}AWS_COGNITO_CLIENT_ID"),
         region=os.getenv(f"{env_prefix}AWS_REGION"),
-        secret_key=os.getenv(f"{env_prefix}AWS_COGNITO_SECRET_KEY")
+        secret_key=os.getenv(f"{env_prefix}AWS_COGNITO_SECRET_KEY"),
+        # moto などのローカルのCognito互換サーバーを使う場合に指定する
+        endpoint_url=os.getenv(f"{env_prefix}AWS_COGNITO_ENDPOINT_URL"),
+        max_pool_connections=COGNITO_MAX_POOL_CONNECTIONS
+    )
+
+# ワーカープロセスのプールはプロセスごとに1つだけ持つ（最初のハッシュ化・照合で起動する）
+@lru_cache(maxsize=1)
+def get_password_hasher() -> PasswordHasher:
+    password_hasher = PasswordHasher(
+        ln=PASSWORD_HASH_SCRYPT_LN,
+        r=PASSWORD_HASH_SCRYPT_R,
+        p=PASSWORD_HASH_SCRYPT_P,
+        max_workers=PASSWORD_HASH_WORKERS or None
     )
+    metrics_registry.add_stats_collector("password_hasher", password_hasher.stats, gauge_keys=("workers",))
+    return password_hasher
+
+@lru_cache(maxsize=1)
+def get_token_cache() -> VerifiedTokenCache:
+    token_cache = VerifiedTokenCache(
+        max_size=TOKEN_CACHE_MAX_SIZE,
+        max_ttl=TOKEN_CACHE_MAX_TTL_SECONDS
+    )
+    metrics_registry.add_stats_collector(
+        "token_cache", token_cache.stats, gauge_keys=("size", "max_size")
+    )
+    return token_cache
 
 # ルーターのインポート
 from app.interfaces.api.v1 import auth, users
@@ -82,4 +391,13 @@ async def root():
 @app.get("/health")
 async def health_check():
     """ヘルスチェックエンドポイント"""
-    return {"status": "healthy"} 
\ No newline at end of file
+    return {"status": "healthy"}
+
+@app.get("/metrics", include_in_schema=False)
+async def metrics():
+    """Prometheusテキスト形式のメトリクス（複数ワーカーの場合は全ワーカーの合計）"""
+    if metrics_store is not None:
+        snapshot = await metrics_store.collect()
+    else:
+        snapshot = metrics_registry.snapshot()
+    return PlainTextResponse(render_prometheus(snapshot), media_type=PROMETHEUS_CONTENT_TYPE)
\ No newline at end of file
@@ -1,3 +1,15 @@
+from app.middleware.admission_middleware import AdmissionController, AdmissionControlMiddleware, AdmissionLimits
+from app.middleware.compression_middleware import CompressionMiddleware
+from app.middleware.log_pipeline import LogPipeline
 from app.middleware.logging_middleware import LoggingMiddleware
+from app.middleware.metrics_middleware import MetricsMiddleware
 
-__all__ = ["LoggingMiddleware"] 
\ No newline at end of file
+__all__ = [
+    "AdmissionController",
+    "AdmissionControlMiddleware",
+    "AdmissionLimits",
+    "CompressionMiddleware",
+    "LogPipeline",
+    "LoggingMiddleware",
+    "MetricsMiddleware",
+]
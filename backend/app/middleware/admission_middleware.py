@@ -0,0 +1,205 @@
+import asyncio
+import time
+from collections import deque
+from dataclasses import dataclass
+from typing import Callable, Deque, Dict, Mapping, Optional
+
+from starlette.responses import JSONResponse
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+
+@dataclass(frozen=True)
+class AdmissionLimits:
+    """ルート区分ごとの同時実行数の制御設定"""
+    # 同時実行数の上限の初期値・下限・上限
+    initial_limit: int = 20
+    min_limit: int = 1
+    max_limit: int = 200
+    # 上限に達しているときに待たせるリクエスト数（超えた分は即座に 503）
+    queue_size: int = 100
+    # 待ち行列で待てる最大時間（秒）。超えたら 503
+    queue_timeout: float = 2.0
+    # この処理時間（秒）を超えたら上限を backoff 倍に下げ、下回れば少しずつ上げる
+    target_latency: float = 0.5
+    backoff: float = 0.9
+
+
+class AIMDLimiter:
+    """
+    同時実行数の上限を処理時間から AIMD（加算的増加・乗算的減少）で調整するリミッター
+
+    - 処理時間が target_latency 以下で、上限まで使われていれば上限を 1 / 上限 ずつ上げる（上限1回分の完了でおよそ +1）
+    - target_latency を超えたら上限を backoff 倍に下げる。同じ混雑で続けて下げすぎないよう、
+      下げるのはその処理時間が経過するごとに1回まで
+    - 上限に達しているときは queue_size 件まで到着順に待たせ、空きができたら先頭に枠を渡す
+    - asyncio の単一スレッド上で使うことを前提とし、ロックは持たない
+    """
+
+    def __init__(self, limits: AdmissionLimits):
+        self.limits = limits
+        self.limit = float(limits.initial_limit)
+        self.in_flight = 0
+        self._waiters: Deque[asyncio.Future] = deque()
+        self._last_decrease = 0.0
+        self.admitted = 0
+        self.rejected = 0
+        self.timed_out = 0
+
+    @property
+    def queued(self) -> int:
+        return len(self._waiters)
+
+    def _has_capacity(self) -> bool:
+        return self.in_flight < int(self.limit)
+
+    async def acquire(self) -> bool:
+        """枠を1つ確保する（待ち行列が一杯、または queue_timeout 以内に空かなければ False）"""
+        if self._has_capacity() and not self._waiters:
+            self.in_flight += 1
+            self.admitted += 1
+            return True
+        if len(self._waiters) >= self.limits.queue_size:
+            self.rejected += 1
+            return False
+        waiter = asyncio.get_running_loop().create_future()
+        self._waiters.append(waiter)
+        try:
+            # wait は期限切れでも waiter を取り消さない（期限と同時に枠を渡された場合を区別できる）
+            await asyncio.wait((waiter,), timeout=self.limits.queue_timeout)
+        except asyncio.CancelledError:
+            # 待っている間にクライアントが切断した場合、渡された枠は次の待ち手に回す
+            if waiter.done():
+                self._release_slot()
+            else:
+                self._waiters.remove(waiter)
+            raise
+        if waiter.done():
+            self.admitted += 1
+            return True
+        self._waiters.remove(waiter)
+        self.timed_out += 1
+        return False
+
+    def release(self, latency: float) -> None:
+        """枠を返し、処理時間（秒）から上限を調整する"""
+        limits = self.limits
+        if latency > limits.target_latency:
+            now = time.monotonic()
+            if now - self._last_decrease >= latency:
+                self._last_decrease = now
+                self.limit = max(float(limits.min_limit), self.limit * limits.backoff)
+        elif self.in_flight >= int(self.limit):
+            self.limit = min(float(limits.max_limit), self.limit + 1 / self.limit)
+        self._release_slot()
+
+    def _release_slot(self) -> None:
+        self.in_flight -= 1
+        while self._waiters and self._has_capacity():
+            waiter = self._waiters.popleft()
+            self.in_flight += 1
+            waiter.set_result(None)
+
+    def stats(self) -> Dict[str, float]:
+        return {
+            "limit": self.limit,
+            "in_flight": self.in_flight,
+            "queued": len(self._waiters),
+            "admitted": self.admitted,
+            "rejected": self.rejected,
+            "timed_out": self.timed_out,
+        }
+
+
+class AdmissionController:
+    """ルート区分ごとの AIMDLimiter（classify で scope から区分名を求める）"""
+
+    # stats() のうちゲージとして公開するキーの接尾辞
+    GAUGE_STATS = ("limit", "in_flight", "queued")
+
+    def __init__(self, limits: Mapping[str, AdmissionLimits], classify: Callable[[Scope], str]):
+        self.limiters = {name: AIMDLimiter(route_limits) for name, route_limits in limits.items()}
+        self.classify = classify
+
+    def limiter(self, scope: Scope) -> Optional[AIMDLimiter]:
+        # 設定の無い区分は制限しない
+        return self.limiters.get(self.classify(scope))
+
+    def gauge_keys(self) -> tuple:
+        return tuple(f"{name}_{key}" for name in self.limiters for key in self.GAUGE_STATS)
+
+    def stats(self) -> Dict[str, float]:
+        """"<区分>_<項目>" をキーにした全区分の状態"""
+        return {
+            f"{name}_{key}": value
+            for name, limiter in self.limiters.items()
+            for key, value in limiter.stats().items()
+        }
+
+
+class AdmissionControlMiddleware:
+    """
+    ルート区分ごとに同時に処理するリクエスト数を制限する素のASGIミドルウェア（負荷遮断）
+
+    上限に達しているリクエストは待ち行列で待たせ、待ち行列が一杯、または queue_timeout を過ぎても
+    枠が空かない場合は 503 と Retry-After を返してすぐに処理を打ち切る。
+    上限の調整に使う処理時間はレスポンスの開始（http.response.start）までを計測する
+    （ストリーミングの送信時間はクライアントの受信速度に左右され、サーバーの混雑を表さないため）。
+    枠はレスポンスボディの最終チャンクを送り終えるまで保持する。
+    exclude_paths（/health など）は常に制限せずに通す。
+    """
+
+    def __init__(
+        self,
+        app: ASGIApp,
+        controller: AdmissionController,
+        exclude_paths: Optional[list] = None,
+        retry_after: int = 1
+    ):
+        self.app = app
+        self.controller = controller
+        self.exclude_paths = exclude_paths or ["/health", "/metrics"]
+        self._excluded_prefixes = tuple(self.exclude_paths)
+        self.retry_after = retry_after
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http" or scope["path"].startswith(self._excluded_prefixes):
+            await self.app(scope, receive, send)
+            return
+        limiter = self.controller.limiter(scope)
+        if limiter is None:
+            await self.app(scope, receive, send)
+            return
+
+        if not await limiter.acquire():
+            response = JSONResponse(
+                {"detail": "Server is busy, please retry later"},
+                status_code=503,
+                headers={"Retry-After": str(self.retry_after)}
+            )
+            await response(scope, receive, send)
+            return
+
+        start_time = time.perf_counter()
+        latency: Optional[float] = None
+        released = False
+
+        def release() -> None:
+            nonlocal released
+            released = True
+            # レスポンスを開始できなかった場合は、枠を返すまでの時間を処理時間とする
+            limiter.release(latency if latency is not None else time.perf_counter() - start_time)
+
+        async def send_wrapper(message: Message) -> None:
+            nonlocal latency
+            if message["type"] == "http.response.start":
+                latency = time.perf_counter() - start_time
+            await send(message)
+            if message["type"] == "http.response.body" and not message.get("more_body", False) and not released:
+                release()
+
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            # 例外やクライアント切断でボディを送り切れなかった場合もここで返す
+            if not released:
+                release()
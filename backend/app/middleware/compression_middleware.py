@@ -0,0 +1,284 @@
+import re
+import zlib
+from functools import lru_cache
+from typing import Dict, List, Mapping, Optional, Tuple
+
+from starlette.datastructures import Headers, MutableHeaders
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+try:
+    import brotli
+except ImportError:  # brotli が無い環境では br を提示しない
+    brotli = None
+
+try:
+    import zstandard
+except ImportError:  # zstandard が無い環境では zstd を提示しない
+    zstandard = None
+
+# 既定の圧縮対象（メディアタイプ → 最小サイズ。"/" で終わるものは前方一致。None は minimum_size を使う）
+DEFAULT_CONTENT_TYPES: Dict[str, Optional[int]] = {
+    "application/json": None,
+    "application/x-ndjson": None,
+    "application/problem+json": None,
+    "text/": None,
+}
+
+# 既定の圧縮レベル（ストリーミングでも1チャンクあたりのCPUが大きくならない程度）
+DEFAULT_LEVELS: Dict[str, int] = {"zstd": 3, "br": 4, "gzip": 5}
+
+# 強いETagの末尾に付けるエンコーディングごとの接尾辞（"<tag>-gzip" など）
+_ETAG_SUFFIX = re.compile(r'-(gzip|br|zstd)"$')
+
+
+class _Encoder:
+    """
+    1レスポンス分の圧縮器（compress で入力を渡し、flush でそこまでの出力を取り出し、finish で残りを取り出す）
+
+    flush はストリームを終えずにそこまでの入力を復元できる出力を取り出す（zlib の Z_SYNC_FLUSH、
+    brotli の flush、zstd のブロックのフラッシュ）。圧縮率は少し下がるが、クライアントはチャンクごとに展開できる
+    """
+
+    def __init__(self, encoding: str, level: int):
+        if encoding == "zstd":
+            compressor = zstandard.ZstdCompressor(level=level).compressobj()
+            self.compress = compressor.compress
+            self.flush = lambda: compressor.flush(zstandard.COMPRESSOBJ_FLUSH_BLOCK)
+            self.finish = compressor.flush
+        elif encoding == "br":
+            compressor = brotli.Compressor(quality=level)
+            self.compress = compressor.process
+            self.flush = compressor.flush
+            self.finish = compressor.finish
+        else:
+            # wbits=31 で gzip 形式のヘッダー・トレーラーを付ける
+            compressor = zlib.compressobj(level, zlib.DEFLATED, 31)
+            self.compress = compressor.compress
+            self.flush = lambda: compressor.flush(zlib.Z_SYNC_FLUSH)
+            self.finish = compressor.flush
+
+
+def available_encodings() -> Tuple[str, ...]:
+    """この環境で使えるエンコーディング（サーバー側の優先順）"""
+    encodings = []
+    if zstandard is not None:
+        encodings.append("zstd")
+    if brotli is not None:
+        encodings.append("br")
+    encodings.append("gzip")
+    return tuple(encodings)
+
+
+@lru_cache(maxsize=256)
+def negotiate_encoding(accept_encoding: str, encodings: Tuple[str, ...]) -> Optional[str]:
+    """
+    Accept-Encoding から使うエンコーディングを選ぶ（RFC 9110 12.5.3）
+
+    q 値が最も大きいものを選び、同じ q 値ならサーバー側の優先順（encodings の順）で選ぶ。
+    q=0 のものと、* で許可されていても明示的に拒否されたものは使わない。
+    """
+    weights: Dict[str, float] = {}
+    for part in accept_encoding.split(","):
+        coding, _, params = part.strip().partition(";")
+        coding = coding.strip().lower()
+        if not coding:
+            continue
+        weight = 1.0
+        params = params.strip()
+        if params[:2].lower() == "q=":
+            try:
+                weight = float(params[2:])
+            except ValueError:
+                weight = 0.0
+        weights[coding] = weight
+    best: Optional[str] = None
+    best_weight = 0.0
+    for encoding in encodings:
+        weight = weights.get(encoding, weights.get("*", 0.0))
+        if weight > best_weight:
+            best, best_weight = encoding, weight
+    return best
+
+
+class CompressionMiddleware:
+    """
+    レスポンスボディを Accept-Encoding に応じて zstd / br / gzip で圧縮する素のASGIミドルウェア
+
+    - 対象は content_types に一致するメディアタイプで、メディアタイプごとに最小サイズを指定できる
+      （最小サイズ未満の単一チャンクのレスポンスは圧縮しない）
+    - 複数チャンクのストリーミングレスポンスはチャンクごとに圧縮してフラッシュし、そのチャンクの分を送る
+      （ボディ全体をバッファしない。Content-Length はチャンク化転送のため取り除く）
+    - 既に Content-Encoding があるレスポンス、Cache-Control: no-transform、HEAD、ボディを持たないステータスは圧縮しない
+    - brotli / zstandard は導入されている場合だけ使う
+    - 圧縮したレスポンスの強いETagにはエンコーディングの接尾辞を付け（"<tag>-gzip"）、
+      表現ごとに異なるETagにする。リクエストの If-None-Match / If-Match からは接尾辞を取り除いてから
+      下位のアプリへ渡すため、アプリは圧縮の有無を意識せずにETagを比較できる
+    """
+
+    def __init__(
+        self,
+        app: ASGIApp,
+        minimum_size: int = 1024,
+        content_types: Optional[Mapping[str, Optional[int]]] = None,
+        levels: Optional[Mapping[str, int]] = None,
+        encodings: Optional[Tuple[str, ...]] = None,
+        exclude_paths: Optional[list] = None
+    ):
+        self.app = app
+        self.minimum_size = minimum_size
+        rules = DEFAULT_CONTENT_TYPES if content_types is None else content_types
+        self._exact_types = {
+            media_type: minimum_size if size is None else size
+            for media_type, size in rules.items() if not media_type.endswith("/")
+        }
+        self._prefix_types = [
+            (media_type, minimum_size if size is None else size)
+            for media_type, size in rules.items() if media_type.endswith("/")
+        ]
+        self.levels = {**DEFAULT_LEVELS, **(levels or {})}
+        available = available_encodings()
+        self.encodings = tuple(
+            encoding for encoding in (encodings or available) if encoding in available
+        )
+        self.exclude_paths = exclude_paths or []
+        self._excluded_prefixes = tuple(self.exclude_paths)
+
+    def _minimum_size(self, content_type: Optional[str]) -> Optional[int]:
+        # 圧縮対象でなければ None
+        if not content_type:
+            return None
+        media_type = content_type.partition(";")[0].strip().lower()
+        size = self._exact_types.get(media_type)
+        if size is not None:
+            return size
+        for prefix, prefix_size in self._prefix_types:
+            if media_type.startswith(prefix):
+                return prefix_size
+        return None
+
+    @staticmethod
+    def _strip_etag_suffixes(scope: Scope) -> Tuple[Scope, Dict[str, str]]:
+        """
+        If-None-Match / If-Match のETagから接尾辞を取り除いた scope と、
+        取り除いたETag（元のETag → 接尾辞）を返す
+        """
+        stripped: Dict[str, str] = {}
+        headers: List[Tuple[bytes, bytes]] = []
+        changed = False
+        for name, value in scope["headers"]:
+            if name in (b"if-none-match", b"if-match"):
+                tags = []
+                for tag in value.decode("latin-1").split(","):
+                    tag = tag.strip()
+                    match = _ETAG_SUFFIX.search(tag)
+                    if match and not tag.startswith("W/"):
+                        base = tag[:match.start()] + '"'
+                        stripped[base] = match.group(0)[:-1]
+                        tag = base
+                        changed = True
+                    tags.append(tag)
+                value = ", ".join(tags).encode("latin-1")
+            headers.append((name, value))
+        if not changed:
+            return scope, stripped
+        return {**scope, "headers": headers}, stripped
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http" or scope["path"].startswith(self._excluded_prefixes):
+            await self.app(scope, receive, send)
+            return
+
+        request_headers = Headers(scope=scope)
+        encoding = None
+        if scope["method"] != "HEAD":
+            encoding = negotiate_encoding(request_headers.get("accept-encoding", ""), self.encodings)
+        if request_headers.get("if-none-match") or request_headers.get("if-match"):
+            scope, stripped_etags = self._strip_etag_suffixes(scope)
+        else:
+            stripped_etags = {}
+
+        start_message: Optional[Message] = None
+        encoder: Optional[_Encoder] = None
+        passthrough = False
+        threshold = self.minimum_size
+
+        def start_compressed(headers: MutableHeaders) -> None:
+            nonlocal encoder
+            encoder = _Encoder(encoding, self.levels[encoding])
+            headers["content-encoding"] = encoding
+            etag = headers.get("etag")
+            if etag and not etag.startswith("W/"):
+                headers["etag"] = etag[:-1] + f'-{encoding}"'
+
+        async def send_wrapper(message: Message) -> None:
+            nonlocal start_message, passthrough, threshold
+            message_type = message["type"]
+            if message_type == "http.response.start":
+                headers = MutableHeaders(raw=message["headers"])
+                status_code = message["status"]
+                if status_code == 304:
+                    # 304 には、クライアントが送ってきた接尾辞付きのETagを返す
+                    etag = headers.get("etag")
+                    if etag in stripped_etags:
+                        headers["etag"] = etag[:-1] + stripped_etags[etag] + '"'
+                    passthrough = True
+                    await send(message)
+                    return
+                minimum_size = self._minimum_size(headers.get("content-type"))
+                if minimum_size is not None and "content-encoding" not in headers:
+                    # 圧縮しない場合でも、表現が Accept-Encoding によって変わりうることを示す
+                    headers.add_vary_header("Accept-Encoding")
+                if (
+                    encoding is None
+                    or minimum_size is None
+                    or status_code < 200
+                    or status_code == 204
+                    or "content-encoding" in headers
+                    or "no-transform" in headers.get("cache-control", "")
+                    or int(headers.get("content-length", minimum_size)) < minimum_size
+                ):
+                    passthrough = True
+                    await send(message)
+                    return
+                # 最初のボディを見てから（単一チャンクならサイズで）圧縮するかを決める
+                start_message = message
+                threshold = minimum_size
+                return
+
+            if message_type != "http.response.body" or passthrough:
+                await send(message)
+                return
+
+            body: bytes = message.get("body", b"")
+            more_body: bool = message.get("more_body", False)
+            if start_message is not None:
+                pending, start_message = start_message, None
+                if not more_body and len(body) < threshold:
+                    passthrough = True
+                    await send(pending)
+                    await send(message)
+                    return
+                headers = MutableHeaders(raw=pending["headers"])
+                start_compressed(headers)
+                if more_body:
+                    del headers["content-length"]
+                    await send(pending)
+                else:
+                    compressed = encoder.compress(body) + encoder.finish()
+                    headers["content-length"] = str(len(compressed))
+                    await send(pending)
+                    await send({"type": "http.response.body", "body": compressed})
+                    return
+
+            if not more_body:
+                await send({"type": "http.response.body", "body": encoder.compress(body) + encoder.finish()})
+                return
+            if body:
+                # 受け取ったチャンクごとにフラッシュし、圧縮器に溜めずにクライアントへ届ける（NDJSON の逐次出力など）
+                await send({
+                    "type": "http.response.body",
+                    "body": encoder.compress(body) + encoder.flush(),
+                    "more_body": True
+                })
+
+        await self.app(scope, receive, send_wrapper)
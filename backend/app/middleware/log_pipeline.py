@@ -0,0 +1,161 @@
+import json
+import logging
+import queue
+import random
+import sys
+import threading
+import time
+from typing import IO, Any, Dict, List, Optional, Tuple
+
+try:
+    import orjson
+except ImportError:  # orjson が無い環境では標準のjsonを使う
+    orjson = None
+
+
+def dumps(obj: Any) -> str:
+    """構造化ログ用のJSONエンコード（orjsonがあれば使用する）"""
+    if orjson is not None:
+        return orjson.dumps(obj, default=str).decode("utf-8")
+    return json.dumps(obj, default=str)
+
+
+# キューに積む1件分のログ: (作成時刻, ログレベル, メッセージの接頭辞, 構造化データ)
+_Entry = Tuple[float, int, str, Dict[str, Any]]
+
+
+class LogPipeline:
+    """
+    構造化ログをイベントループの外で書き出すパイプライン
+
+    - submit() はキューに積むだけで、JSONへの変換と書き込みはバックグラウンドスレッドで行う
+    - バックグラウンドスレッドは最大 batch_size 件をまとめて1回の write で出力する
+    - 2xx のレスポンスは success_sample_rate の割合だけ残し、4xx/5xx と遅いリクエストは常に残す
+    - キューが満杯の場合は最大 put_timeout 秒だけ待ち、それでも空かなければ破棄して dropped を数える
+    出力形式は logging.basicConfig の書式（日時 - ロガー名 - レベル - メッセージ）に合わせています
+    """
+
+    def __init__(
+        self,
+        stream: Optional[IO[str]] = None,
+        logger_name: str = "api",
+        max_queue_size: int = 10000,
+        batch_size: int = 256,
+        flush_interval: float = 0.2,
+        success_sample_rate: float = 1.0,
+        slow_threshold_ms: float = 1000.0,
+        put_timeout: float = 0.0
+    ):
+        self.stream = stream or sys.stderr
+        self.logger_name = logger_name
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.success_sample_rate = success_sample_rate
+        self.slow_threshold_ms = slow_threshold_ms
+        self.put_timeout = put_timeout
+        self._queue: "queue.Queue[Optional[_Entry]]" = queue.Queue(maxsize=max_queue_size)
+        self._thread: Optional[threading.Thread] = None
+        self._lock = threading.Lock()
+        self.enqueued = 0
+        self.written = 0
+        self.dropped = 0
+        self.sampled_out = 0
+        self.write_errors = 0
+
+    def start(self) -> None:
+        with self._lock:
+            if self._thread is not None and self._thread.is_alive():
+                return
+            self._thread = threading.Thread(target=self._run, name="log-pipeline", daemon=True)
+            self._thread.start()
+
+    def stop(self, timeout: float = 5.0) -> None:
+        """キューに残ったログを書き出してからスレッドを止める"""
+        thread = self._thread
+        if thread is None:
+            return
+        try:
+            self._queue.put(None, timeout=timeout)
+        except queue.Full:
+            pass
+        thread.join(timeout)
+        self._thread = None
+
+    def should_keep(self, status_code: int, process_time_ms: float) -> bool:
+        """レスポンスのログを残すかどうか（エラーと遅いリクエストは必ず残す）"""
+        if status_code >= 400 or process_time_ms >= self.slow_threshold_ms:
+            return True
+        if self.success_sample_rate >= 1.0 or random.random() < self.success_sample_rate:
+            return True
+        self.sampled_out += 1
+        return False
+
+    def submit(self, level: int, prefix: str, record: Dict[str, Any]) -> bool:
+        """ログを1件キューに積む。破棄した場合は False を返す"""
+        if self._thread is None:
+            self.start()
+        entry = (time.time(), level, prefix, record)
+        try:
+            if self.put_timeout > 0:
+                self._queue.put(entry, timeout=self.put_timeout)
+            else:
+                self._queue.put_nowait(entry)
+        except queue.Full:
+            self.dropped += 1
+            return False
+        self.enqueued += 1
+        return True
+
+    def _format(self, entry: _Entry) -> str:
+        created, level, prefix, record = entry
+        timestamp = time.strftime("%Y-%m-%d %H:%M:%S", time.localtime(created))
+        msecs = int((created - int(created)) * 1000)
+        level_name = logging.getLevelName(level)
+        return f"{timestamp},{msecs:03d} - {self.logger_name} - {level_name} - {prefix}: {dumps(record)}\n"
+
+    def _write(self, batch: List[_Entry]) -> None:
+        try:
+            self.stream.write("".join(self._format(entry) for entry in batch))
+            self.stream.flush()
+            self.written += len(batch)
+        except Exception:
+            self.write_errors += 1
+
+    def _run(self) -> None:
+        stopping = False
+        while True:
+            try:
+                first = self._queue.get(timeout=self.flush_interval)
+            except queue.Empty:
+                if stopping:
+                    return
+                continue
+            batch: List[_Entry] = []
+            if first is None:
+                stopping = True
+            else:
+                batch.append(first)
+            # 溜まっている分をまとめて取り出す
+            while len(batch) < self.batch_size:
+                try:
+                    entry = self._queue.get_nowait()
+                except queue.Empty:
+                    break
+                if entry is None:
+                    stopping = True
+                    continue
+                batch.append(entry)
+            if batch:
+                self._write(batch)
+            if stopping and self._queue.empty():
+                return
+
+    def stats(self) -> Dict[str, int]:
+        return {
+            "queued": self._queue.qsize(),
+            "enqueued": self.enqueued,
+            "written": self.written,
+            "dropped": self.dropped,
+            "sampled_out": self.sampled_out,
+            "write_errors": self.write_errors,
+        }
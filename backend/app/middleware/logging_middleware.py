@@ -2,119 +2,185 @@ import time
 import json
 import logging
 import uuid
-from fastapi import Request, Response
-from starlette.middleware.base import BaseHTTPMiddleware
-from starlette.types import ASGIApp
-from typing import Callable, Dict, Any, Optional
+from typing import Any, Dict, Optional
+
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+from app.infrastructure.dynamodb.accounting import RequestUsage, begin_request_usage, end_request_usage
+from app.middleware.log_pipeline import LogPipeline
 
 # ロガーの設定
 logger = logging.getLogger("api")
 
-class LoggingMiddleware(BaseHTTPMiddleware):
+# マスクするヘッダーと置き換える値
+_REDACTED_HEADERS = {
+    "authorization": "Bearer [REDACTED]",
+    "cookie": "[REDACTED]",
+}
+
+class LoggingMiddleware:
     """
     HTTPリクエスト/レスポンスの詳細をログに記録するミドルウェア
     構造化されたJSON形式でログを出力します
+
+    BaseHTTPMiddleware を使わない素のASGIミドルウェアとして実装しているため、
+    ログ対象外のパス・メソッドはそのまま下位のアプリへ渡し、追加の処理を行いません。
+    レスポンスボディには手を加えず、ストリーミングレスポンスもそのまま流します。
+
+    pipeline を指定した場合はログをバックグラウンドスレッドで書き出し、
+    リクエストログはレスポンス確定後にサンプリングの判定とあわせて出力します。
+
+    リクエストごとにDynamoDB呼び出しの集計（RequestUsage）を開始し、呼び出しがあった場合は
+    回数・レイテンシ・消費RCU/WCUをレスポンスログの "dynamodb" に出力します。
+    集計は scope["state"]["dynamodb_usage"] にも格納し、外側のミドルウェアから参照できるようにします。
     """
-    
+
     def __init__(
-        self, 
-        app: ASGIApp, 
+        self,
+        app: ASGIApp,
         log_level: int = logging.INFO,
         exclude_paths: Optional[list] = None,
-        exclude_methods: Optional[list] = None
+        exclude_methods: Optional[list] = None,
+        pipeline: Optional[LogPipeline] = None
     ):
-        super().__init__(app)
+        self.app = app
+        self.pipeline = pipeline
         self.log_level = log_level
         self.exclude_paths = exclude_paths or ["/health", "/metrics"]
         self.exclude_methods = exclude_methods or ["OPTIONS"]
-    
-    async def dispatch(self, request: Request, call_next: Callable) -> Response:
+        # str.startswith にタプルを渡して前方一致をまとめて判定する
+        self._excluded_prefixes = tuple(self.exclude_paths)
+        self._excluded_methods = frozenset(self.exclude_methods)
+
+    def _is_excluded(self, scope: Scope) -> bool:
+        return (
+            scope["path"].startswith(self._excluded_prefixes)
+            or scope["method"] in self._excluded_methods
+        )
+
+    @staticmethod
+    def _headers(raw_headers: Any) -> Dict[str, str]:
+        headers = {}
+        for name, value in raw_headers:
+            key = name.decode("latin-1").lower()
+            headers[key] = _REDACTED_HEADERS.get(key) or value.decode("latin-1")
+        return headers
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        # HTTP以外（websocket, lifespan）とログ除外対象はそのまま渡す
+        if scope["type"] != "http" or self._is_excluded(scope):
+            await self.app(scope, receive, send)
+            return
+
         # リクエストIDを生成
         request_id = str(uuid.uuid4())
-        request.state.request_id = request_id
-        
-        # リクエストパスがログ除外対象か確認
-        if any(request.url.path.startswith(path) for path in self.exclude_paths):
-            return await call_next(request)
-            
-        # リクエストメソッドがログ除外対象か確認
-        if request.method in self.exclude_methods:
-            return await call_next(request)
-        
+        state = scope.setdefault("state", {})
+        state["request_id"] = request_id
+        usage, usage_token = begin_request_usage(request_id)
+        state["dynamodb_usage"] = usage
+
         # リクエスト開始時間
         start_time = time.time()
-        
+
         # クライアント情報
-        client_host = request.client.host if request.client else "unknown"
-        client_port = request.client.port if request.client else "unknown"
-        
-        # ヘッダー情報
-        headers = dict(request.headers)
-        # 機密情報をマスク
-        if "authorization" in headers:
-            headers["authorization"] = "Bearer [REDACTED]"
-        if "cookie" in headers:
-            headers["cookie"] = "[REDACTED]"
-            
+        client = scope.get("client")
+        client_host = client[0] if client else "unknown"
+        client_port = client[1] if client else "unknown"
+
         # リクエスト情報をログに記録
         request_log = {
             "request_id": request_id,
             "client_ip": client_host,
             "client_port": client_port,
-            "method": request.method,
-            "path": request.url.path,
-            "query_params": str(request.query_params),
-            "headers": headers,
+            "method": scope["method"],
+            "path": scope["path"],
+            "query_params": scope.get("query_string", b"").decode("latin-1"),
+            "headers": self._headers(scope["headers"]),
             "timestamp": time.strftime("%Y-%m-%d %H:%M:%S")
         }
-        
-        # リクエストボディの取得（オプション）
-        # リクエストボディを読み取ると元のリクエストハンドラでは読めなくなるため、通常は本番環境では無効にする
-        # try:
-        #     body = await request.body()
-        #     if body:
-        #         request_log["body"] = body.decode("utf-8")
-        # except Exception:
-        #     request_log["body"] = "Could not parse body"
-            
-        logger.log(self.log_level, f"Request received: {json.dumps(request_log)}")
-        
-        # レスポンス処理
+        if self.pipeline is None:
+            self._emit(self.log_level, "Request received", request_log)
+
+        status_code = 500
+        response_headers: Dict[str, str] = {}
+        response_started = False
+        response_logged = False
+
+        async def send_wrapper(message: Message) -> None:
+            nonlocal status_code, response_headers, response_started, response_logged
+            if message["type"] == "http.response.start":
+                response_started = True
+                status_code = message["status"]
+                response_headers = self._headers(message.get("headers", []))
+            await send(message)
+            # ボディの最終チャンクを送り終えた時点でレスポンスログを出力する
+            if message["type"] == "http.response.body" and not message.get("more_body", False):
+                response_logged = True
+                self._log_response(request_log, status_code, response_headers, start_time, usage)
+
         try:
-            response = await call_next(request)
-            
-            # 処理時間計算
-            process_time = time.time() - start_time
-            
-            # レスポンス情報
-            response_log = {
-                "request_id": request_id,
-                "status_code": response.status_code,
-                "headers": dict(response.headers),
-                "process_time_ms": round(process_time * 1000, 2),
-                "timestamp": time.strftime("%Y-%m-%d %H:%M:%S")
-            }
-            
-            # ステータスコードに基づいてログレベルを調整
-            log_level = self.log_level
-            if response.status_code >= 500:
-                log_level = logging.ERROR
-            elif response.status_code >= 400:
-                log_level = logging.WARNING
-                
-            logger.log(log_level, f"Response sent: {json.dumps(response_log)}")
-            
-            return response
-            
+            await self.app(scope, receive, send_wrapper)
         except Exception as e:
             # 例外情報
             error_log = {
                 "request_id": request_id,
                 "error": str(e),
                 "error_type": e.__class__.__name__,
+                "response_started": response_started,
                 "process_time_ms": round((time.time() - start_time) * 1000, 2),
                 "timestamp": time.strftime("%Y-%m-%d %H:%M:%S")
             }
-            
-            logger.error(f"Exception occurred: {json.dumps(error_log)}")
-            raise 
\ No newline at end of file
+            if usage.calls:
+                error_log["dynamodb"] = usage.to_log()
+
+            if self.pipeline is not None and not response_logged:
+                self._emit(self.log_level, "Request received", request_log)
+            self._emit(logging.ERROR, "Exception occurred", error_log)
+            raise
+        finally:
+            end_request_usage(usage_token)
+
+    def _emit(self, level: int, prefix: str, record: Dict[str, Any]) -> None:
+        if not logger.isEnabledFor(level):
+            return
+        if self.pipeline is not None:
+            self.pipeline.submit(level, prefix, record)
+        else:
+            logger.log(level, f"{prefix}: {json.dumps(record)}")
+
+    def _log_response(
+        self,
+        request_log: Dict[str, Any],
+        status_code: int,
+        headers: Dict[str, str],
+        start_time: float,
+        usage: Optional[RequestUsage] = None
+    ) -> None:
+        # 処理時間計算
+        process_time_ms = round((time.time() - start_time) * 1000, 2)
+
+        if self.pipeline is not None:
+            # 成功レスポンスはサンプリングし、残す場合のみリクエストログもあわせて出力する
+            if not self.pipeline.should_keep(status_code, process_time_ms):
+                return
+            self._emit(self.log_level, "Request received", request_log)
+
+        # レスポンス情報
+        response_log = {
+            "request_id": request_log["request_id"],
+            "status_code": status_code,
+            "headers": headers,
+            "process_time_ms": process_time_ms,
+            "timestamp": time.strftime("%Y-%m-%d %H:%M:%S")
+        }
+        if usage is not None and usage.calls:
+            response_log["dynamodb"] = usage.to_log()
+
+        # ステータスコードに基づいてログレベルを調整
+        log_level = self.log_level
+        if status_code >= 500:
+            log_level = logging.ERROR
+        elif status_code >= 400:
+            log_level = logging.WARNING
+
+        self._emit(log_level, "Response sent", response_log)
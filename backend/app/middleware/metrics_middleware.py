@@ -0,0 +1,153 @@
+import time
+from typing import Any, Dict, Optional
+
+from starlette.routing import Match
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+from app.infrastructure.metrics import MetricsRegistry
+
+# ルートに一致しなかったリクエストのラベル（任意のパスでラベルが増え続けないようにまとめる）
+UNMATCHED_ROUTE = "__unmatched__"
+
+# 1リクエストあたりのDynamoDB呼び出し回数のバケット
+CALLS_PER_REQUEST_BUCKETS = (0, 1, 2, 3, 5, 10, 25, 50, 100, 250, 1000)
+
+
+class MetricsMiddleware:
+    """
+    HTTPリクエストのメトリクスを記録する素のASGIミドルウェア
+
+    - http_requests_total: メソッド・ルートテンプレート・ステータスクラス（2xx など）ごとのリクエスト数
+    - http_requests_in_progress: メソッドごとの処理中リクエスト数
+    - http_request_duration_seconds: メソッド・ルートテンプレート・ステータスクラスごとの処理時間
+
+    LoggingMiddleware が scope["state"]["dynamodb_usage"] に格納したDynamoDB呼び出しの集計も
+    メソッド・ルートテンプレートごとに加算する（呼び出し回数・所要時間・消費RCU/WCU・1リクエストあたりの呼び出し回数）。
+
+    ラベルには実際のパス（/users/123）ではなくルートテンプレート（/users/{user_id}）を使う。
+    処理時間はレスポンスボディの最終チャンクを送り終えるまでを計測します。
+    """
+
+    def __init__(
+        self,
+        app: ASGIApp,
+        registry: MetricsRegistry,
+        exclude_paths: Optional[list] = None
+    ):
+        self.app = app
+        self.exclude_paths = exclude_paths or ["/metrics"]
+        self._excluded_prefixes = tuple(self.exclude_paths)
+        self.requests_total = registry.counter(
+            "http_requests_total",
+            "Total HTTP requests by method, route template and status class.",
+            ("method", "route", "status")
+        )
+        self.requests_in_progress = registry.gauge(
+            "http_requests_in_progress",
+            "HTTP requests currently being processed.",
+            ("method",)
+        )
+        self.request_duration = registry.histogram(
+            "http_request_duration_seconds",
+            "HTTP request latency by method, route template and status class.",
+            ("method", "route", "status")
+        )
+        self.dynamodb_calls = registry.counter(
+            "dynamodb_calls_total",
+            "DynamoDB calls by method, route template and operation.",
+            ("method", "route", "operation")
+        )
+        self.dynamodb_call_seconds = registry.counter(
+            "dynamodb_call_seconds_total",
+            "Time spent in DynamoDB calls by method, route template and operation.",
+            ("method", "route", "operation")
+        )
+        self.dynamodb_read_units = registry.counter(
+            "dynamodb_consumed_read_capacity_units_total",
+            "Consumed DynamoDB read capacity units by method, route template and operation.",
+            ("method", "route", "operation")
+        )
+        self.dynamodb_write_units = registry.counter(
+            "dynamodb_consumed_write_capacity_units_total",
+            "Consumed DynamoDB write capacity units by method, route template and operation.",
+            ("method", "route", "operation")
+        )
+        self.dynamodb_calls_per_request = registry.histogram(
+            "dynamodb_calls_per_request",
+            "DynamoDB round-trips per HTTP request by method and route template.",
+            ("method", "route"),
+            buckets=CALLS_PER_REQUEST_BUCKETS
+        )
+        # エンドポイント関数 → ルートテンプレート
+        self._route_templates: Dict[Any, str] = {}
+
+    def _route_template(self, scope: Scope) -> str:
+        # ルーティング後の scope には一致したエンドポイントが入っている
+        endpoint = scope.get("endpoint")
+        if endpoint is not None:
+            template = self._route_templates.get(endpoint)
+            if template is not None:
+                return template
+        app = scope.get("app")
+        if app is None:
+            return UNMATCHED_ROUTE
+        # 初回（またはエンドポイントが見つからない場合）はルートを照合して結果を覚えておく
+        for route in getattr(app, "routes", []):
+            match, _ = route.matches(scope)
+            if match == Match.FULL:
+                template = getattr(route, "path", UNMATCHED_ROUTE)
+                if endpoint is not None and getattr(route, "endpoint", None) is endpoint:
+                    self._route_templates[endpoint] = template
+                return template
+        return UNMATCHED_ROUTE
+
+    def _record_dynamodb_usage(self, scope: Scope, method: str, route: str) -> None:
+        usage = scope.get("state", {}).get("dynamodb_usage")
+        if usage is None:
+            return
+        self.dynamodb_calls_per_request.observe((method, route), usage.calls)
+        for operation, operation_usage in usage.operations.items():
+            labels = (method, route, operation)
+            self.dynamodb_calls.inc(labels, operation_usage.calls)
+            self.dynamodb_call_seconds.inc(labels, operation_usage.latency_ms / 1000)
+            if operation_usage.read_units:
+                self.dynamodb_read_units.inc(labels, operation_usage.read_units)
+            if operation_usage.write_units:
+                self.dynamodb_write_units.inc(labels, operation_usage.write_units)
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http" or scope["path"].startswith(self._excluded_prefixes):
+            await self.app(scope, receive, send)
+            return
+
+        method = scope["method"]
+        in_progress_labels = (method,)
+        self.requests_in_progress.inc(in_progress_labels)
+        start_time = time.perf_counter()
+        status_code = 500
+        recorded = False
+
+        def record() -> None:
+            nonlocal recorded
+            recorded = True
+            self.requests_in_progress.dec(in_progress_labels)
+            route = self._route_template(scope)
+            labels = (method, route, f"{status_code // 100}xx")
+            self.requests_total.inc(labels)
+            self.request_duration.observe(labels, time.perf_counter() - start_time)
+            self._record_dynamodb_usage(scope, method, route)
+
+        async def send_wrapper(message: Message) -> None:
+            nonlocal status_code
+            if message["type"] == "http.response.start":
+                status_code = message["status"]
+            await send(message)
+            if message["type"] == "http.response.body" and not message.get("more_body", False) and not recorded:
+                record()
+
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            # 例外やクライアント切断でボディを送り切れなかった場合もここで記録する
+            if not recorded:
+                record()
@@ -0,0 +1,134 @@
+import asyncio
+import time
+import uuid
+from dataclasses import dataclass
+from typing import AsyncIterator, Callable, Dict, List, Optional, Set, Tuple
+
+from app.domain.user import UserBatch
+from app.domain.user.repository import EMAIL_ALREADY_REGISTERED, UserRepository
+
+
+@dataclass
+class ImportRow:
+    """取り込み対象の1行（parse_error がある場合は解析に失敗した行）"""
+    row: int
+    data: Optional[Dict[str, str]] = None
+    parse_error: Optional[str] = None
+
+
+class BulkUserImportUseCase:
+    """
+    ユーザーを一括で取り込む
+
+    - 行を逐次受け取り、batch_size 件たまるごとにリポジトリへまとめて書き込む（行は User を作らず UserBatch に積む）
+    - 書き込み中のバッチは max_in_flight 件までに制限し、解析と書き込みを重ねて実行する
+    - 行ごとの結果は report に渡し、呼び出し側で逐次出力できるようにする
+    - 行の読み込みが ValueError で中断した場合は、それまでの行を書き込んでから集計の error に理由を入れて返す
+      （書き込み済みのバッチがあるため、全体を失敗にはしない）
+    - アップロード内のメールアドレスの重複はここで、既存ユーザーとの重複はリポジトリの書き込みで検出する
+    """
+
+    def __init__(
+        self,
+        user_repository: UserRepository,
+        batch_size: int = 25,
+        max_in_flight: int = 4
+    ):
+        self.user_repository = user_repository
+        self.batch_size = batch_size
+        self.max_in_flight = max_in_flight
+
+    def _validate(self, data: Dict[str, str]) -> Tuple[str, str]:
+        """メールアドレスとユーザー名を検証して返す"""
+        email = (data.get("email") or "").strip()
+        username = (data.get("username") or "").strip()
+        if not email:
+            raise ValueError("email は必須です")
+        if len(username) < 3:
+            raise ValueError("ユーザー名は3文字以上必要です")
+        return email, username
+
+    async def execute(
+        self,
+        rows: AsyncIterator[ImportRow],
+        report: Callable[[dict], None]
+    ) -> dict:
+        started = time.perf_counter()
+        counts = {"created": 0, "failed": 0}
+        seen_emails: Set[str] = set()
+        batch = UserBatch()
+        batch_rows: List[int] = []
+        in_flight: Set[asyncio.Task] = set()
+
+        def fail(row: int, error: str) -> None:
+            counts["failed"] += 1
+            report({"row": row, "status": "error", "error": error})
+
+        async def write(pending: UserBatch, rows: List[int]) -> None:
+            try:
+                result = await self.user_repository.create_users(pending)
+            except Exception as e:
+                for row in rows:
+                    fail(row, f"書き込みに失敗しました: {e}")
+                return
+            for row, user_id in zip(rows, pending.ids):
+                error = result.errors.get(user_id)
+                if error:
+                    fail(row, error)
+                    continue
+                counts["created"] += 1
+                report({"row": row, "status": "created", "id": user_id})
+
+        async def flush() -> None:
+            nonlocal batch, batch_rows
+            if not batch:
+                return
+            if len(in_flight) >= self.max_in_flight:
+                _, still_running = await asyncio.wait(in_flight, return_when=asyncio.FIRST_COMPLETED)
+                in_flight.intersection_update(still_running)
+            in_flight.add(asyncio.create_task(write(batch, batch_rows)))
+            batch = UserBatch()
+            batch_rows = []
+
+        aborted: Optional[str] = None
+        try:
+            try:
+                async for import_row in rows:
+                    if import_row.parse_error:
+                        fail(import_row.row, import_row.parse_error)
+                        continue
+                    try:
+                        email, username = self._validate(import_row.data or {})
+                    except ValueError as e:
+                        fail(import_row.row, str(e))
+                        continue
+                    if email in seen_emails:
+                        # リポジトリが使用済みのメールアドレスを拒否した場合と同じメッセージにする
+                        fail(import_row.row, EMAIL_ALREADY_REGISTERED)
+                        continue
+                    seen_emails.add(email)
+
+                    batch.append(str(uuid.uuid4()), email, username)
+                    batch_rows.append(import_row.row)
+                    if len(batch) >= self.batch_size:
+                        await flush()
+            except ValueError as e:
+                # 入力を最後まで読めなかった場合も、それまでの行は書き込み、中断した理由を集計に含める
+                aborted = str(e)
+
+            await flush()
+            if in_flight:
+                await asyncio.wait(in_flight)
+        except BaseException:
+            # クライアントの切断などで中断された場合は、書き込み中のバッチを取り消してから戻る（以降は report を呼ばない）
+            for task in in_flight:
+                task.cancel()
+            if in_flight:
+                await asyncio.wait(in_flight)
+            raise
+
+        elapsed = time.perf_counter() - started
+        summary = dict(counts, elapsed_ms=round(elapsed * 1000, 2))
+        if aborted is not None:
+            summary["error"] = aborted
+        return summary
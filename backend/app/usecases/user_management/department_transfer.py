@@ -56,4 +56,4 @@ class DepartmentTransferUseCase:
 
         # 5. 承認待ち状態に更新
         user.update_transfer_status("pending")
-        await self.user_repository.update(user)
+        await self.user_repository.update_user(user)
@@ -0,0 +1,94 @@
+"""
+HTTPベンチマーク用のアプリケーション
+
+app.main の FastAPI アプリをそのまま使い、lifespan の最後でユーザーリポジトリだけを
+シード済みのベンチマーク用リポジトリに差し替えます。認証は AUTH_TYPE=local の MockAuth です。
+ミドルウェア・キャッシュ・計測などの構成は本番と同じです。
+
+シードするユーザーのIDは決定的（bench-user-000000 ...）なので、複数ワーカーで起動しても全ワーカーが同じデータを持ちます。
+
+環境変数:
+    BENCH_REPOSITORY            memory（InMemoryUserRepository、既定）または
+                                stub（DynamoDBUserRepository + StubDynamoDBClient）
+    BENCH_USERS                 シードするユーザー数（既定: 1000）
+    BENCH_REPOSITORY_LATENCY_MS stub の1往復あたりのレイテンシ（既定: 0）
+
+memory はレイテンシ0の基準で、フレームワーク自体のオーバーヘッドを切り分けるのに使います。
+
+使用例:
+    python -m uvicorn benchmarks.bench_app:app --workers 4 --port 8089
+"""
+import os
+from contextlib import asynccontextmanager
+from datetime import datetime
+
+# app.main の読み込み前にローカル認証とダミーのAWS設定を既定値として入れておく
+os.environ.setdefault("AUTH_TYPE", "local")
+os.environ.setdefault("LOCAL_SECRET_KEY", "benchmark-secret-key")
+os.environ.setdefault("AWS_REGION", "ap-northeast-1")
+os.environ.setdefault("AWS_ACCESS_KEY_ID", "benchmark")
+os.environ.setdefault("AWS_SECRET_ACCESS_KEY", "benchmark")
+
+from fastapi import FastAPI
+
+from app.domain.user import User, UserRepository
+from app.infrastructure.repositories.dynamodb_user_repository import DynamoDBUserRepository
+from app.infrastructure.repositories.in_memory_user_repository import InMemoryUserRepository
+from app.infrastructure.auth.mock_auth import MockAuth
+from app.main import app, attach_user_search, decorate_user_repository, get_auth_service
+from benchmarks.dynamodb_stub import StubDynamoDBClient
+
+BENCH_REPOSITORY = os.getenv("BENCH_REPOSITORY", "memory")
+BENCH_USERS = int(os.getenv("BENCH_USERS", "1000"))
+BENCH_REPOSITORY_LATENCY_MS = float(os.getenv("BENCH_REPOSITORY_LATENCY_MS", "0"))
+
+
+def bench_user_id(index: int) -> str:
+    return f"bench-user-{index:06d}"
+
+
+def create_bench_repository() -> UserRepository:
+    if BENCH_REPOSITORY == "memory":
+        return InMemoryUserRepository()
+    return DynamoDBUserRepository(
+        client=StubDynamoDBClient(latency=BENCH_REPOSITORY_LATENCY_MS / 1000),
+        table_name="users"
+    )
+
+
+async def seed_users(repository: UserRepository, count: int) -> None:
+    created_at = datetime(2024, 1, 1)
+    await repository.create_users([
+        User(
+            id=bench_user_id(index),
+            email=f"bench{index}@example.com",
+            username=f"bench{index:06d}",
+            roles=["user"],
+            created_at=created_at
+        )
+        for index in range(count)
+    ])
+
+
+_app_lifespan = app.router.lifespan_context
+
+
+@asynccontextmanager
+async def bench_lifespan(app: FastAPI):
+    async with _app_lifespan(app):
+        repository = create_bench_repository()
+        await seed_users(repository, BENCH_USERS)
+        # 元のリポジトリ向けに始まった検索索引の読み込みは捨て、ベンチマーク用のリポジトリから作り直す
+        search_load = getattr(app.state, "user_search_load", None)
+        if search_load is not None:
+            search_load.cancel()
+        app.state.user_repository = attach_user_search(
+            app, decorate_user_repository(repository, cache=BENCH_REPOSITORY != "memory")
+        )
+        auth_service = get_auth_service()
+        if isinstance(auth_service, MockAuth):
+            auth_service.user_repository = app.state.user_repository
+        yield
+
+
+app.router.lifespan_context = bench_lifespan
@@ -0,0 +1,96 @@
+"""
+レスポンス圧縮のCPU時間と削減できるバイト数のトレードオフを計測するベンチマーク
+
+ユーザー一覧と同じ形式のJSONを作り、CompressionMiddleware と同じ圧縮器（_Encoder）で
+エンコーディング・レベルごとに圧縮して、圧縮率とCPU時間（time.process_time）を表示します。
+
+    page     GET /users の1ページ（--page-size 件、単一チャンクで送る）
+    stream   GET /users のストリーミング（--stream-size 件を USER_CHUNK_SIZE 件ずつ圧縮器へ渡し、チャンクごとにフラッシュする）
+
+ID は UUID、ユーザー名・日時もユーザーごとに異なる値にして、実際のデータより圧縮されやすくならないようにしています。
+br / zstd は brotli / zstandard が導入されている場合だけ計測します。
+
+使用例:
+    python -m benchmarks.bench_compression
+    python -m benchmarks.bench_compression --page-size 100 --stream-size 10000 --repeat 20
+"""
+import argparse
+import random
+import time
+import uuid
+from datetime import datetime, timedelta
+from typing import List
+
+from app.domain.user import User
+from app.interfaces.api.v1.serializers import dumps_users, iter_json_array
+from app.middleware.compression_middleware import _Encoder, available_encodings
+
+# 計測するレベル（エンコーディングごと）
+LEVELS = {
+    "gzip": (1, 5, 6, 9),
+    "br": (1, 4, 5, 11),
+    "zstd": (1, 3, 6, 19),
+}
+
+
+def build_users(count: int, seed: int) -> List[User]:
+    random_source = random.Random(seed)
+    created_at = datetime(2024, 1, 1, 9, 30, 15, 123456)
+    names = ["sato", "suzuki", "takahashi", "tanaka", "ito", "watanabe", "yamamoto", "nakamura", "kobayashi"]
+    users = []
+    for _ in range(count):
+        name = f"{random_source.choice(names)}.{random_source.randrange(10 ** 6)}"
+        created = created_at + timedelta(seconds=random_source.randrange(10 ** 8), microseconds=random_source.randrange(10 ** 6))
+        users.append(User(
+            id=str(uuid.UUID(int=random_source.getrandbits(128), version=4)),
+            email=f"{name}@example.com",
+            username=name,
+            is_active=random_source.random() > 0.05,
+            roles=["user", "admin"] if random_source.random() < 0.02 else ["user"],
+            created_at=created,
+            updated_at=created + timedelta(seconds=random_source.randrange(10 ** 6)) if random_source.random() < 0.7 else None,
+            last_login=created + timedelta(seconds=random_source.randrange(10 ** 7)) if random_source.random() < 0.8 else None
+        ))
+    return users
+
+
+def measure(label: str, chunks: List[bytes], encoding: str, level: int, repeat: int) -> None:
+    original = sum(len(chunk) for chunk in chunks)
+    started = time.process_time()
+    for _ in range(repeat):
+        encoder = _Encoder(encoding, level)
+        compressed = 0
+        # ミドルウェアと同じく、最後以外のチャンクは圧縮してフラッシュする
+        for chunk in chunks[:-1]:
+            compressed += len(encoder.compress(chunk) + encoder.flush())
+        compressed += len(encoder.compress(chunks[-1]) + encoder.finish())
+    cpu_ms = (time.process_time() - started) / repeat * 1000
+    print(
+        f"{label:<8} {encoding:<6} {level:>5} {original:>11,} {compressed:>11,} "
+        f"{original / compressed:>7.2f}x {cpu_ms:>9.2f} ms {original / 2 ** 20 / (cpu_ms / 1000):>9.1f} MiB/s"
+    )
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--page-size", type=int, default=100)
+    parser.add_argument("--stream-size", type=int, default=10_000)
+    parser.add_argument("--repeat", type=int, default=10)
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    users = build_users(max(args.page_size, args.stream_size), args.seed)
+    payloads = {
+        "page": [dumps_users(users[:args.page_size])],
+        "stream": list(iter_json_array(users[:args.stream_size])),
+    }
+
+    print(f"{'payload':<8} {'coding':<6} {'level':>5} {'bytes':>11} {'compressed':>11} {'ratio':>8} {'cpu':>12} {'throughput':>15}")
+    for label, chunks in payloads.items():
+        for encoding in available_encodings():
+            for level in LEVELS[encoding]:
+                measure(label, chunks, encoding, level, args.repeat)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,302 @@
+"""
+APIのHTTP負荷試験・ベンチマーク
+
+非同期HTTPクライアント（httpx）で主要エンドポイントを呼び出し、
+同時実行数ごとのスループットと p50 / p95 / p99 レイテンシを計測します。
+
+対象:
+    --target inprocess  benchmarks.bench_app のアプリを ASGITransport で直接呼び出す（既定）
+    --target spawn      benchmarks.bench_app を uvicorn で起動して呼び出す（--workers でワーカー数を指定）
+    --target URL        起動済みのサーバー（例: http://localhost:8000）を呼び出す
+
+シナリオ: login（POST /api/v1/login）, me（GET /api/v1/me）,
+          list_users（GET /api/v1/users?limit=100）, get_user（GET /api/v1/users/{id}）
+
+spawn / URL の場合は httpx クライアント自体のCPU負荷が上限になりやすいため、
+サーバー側の上限を測るときはクライアントを別マシン（または別コア）で実行してください。
+
+結果は --output でJSONに保存できます。--compare に以前の結果を渡すと、
+スループットの低下または p95 / p99 の悪化が --threshold を超えた項目を回帰として表示し、終了コード1で終了します。
+
+使用例:
+    python -m benchmarks.bench_http --concurrency 1,10,50 --requests 2000 --output baseline.json
+    python -m benchmarks.bench_http --compare baseline.json --threshold 0.1
+    python -m benchmarks.bench_http --target spawn --workers 4 --output uvicorn.json
+"""
+import argparse
+import asyncio
+import json
+import logging
+import math
+import os
+import platform
+import subprocess
+import sys
+import time
+from contextlib import AsyncExitStack, asynccontextmanager
+from typing import Any, AsyncIterator, Awaitable, Callable, Dict, List
+
+import httpx
+
+LOGIN_FORM = {"username": "test@example.com", "password": "password123"}
+SCENARIOS = ("login", "me", "list_users", "get_user")
+
+Request = Callable[[httpx.AsyncClient, int], Awaitable[httpx.Response]]
+
+
+def percentile(sorted_values: List[float], q: float) -> float:
+    """最近傍順位法によるパーセンタイル（sorted_values は昇順）"""
+    if not sorted_values:
+        return 0.0
+    rank = max(1, math.ceil(q / 100 * len(sorted_values)))
+    return sorted_values[rank - 1]
+
+
+def summarize(latencies: List[float], errors: int, elapsed: float) -> Dict[str, float]:
+    ordered = sorted(latencies)
+    count = len(ordered)
+    return {
+        "requests": count,
+        "errors": errors,
+        "throughput_rps": round(count / elapsed, 1) if elapsed else 0.0,
+        "mean_ms": round(sum(ordered) / count * 1000, 3) if count else 0.0,
+        "p50_ms": round(percentile(ordered, 50) * 1000, 3),
+        "p95_ms": round(percentile(ordered, 95) * 1000, 3),
+        "p99_ms": round(percentile(ordered, 99) * 1000, 3),
+    }
+
+
+async def run_level(
+    client: httpx.AsyncClient,
+    request: Request,
+    concurrency: int,
+    requests: int
+) -> Dict[str, float]:
+    """requests 件のリクエストを concurrency 個のワーカーで送り、結果を集計する"""
+    latencies: List[float] = []
+    errors = 0
+    issued = 0
+
+    async def worker() -> None:
+        nonlocal errors, issued
+        while issued < requests:
+            index = issued
+            issued += 1
+            started = time.perf_counter()
+            try:
+                response = await request(client, index)
+                ok = response.status_code < 400
+            except httpx.HTTPError:
+                ok = False
+            latencies.append(time.perf_counter() - started)
+            if not ok:
+                errors += 1
+
+    started = time.perf_counter()
+    await asyncio.gather(*(worker() for _ in range(concurrency)))
+    return summarize(latencies, errors, time.perf_counter() - started)
+
+
+async def _login(client: httpx.AsyncClient) -> str:
+    response = await client.post("/api/v1/login", data=LOGIN_FORM)
+    response.raise_for_status()
+    return response.json()["token"]["access_token"]
+
+
+async def _user_ids(client: httpx.AsyncClient, seed: int) -> List[str]:
+    response = await client.get("/api/v1/users", params={"limit": 1000})
+    response.raise_for_status()
+    ids = [user["id"] for user in response.json()]
+    # 空のサーバーを対象にする場合は API 経由でユーザーを作成する
+    for index in range(len(ids), seed):
+        created = await client.post("/api/v1/users", json={
+            "email": f"load{index}@example.com",
+            "username": f"load{index:06d}",
+            "password": "password123",
+        })
+        created.raise_for_status()
+        ids.append(created.json()["id"])
+    if not ids:
+        raise RuntimeError("No users to benchmark get_user against (use --seed)")
+    return ids
+
+
+def build_scenarios(user_ids: List[str]) -> Dict[str, Request]:
+    def login(client: httpx.AsyncClient, index: int) -> Awaitable[httpx.Response]:
+        return client.post("/api/v1/login", data=LOGIN_FORM)
+
+    def me(client: httpx.AsyncClient, index: int) -> Awaitable[httpx.Response]:
+        return client.get("/api/v1/me")
+
+    def list_users(client: httpx.AsyncClient, index: int) -> Awaitable[httpx.Response]:
+        return client.get("/api/v1/users", params={"limit": 100})
+
+    def get_user(client: httpx.AsyncClient, index: int) -> Awaitable[httpx.Response]:
+        return client.get(f"/api/v1/users/{user_ids[index % len(user_ids)]}")
+
+    return {"login": login, "me": me, "list_users": list_users, "get_user": get_user}
+
+
+@asynccontextmanager
+async def inprocess_client() -> AsyncIterator[httpx.AsyncClient]:
+    from benchmarks.bench_app import app
+    from app.main import log_pipeline
+
+    # ログ出力先のI/Oで計測が乱れないよう、リクエストログは /dev/null に書き出す
+    log_pipeline.stream = open(os.devnull, "w")
+    async with app.router.lifespan_context(app):
+        transport = httpx.ASGITransport(app=app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://bench") as client:
+            yield client
+
+
+async def _wait_until_healthy(base_url: str, timeout: float) -> None:
+    deadline = time.monotonic() + timeout
+    async with httpx.AsyncClient(base_url=base_url) as client:
+        while True:
+            try:
+                if (await client.get("/health")).status_code == 200:
+                    return
+            except httpx.HTTPError:
+                pass
+            if time.monotonic() > deadline:
+                raise RuntimeError(f"Server at {base_url} did not become healthy")
+            await asyncio.sleep(0.2)
+
+
+@asynccontextmanager
+async def http_client(base_url: str, max_connections: int) -> AsyncIterator[httpx.AsyncClient]:
+    limits = httpx.Limits(max_connections=max_connections, max_keepalive_connections=max_connections)
+    async with httpx.AsyncClient(base_url=base_url, limits=limits, timeout=30.0) as client:
+        yield client
+
+
+@asynccontextmanager
+async def spawned_server(port: int, workers: int, timeout: float) -> AsyncIterator[str]:
+    command = [
+        sys.executable, "-m", "uvicorn", "benchmarks.bench_app:app",
+        "--port", str(port), "--workers", str(workers), "--log-level", "warning", "--no-access-log",
+    ]
+    # リクエストログ（標準エラー）は計測コストに含めつつ、出力は捨てる
+    process = subprocess.Popen(command, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    base_url = f"http://127.0.0.1:{port}"
+    try:
+        await _wait_until_healthy(base_url, timeout)
+        yield base_url
+    finally:
+        process.terminate()
+        try:
+            process.wait(timeout=10)
+        except subprocess.TimeoutExpired:
+            process.kill()
+
+
+def compare(current: Dict[str, Any], baseline: Dict[str, Any], threshold: float) -> List[str]:
+    """ベースラインと比べて threshold を超えて悪化した項目を返す"""
+    regressions = []
+    for scenario, levels in current["results"].items():
+        for concurrency, result in levels.items():
+            base = baseline.get("results", {}).get(scenario, {}).get(concurrency)
+            if base is None:
+                continue
+            label = f"{scenario} c={concurrency}"
+            if result["throughput_rps"] < base["throughput_rps"] * (1 - threshold):
+                regressions.append(
+                    f"{label}: throughput {base['throughput_rps']} -> {result['throughput_rps']} rps"
+                )
+            for key in ("p95_ms", "p99_ms"):
+                if result[key] > base[key] * (1 + threshold):
+                    regressions.append(f"{label}: {key} {base[key]} -> {result[key]} ms")
+            if result["errors"] > base["errors"]:
+                regressions.append(f"{label}: errors {base['errors']} -> {result['errors']}")
+    return regressions
+
+
+def print_results(results: Dict[str, Dict[str, Dict[str, float]]]) -> None:
+    print(f"{'scenario':<12} {'conc':>5} {'req/s':>10} {'p50 ms':>9} {'p95 ms':>9} {'p99 ms':>9} {'errors':>7}")
+    for scenario, levels in results.items():
+        for concurrency, result in levels.items():
+            print(
+                f"{scenario:<12} {concurrency:>5} {result['throughput_rps']:>10.1f} {result['p50_ms']:>9.2f} "
+                f"{result['p95_ms']:>9.2f} {result['p99_ms']:>9.2f} {result['errors']:>7}"
+            )
+
+
+async def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--target", default="inprocess", help="inprocess, spawn, or a base URL")
+    parser.add_argument("--scenarios", default=",".join(SCENARIOS))
+    parser.add_argument("--concurrency", default="1,10,50")
+    parser.add_argument("--requests", type=int, default=2000, help="requests per scenario and concurrency level")
+    parser.add_argument("--warmup", type=int, default=200)
+    parser.add_argument("--seed", type=int, default=0, help="create users through the API if the target has fewer")
+    parser.add_argument("--workers", type=int, default=1, help="uvicorn workers for --target spawn")
+    parser.add_argument("--port", type=int, default=8089)
+    parser.add_argument("--startup-timeout", type=float, default=30.0)
+    parser.add_argument("--output", help="write results to this JSON file")
+    parser.add_argument("--compare", help="baseline JSON to compare against")
+    parser.add_argument("--threshold", type=float, default=0.10, help="allowed relative regression (0.10 = 10%%)")
+    args = parser.parse_args()
+
+    logging.getLogger("httpx").setLevel(logging.WARNING)
+    levels = [int(level) for level in args.concurrency.split(",")]
+    scenario_names = [name for name in args.scenarios.split(",") if name]
+    max_connections = max(levels)
+
+    results: Dict[str, Dict[str, Dict[str, float]]] = {}
+    async with AsyncExitStack() as stack:
+        if args.target == "inprocess":
+            client = await stack.enter_async_context(inprocess_client())
+        else:
+            if args.target == "spawn":
+                base_url = await stack.enter_async_context(
+                    spawned_server(args.port, args.workers, args.startup_timeout)
+                )
+            else:
+                base_url = args.target
+                await _wait_until_healthy(base_url, args.startup_timeout)
+            client = await stack.enter_async_context(http_client(base_url, max_connections))
+
+        client.headers["Authorization"] = f"Bearer {await _login(client)}"
+        scenarios = build_scenarios(await _user_ids(client, args.seed))
+        for name in scenario_names:
+            request = scenarios[name]
+            results[name] = {}
+            for concurrency in levels:
+                if args.warmup:
+                    await run_level(client, request, concurrency, args.warmup)
+                results[name][str(concurrency)] = await run_level(client, request, concurrency, args.requests)
+
+    report = {
+        "meta": {
+            "target": args.target,
+            "workers": args.workers if args.target == "spawn" else None,
+            "requests_per_level": args.requests,
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "created_at": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        },
+        "results": results,
+    }
+    print_results(results)
+
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(report, f, indent=2)
+        print(f"Results written to {args.output}")
+
+    if args.compare:
+        with open(args.compare) as f:
+            baseline = json.load(f)
+        regressions = compare(report, baseline, args.threshold)
+        if regressions:
+            print(f"Regressions beyond {args.threshold:.0%}:")
+            for regression in regressions:
+                print(f"  {regression}")
+            return 1
+        print(f"No regressions beyond {args.threshold:.0%} against {args.compare}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(asyncio.run(main()))
@@ -0,0 +1,87 @@
+"""
+InMemoryUserRepository の読み込み・索引・スナップショットの性能を計測するベンチマーク
+
+N件のユーザーを create_users で投入し、スナップショットの保存・読み込みにかかる時間と、
+ID・メールアドレス・username前方一致・ページングの1操作あたりの時間を表示します。
+
+使用例:
+    python -m benchmarks.bench_in_memory_repository --users 1000000
+"""
+import argparse
+import asyncio
+import os
+import random
+import tempfile
+import time
+from datetime import datetime
+
+from app.domain.user import User
+from app.infrastructure.repositories.in_memory_user_repository import InMemoryUserRepository
+
+
+def _users(count: int) -> list:
+    created_at = datetime(2024, 1, 1)
+    return [
+        User(
+            id=f"user-{index:08d}",
+            email=f"user{index}@example.com",
+            username=f"user{index:08d}",
+            roles=["user"],
+            created_at=created_at
+        )
+        for index in range(count)
+    ]
+
+
+async def _per_op(label: str, operations: int, call) -> None:
+    started = time.perf_counter()
+    for index in range(operations):
+        await call(index)
+    elapsed = time.perf_counter() - started
+    print(f"{label:<28} {elapsed / operations * 1_000_000:>10.2f} us/op")
+
+
+async def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--users", type=int, default=100000)
+    parser.add_argument("--operations", type=int, default=20000)
+    args = parser.parse_args()
+
+    started = time.perf_counter()
+    users = _users(args.users)
+    print(f"build {args.users} User objects      {time.perf_counter() - started:>8.2f} s")
+
+    repository = InMemoryUserRepository()
+    started = time.perf_counter()
+    await repository.create_users(users)
+    print(f"create_users (bulk index)      {time.perf_counter() - started:>8.2f} s")
+
+    with tempfile.TemporaryDirectory() as directory:
+        path = os.path.join(directory, "users.snapshot")
+        started = time.perf_counter()
+        await repository.save_snapshot(path)
+        print(f"save_snapshot                  {time.perf_counter() - started:>8.2f} s "
+              f"({os.path.getsize(path) / 1024 / 1024:.1f} MiB)")
+        restored = InMemoryUserRepository()
+        started = time.perf_counter()
+        await restored.load_snapshot(path)
+        print(f"load_snapshot                  {time.perf_counter() - started:>8.2f} s")
+
+    ids = [random.randrange(args.users) for _ in range(args.operations)]
+    await _per_op("get_by_id", args.operations, lambda i: restored.get_by_id(f"user-{ids[i]:08d}"))
+    await _per_op("get_by_email", args.operations, lambda i: restored.get_by_email(f"user{ids[i]}@example.com"))
+    await _per_op("find_by_username_prefix(20)", args.operations,
+                  lambda i: restored.find_by_username_prefix(f"user{ids[i] // 1000:05d}", limit=20))
+    await _per_op("list_users_page(100)", args.operations // 10,
+                  lambda i: restored.list_users_page(limit=100))
+    await _per_op("create_user + delete_user", args.operations // 10, lambda i: _create_delete(restored, i))
+
+
+async def _create_delete(repository: InMemoryUserRepository, index: int) -> None:
+    user_id = f"new-{index}"
+    await repository.create_user(User(id=user_id, email=f"new{index}@example.com", username=f"new{index}"))
+    await repository.delete_user(user_id)
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
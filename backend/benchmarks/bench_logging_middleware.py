@@ -0,0 +1,153 @@
+"""
+LoggingMiddleware のリクエストあたりのオーバーヘッドを計測するマイクロベンチマーク
+
+最小のASGIアプリに対して、ミドルウェアなし / 旧実装（BaseHTTPMiddleware）/ 現行実装（素のASGI）/
+現行実装 + LogPipeline を、ログ対象パスとログ除外パスのそれぞれで呼び出し、1リクエストあたりの時間を比較します。
+ログ出力先のI/Oを除くため、"api" ロガーには NullHandler のみを設定し、LogPipeline は /dev/null に書き出します。
+
+使用例:
+    python -m benchmarks.bench_logging_middleware --requests 20000
+"""
+import argparse
+import asyncio
+import json
+import logging
+import os
+import time
+import uuid
+from typing import Callable, Optional
+
+from fastapi import Request, Response
+from starlette.middleware.base import BaseHTTPMiddleware
+from starlette.types import ASGIApp
+
+from app.middleware.log_pipeline import LogPipeline
+from app.middleware.logging_middleware import LoggingMiddleware
+
+logger = logging.getLogger("api")
+
+
+class LegacyLoggingMiddleware(BaseHTTPMiddleware):
+    """比較用: BaseHTTPMiddleware を使っていた旧実装"""
+
+    def __init__(self, app: ASGIApp, log_level: int = logging.INFO,
+                 exclude_paths: Optional[list] = None, exclude_methods: Optional[list] = None):
+        super().__init__(app)
+        self.log_level = log_level
+        self.exclude_paths = exclude_paths or ["/health", "/metrics"]
+        self.exclude_methods = exclude_methods or ["OPTIONS"]
+
+    async def dispatch(self, request: Request, call_next: Callable) -> Response:
+        request_id = str(uuid.uuid4())
+        request.state.request_id = request_id
+        if any(request.url.path.startswith(path) for path in self.exclude_paths):
+            return await call_next(request)
+        if request.method in self.exclude_methods:
+            return await call_next(request)
+        start_time = time.time()
+        client_host = request.client.host if request.client else "unknown"
+        client_port = request.client.port if request.client else "unknown"
+        headers = dict(request.headers)
+        if "authorization" in headers:
+            headers["authorization"] = "Bearer [REDACTED]"
+        if "cookie" in headers:
+            headers["cookie"] = "[REDACTED]"
+        request_log = {
+            "request_id": request_id, "client_ip": client_host, "client_port": client_port,
+            "method": request.method, "path": request.url.path,
+            "query_params": str(request.query_params), "headers": headers,
+            "timestamp": time.strftime("%Y-%m-%d %H:%M:%S"),
+        }
+        logger.log(self.log_level, f"Request received: {json.dumps(request_log)}")
+        response = await call_next(request)
+        response_log = {
+            "request_id": request_id, "status_code": response.status_code,
+            "headers": dict(response.headers),
+            "process_time_ms": round((time.time() - start_time) * 1000, 2),
+            "timestamp": time.strftime("%Y-%m-%d %H:%M:%S"),
+        }
+        logger.log(self.log_level, f"Response sent: {json.dumps(response_log)}")
+        return response
+
+
+async def endpoint(scope, receive, send) -> None:
+    await send({"type": "http.response.start", "status": 200,
+                "headers": [(b"content-type", b"application/json"), (b"content-length", b"2")]})
+    await send({"type": "http.response.body", "body": b"{}"})
+
+
+def _scope(path: str) -> dict:
+    return {
+        "type": "http", "asgi": {"version": "3.0"}, "http_version": "1.1",
+        "method": "GET", "scheme": "http", "path": path, "raw_path": path.encode(),
+        "query_string": b"limit=10", "root_path": "",
+        "headers": [(b"host", b"testserver"), (b"authorization", b"Bearer token"),
+                    (b"accept", b"application/json"), (b"user-agent", b"bench")],
+        "client": ("127.0.0.1", 50000), "server": ("testserver", 80),
+    }
+
+
+async def _call(app: ASGIApp, scope: dict) -> None:
+    messages = [{"type": "http.request", "body": b"", "more_body": False}]
+    disconnected = asyncio.Event()
+
+    async def receive() -> dict:
+        if messages:
+            return messages.pop()
+        # リクエストボディを渡し終えた後は、レスポンス完了まで切断を通知しない
+        await disconnected.wait()
+        return {"type": "http.disconnect"}
+
+    async def send(message: dict) -> None:
+        if message["type"] == "http.response.body" and not message.get("more_body", False):
+            disconnected.set()
+
+    await app(dict(scope), receive, send)
+
+
+async def _measure(app: ASGIApp, path: str, requests: int) -> float:
+    scope = _scope(path)
+    for _ in range(min(requests, 500)):
+        await _call(app, scope)
+    started = time.perf_counter()
+    for _ in range(requests):
+        await _call(app, scope)
+    return (time.perf_counter() - started) / requests * 1_000_000
+
+
+async def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--requests", type=int, default=20000)
+    args = parser.parse_args()
+
+    logger.handlers = [logging.NullHandler()]
+    logger.propagate = False
+    logger.setLevel(logging.INFO)
+
+    options = dict(exclude_paths=["/health", "/metrics", "/docs", "/redoc", "/openapi.json"],
+                   exclude_methods=["OPTIONS"])
+    devnull = open(os.devnull, "w")
+    pipeline = LogPipeline(stream=devnull, max_queue_size=100000)
+    sampled_pipeline = LogPipeline(stream=devnull, max_queue_size=100000, success_sample_rate=0.1)
+    apps = [
+        ("no middleware", endpoint),
+        ("BaseHTTPMiddleware (before)", LegacyLoggingMiddleware(endpoint, **options)),
+        ("pure ASGI (after)", LoggingMiddleware(endpoint, **options)),
+        ("pure ASGI + LogPipeline", LoggingMiddleware(endpoint, pipeline=pipeline, **options)),
+        ("  + 10% 2xx sampling", LoggingMiddleware(endpoint, pipeline=sampled_pipeline, **options)),
+    ]
+
+    print(f"{'middleware':<30} {'logged us/req':>14} {'excluded us/req':>16}")
+    for label, app in apps:
+        logged = await _measure(app, "/api/v1/users", args.requests)
+        excluded = await _measure(app, "/health", args.requests)
+        print(f"{label:<30} {logged:>14.1f} {excluded:>16.1f}")
+
+    for label, used in (("LogPipeline", pipeline), ("LogPipeline (sampled)", sampled_pipeline)):
+        used.stop()
+        print(f"{label}: {used.stats()}")
+    devnull.close()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
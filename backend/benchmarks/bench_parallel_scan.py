@@ -0,0 +1,127 @@
+"""
+並列Scanのベンチマーク
+
+同じテーブルを 1/4/16 セグメントで全件走査し、所要時間・CPU時間・スループットと、
+最初の行（既定では1セグメント）に対する速度向上率を表示します。
+スタンドインでは1ページごとに --latency-ms と、返す件数 × --item-latency-us のサービス側の処理時間を
+セグメントごとに独立して待たせ（オプションでスロットリングも発生させ）ます。
+16セグメントでも各セグメントが複数ページを読むよう、既定の件数とページサイズを選んでいます。
+待ち時間が重なって短くなっても、アイテムの変換に使うCPU時間（cpu 列）より短くはならないため、
+1コアの環境ではそれが速度向上の上限になります。
+
+使用例:
+    python -m benchmarks.bench_parallel_scan --users 50000
+    python -m benchmarks.bench_parallel_scan --throttle-rate 0.05
+    python -m benchmarks.bench_parallel_scan --endpoint-url http://localhost:8001
+"""
+import argparse
+import asyncio
+import time
+import uuid
+from typing import Any
+
+from app.domain.user import User
+from app.infrastructure.dynamodb import DynamoDBClientManager
+from app.infrastructure.repositories.dynamodb_user_repository import DynamoDBUserRepository
+from benchmarks.bench_repository_concurrency import _ensure_table
+from benchmarks.dynamodb_stub import StubDynamoDBClient
+
+
+def _synthetic_user(i: int) -> User:
+    # 同じ内容でIDだけ異なるユーザー（id は uuid4 のためセグメントに均等に分かれる）
+    return User(
+        id=str(uuid.uuid4()),
+        email=f"scan{i}@example.com",
+        username=f"scan{i}",
+        roles=["member"],
+    )
+
+
+async def _seed(repository: DynamoDBUserRepository, client: Any, count: int) -> None:
+    if isinstance(client, StubDynamoDBClient):
+        # スタンドインには往復レイテンシなしで直接投入する
+        # （アイテムへの変換は1件だけ行い、ID・メールアドレス・ユーザー名を差し替えて複製する）
+        table = client._table(repository.table_name)
+        template = repository._user_to_item(_synthetic_user(0))
+        for i in range(count):
+            user_id = str(uuid.uuid4())
+            table[user_id] = dict(
+                template,
+                id={"S": user_id},
+                email={"S": f"scan{i}@example.com"},
+                username={"S": f"scan{i}"},
+            )
+        client._version += 1
+        # 最初に走査する行だけがサイズの計算（スタンドインの処理）を負担しないよう、先に済ませておく
+        client._read_units(list(table.values()))
+        return
+
+    semaphore = asyncio.Semaphore(32)
+
+    async def put(i: int) -> None:
+        async with semaphore:
+            await repository.create_user(_synthetic_user(i))
+
+    await asyncio.gather(*(put(i) for i in range(count)))
+
+
+async def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--endpoint-url", help="DynamoDB Local のURL（省略時はインプロセスのスタンドイン）")
+    parser.add_argument("--table-name", default="bench_scan_users")
+    parser.add_argument("--users", type=int, default=50000)
+    parser.add_argument("--page-size", type=int, default=200)
+    parser.add_argument("--latency-ms", type=float, default=10.0, help="スタンドインの1ページあたりのレイテンシ")
+    parser.add_argument(
+        "--item-latency-us", type=float, default=50.0,
+        help="スタンドインの1件あたりのサービス側の処理時間（1ページの待ち時間は latency-ms + 件数 × これ）",
+    )
+    parser.add_argument("--throttle-rate", type=float, default=0.0)
+    parser.add_argument("--segments", type=int, nargs="+", default=[1, 4, 16])
+    parser.add_argument("--skip-seed", action="store_true")
+    args = parser.parse_args()
+
+    manager = None
+    if args.endpoint_url:
+        manager = DynamoDBClientManager(
+            region_name="ap-northeast-1",
+            endpoint_url=args.endpoint_url,
+            max_pool_connections=max(args.segments) * 2,
+        )
+        await manager.start()
+        client = manager.client
+        await _ensure_table(client, args.table_name)
+    else:
+        client = StubDynamoDBClient(
+            latency=args.latency_ms / 1000,
+            throttle_rate=args.throttle_rate,
+            scan_item_latency=args.item_latency_us / 1_000_000,
+        )
+
+    try:
+        repository = DynamoDBUserRepository(client=client, table_name=args.table_name)
+        if not args.skip_seed:
+            await _seed(repository, client, args.users)
+
+        print(f"{'segments':>10} {'users':>10} {'seconds':>10} {'cpu':>10} {'users/s':>12} {'speedup':>9}")
+        baseline = None
+        for segments in args.segments:
+            started = time.perf_counter()
+            cpu_started = time.process_time()
+            count = 0
+            async for _ in repository.parallel_scan(total_segments=segments, page_size=args.page_size):
+                count += 1
+            elapsed = time.perf_counter() - started
+            cpu = time.process_time() - cpu_started
+            baseline = baseline or elapsed
+            print(
+                f"{segments:>10} {count:>10} {elapsed:>10.2f} {cpu:>10.2f} {count / elapsed:>12.0f} "
+                f"{baseline / elapsed:>8.1f}x"
+            )
+    finally:
+        if manager:
+            await manager.close()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
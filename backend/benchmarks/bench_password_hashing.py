@@ -0,0 +1,90 @@
+"""
+パスワードの照合（ログイン1回分）のスループットと、その間のイベントループの遅れを計測するベンチマーク
+
+--ln などで指定したコストのハッシュを1つ作り、--logins 回の照合を次の方式で同時に実行します。
+
+    inline  イベントループ上で verify_password を直接呼ぶ（変更前の async def login で照合した場合）
+    pool    PasswordHasher（--workers 個のワーカープロセス）で照合する
+
+照合と並行して 10ms ごとに起きるタスクを動かし、予定からの遅れの最大値をイベントループの遅れとして表示します。
+1コアあたりのログイン数は、照合1回のCPU時間から求めた値です。
+
+使用例:
+    python -m benchmarks.bench_password_hashing
+    python -m benchmarks.bench_password_hashing --ln 15 --workers 4 --logins 200
+"""
+import argparse
+import asyncio
+import os
+import time
+
+from app.infrastructure.auth.password_hasher import PasswordHasher, hash_password, verify_password
+
+TICK_SECONDS = 0.01
+
+
+async def _ticker(stop: asyncio.Event) -> float:
+    # 予定時刻からの遅れの最大値（秒）
+    worst = 0.0
+    loop = asyncio.get_running_loop()
+    while not stop.is_set():
+        expected = loop.time() + TICK_SECONDS
+        await asyncio.sleep(TICK_SECONDS)
+        worst = max(worst, loop.time() - expected)
+    return worst
+
+
+async def run(label: str, verify, logins: int, workers: int) -> None:
+    stop = asyncio.Event()
+    ticker = asyncio.create_task(_ticker(stop))
+    await asyncio.sleep(0)
+    started = time.perf_counter()
+    results = await asyncio.gather(*(verify() for _ in range(logins)))
+    elapsed = time.perf_counter() - started
+    stop.set()
+    worst_lag = await ticker
+    assert all(results)
+    print(
+        f"{label:<7} {workers:>7} {logins / elapsed:>11.1f} /s {logins / elapsed / workers:>11.1f} /s "
+        f"{worst_lag * 1000:>10.1f} ms"
+    )
+
+
+async def main_async(args: argparse.Namespace) -> None:
+    encoded = hash_password("password123", args.ln, args.r, args.p)
+
+    started = time.process_time()
+    for _ in range(5):
+        verify_password("password123", encoded)
+    cpu_seconds = (time.process_time() - started) / 5
+    print(f"scrypt ln={args.ln} (N={1 << args.ln}) r={args.r} p={args.p}: {cpu_seconds * 1000:.1f} ms CPU per login, "
+          f"{1 / cpu_seconds:.1f} logins/s per core")
+
+    print(f"{'mode':<7} {'workers':>7} {'logins':>14} {'per worker':>14} {'loop lag':>13}")
+
+    async def verify_inline() -> bool:
+        return verify_password("password123", encoded)
+
+    await run("inline", verify_inline, args.logins, 1)
+
+    hasher = PasswordHasher(ln=args.ln, r=args.r, p=args.p, max_workers=args.workers)
+    try:
+        await hasher.warm_up()
+        await run("pool", lambda: hasher.verify("password123", encoded), args.logins, hasher.max_workers)
+    finally:
+        hasher.close()
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--ln", type=int, default=15)
+    parser.add_argument("--r", type=int, default=8)
+    parser.add_argument("--p", type=int, default=1)
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 1)
+    parser.add_argument("--logins", type=int, default=50)
+    args = parser.parse_args()
+    asyncio.run(main_async(args))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,144 @@
+"""
+DynamoDBUserRepository の同時実行ベンチマーク
+
+in-flight のリクエスト数を変えながら get_by_id を実行し、スループットが並行数に応じて
+伸びることを確認します。比較用に、旧実装と同じくイベントループをブロックする
+同期呼び出し（time.sleep）のスタンドインでも計測します。
+
+使用例:
+    python -m benchmarks.bench_repository_concurrency
+    python -m benchmarks.bench_repository_concurrency --endpoint-url http://localhost:8001
+"""
+import argparse
+import asyncio
+import time
+import uuid
+from typing import Any, List
+
+from app.domain.user import User
+from app.infrastructure.dynamodb import DynamoDBClientManager
+from app.infrastructure.repositories.dynamodb_user_repository import DynamoDBUserRepository
+from benchmarks.dynamodb_stub import StubDynamoDBClient
+
+
+class BlockingStubDynamoDBClient(StubDynamoDBClient):
+    """同期boto3と同様にイベントループを止めてしまうクライアント"""
+
+    async def _round_trip(self, operation: str) -> None:
+        self.calls[operation] = self.calls.get(operation, 0) + 1
+        time.sleep(self.latency)
+
+
+async def _ensure_table(client: Any, table_name: str) -> None:
+    try:
+        await client.describe_table(TableName=table_name)
+        return
+    except client.exceptions.ResourceNotFoundException:
+        pass
+    await client.create_table(
+        TableName=table_name,
+        KeySchema=[{"AttributeName": "id", "KeyType": "HASH"}],
+        AttributeDefinitions=[
+            {"AttributeName": "id", "AttributeType": "S"},
+            {"AttributeName": "email", "AttributeType": "S"},
+        ],
+        GlobalSecondaryIndexes=[{
+            "IndexName": "email-index",
+            "KeySchema": [{"AttributeName": "email", "KeyType": "HASH"}],
+            "Projection": {"ProjectionType": "ALL"},
+        }],
+        BillingMode="PAY_PER_REQUEST",
+    )
+    await client.get_waiter("table_exists").wait(TableName=table_name)
+
+
+async def _ensure_email_table(client: Any, table_name: str) -> None:
+    try:
+        await client.describe_table(TableName=table_name)
+        return
+    except client.exceptions.ResourceNotFoundException:
+        pass
+    await client.create_table(
+        TableName=table_name,
+        KeySchema=[{"AttributeName": "email", "KeyType": "HASH"}],
+        AttributeDefinitions=[{"AttributeName": "email", "AttributeType": "S"}],
+        BillingMode="PAY_PER_REQUEST",
+    )
+    await client.get_waiter("table_exists").wait(TableName=table_name)
+
+
+async def _seed(repository: DynamoDBUserRepository, count: int) -> List[str]:
+    ids = []
+    for i in range(count):
+        user = User(
+            id=str(uuid.uuid4()),
+            email=f"bench{i}@example.com",
+            username=f"bench{i}",
+        )
+        await repository.create_user(user)
+        ids.append(user.id)
+    return ids
+
+
+async def _run(repository: DynamoDBUserRepository, ids: List[str], concurrency: int, total: int) -> float:
+    queue: asyncio.Queue = asyncio.Queue()
+    for i in range(total):
+        queue.put_nowait(ids[i % len(ids)])
+
+    async def worker() -> None:
+        while True:
+            try:
+                user_id = queue.get_nowait()
+            except asyncio.QueueEmpty:
+                return
+            await repository.get_by_id(user_id)
+
+    started = time.perf_counter()
+    await asyncio.gather(*(worker() for _ in range(concurrency)))
+    return total / (time.perf_counter() - started)
+
+
+async def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--endpoint-url", help="DynamoDB Local のURL（省略時はインプロセスのスタンドイン）")
+    parser.add_argument("--table-name", default="bench_users")
+    parser.add_argument("--latency-ms", type=float, default=5.0, help="スタンドインの1往復あたりのレイテンシ")
+    parser.add_argument("--requests", type=int, default=2000)
+    parser.add_argument("--concurrency", type=int, nargs="+", default=[1, 4, 16, 64, 128])
+    parser.add_argument("--max-pool-connections", type=int, default=128)
+    args = parser.parse_args()
+
+    targets = []
+    manager = None
+    if args.endpoint_url:
+        manager = DynamoDBClientManager(
+            region_name="ap-northeast-1",
+            endpoint_url=args.endpoint_url,
+            max_pool_connections=args.max_pool_connections,
+        )
+        await manager.start()
+        await _ensure_table(manager.client, args.table_name)
+        await _ensure_email_table(manager.client, f"{args.table_name}-emails")
+        targets.append(("aiobotocore", manager.client))
+    else:
+        latency = args.latency_ms / 1000
+        targets.append(("async stand-in", StubDynamoDBClient(latency=latency)))
+        targets.append(("blocking stand-in", BlockingStubDynamoDBClient(latency=latency)))
+
+    try:
+        for label, client in targets:
+            repository = DynamoDBUserRepository(client=client, table_name=args.table_name)
+            ids = await _seed(repository, 100)
+            print(f"\n[{label}]")
+            print(f"{'in-flight':>10} {'req/s':>12}")
+            for concurrency in args.concurrency:
+                total = args.requests if label != "blocking stand-in" else min(args.requests, 200)
+                throughput = await _run(repository, ids, concurrency, total)
+                print(f"{concurrency:>10} {throughput:>12.1f}")
+    finally:
+        if manager:
+            await manager.close()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
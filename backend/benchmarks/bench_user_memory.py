@@ -0,0 +1,129 @@
+"""
+ユーザーの保持に必要なメモリと、DynamoDBの項目からの変換時間を比較するベンチマーク
+
+合成したDynamoDBの低レベル形式の項目（{'S': ...} など）を chunk 件ずつ生成して変換し、
+変換後のオブジェクトだけを保持したときのメモリ（tracemalloc で計測）と変換時間を表示します。
+
+    dataclass  以前の User（通常の @dataclass、日時は読み込み時に datetime へ解析）
+    slots      現在の User（__slots__、日時は文字列のまま保持して参照時に解析）
+    batch      UserBatch（列指向、ロールのタプルを共有）
+
+使用例:
+    python -m benchmarks.bench_user_memory --users 1000000
+"""
+import argparse
+import gc
+import time
+import tracemalloc
+from dataclasses import dataclass, field
+from datetime import datetime, timedelta
+from typing import Callable, Iterator, List, Optional
+
+from boto3.dynamodb.types import TypeDeserializer
+
+from app.domain.user import User, UserBatch
+from app.infrastructure.repositories.dynamodb_user_repository import DynamoDBUserRepository
+
+_deserializer = TypeDeserializer()
+
+
+@dataclass
+class DataclassUser:
+    """比較用: 変更前の User と同じフィールドを持つ通常の dataclass"""
+    id: str
+    email: str
+    username: str
+    password_hash: str = ""
+    is_active: bool = True
+    roles: List[str] = field(default_factory=list)
+    created_at: Optional[datetime] = None
+    updated_at: Optional[datetime] = None
+    last_login: Optional[datetime] = None
+
+
+def _dataclass_user(item: dict) -> DataclassUser:
+    # 変更前の DynamoDBUserRepository._item_to_user と同じ変換
+    item = {key: _deserializer.deserialize(value) for key, value in item.items()}
+    return DataclassUser(
+        id=item['id'],
+        email=item['email'],
+        username=item['username'],
+        password_hash=item.get('password_hash', ''),
+        is_active=item['is_active'],
+        roles=list(item.get('roles') or []),
+        created_at=datetime.fromisoformat(item['created_at']),
+        updated_at=datetime.fromisoformat(item['updated_at']) if item.get('updated_at') else None,
+        last_login=datetime.fromisoformat(item['last_login']) if item.get('last_login') else None
+    )
+
+
+def _items(start: int, count: int) -> List[dict]:
+    # TypeSerializer と同じ形式を直接組み立てる（生成自体に時間をかけないため）
+    created_at = datetime(2024, 1, 1)
+    items = []
+    for index in range(start, start + count):
+        updated_at = created_at + timedelta(seconds=index)
+        roles = ["admin", "user"] if index % 100 == 0 else ["user"]
+        items.append({
+            'id': {'S': f"user-{index:08d}"},
+            'email': {'S': f"user{index}@example.com"},
+            'username': {'S': f"user{index:08d}"},
+            'password_hash': {'S': ""},
+            'is_active': {'BOOL': True},
+            # 実際のレスポンスと同様に、ロール名も項目ごとに別の文字列にする
+            'roles': {'L': [{'S': "".join(role)} for role in roles]},
+            'created_at': {'S': created_at.isoformat()},
+            'updated_at': {'S': updated_at.isoformat()} if index % 2 else {'NULL': True},
+            'last_login': {'NULL': True},
+        })
+    return items
+
+
+def _chunks(total: int, chunk: int) -> Iterator[List[dict]]:
+    for start in range(0, total, chunk):
+        yield _items(start, min(chunk, total - start))
+
+
+def measure(label: str, build: Callable[[List[dict]], object], total: int, chunk: int) -> None:
+    gc.collect()
+    tracemalloc.start()
+    convert_seconds = 0.0
+    retained = []
+
+    for items in _chunks(total, chunk):
+        started = time.perf_counter()
+        retained.append(build(items))
+        convert_seconds += time.perf_counter() - started
+        del items
+
+    gc.collect()
+    current, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    print(
+        f"{label:<10} {current / 2 ** 20:>10.1f} MiB {current / total:>10.1f} B/user "
+        f"{convert_seconds:>10.2f} s"
+    )
+    del retained
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--users", type=int, default=1_000_000)
+    parser.add_argument("--chunk", type=int, default=10_000)
+    args = parser.parse_args()
+
+    repository = DynamoDBUserRepository(client=None, table_name="users")
+    variants = {
+        "dataclass": lambda items: [_dataclass_user(item) for item in items],
+        "slots": lambda items: [repository._item_to_user(item) for item in items],
+        "batch": repository._items_to_batch,
+    }
+
+    print(f"{args.users} users (tracemalloc enabled; conversion times include its overhead)")
+    print(f"{'variant':<10} {'retained':>14} {'per user':>12} {'convert':>12}")
+    for label, build in variants.items():
+        measure(label, build, args.users, args.chunk)
+
+
+if __name__ == "__main__":
+    main()
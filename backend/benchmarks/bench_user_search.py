@@ -0,0 +1,115 @@
+"""
+ユーザー検索の索引（UserSearchIndex）の構築時間・メモリと、検索・反映のレイテンシを計測するベンチマーク
+
+合成したユーザーを UserBatch で load し、索引が保持するメモリ（tracemalloc で計測）と構築時間を表示したうえで、
+ランダムな前方一致の検索と、1件ずつの反映（apply）のレイテンシを分位点で表示します。
+比較として、全ユーザーを線形に走査して前方一致を探す場合の1回あたりの時間も表示します。
+
+    prefix     username / email の前方一致（1〜6文字）
+    filtered   is_active=False と role="admin" で絞り込む前方一致（走査は max_scan 件まで）
+    apply      既存ユーザーの email を変更して反映
+
+使用例:
+    python -m benchmarks.bench_user_search --users 1000000
+"""
+import argparse
+import asyncio
+import gc
+import random
+import time
+import tracemalloc
+from datetime import datetime
+from typing import AsyncIterator, Callable, List
+
+from app.domain.user import User, UserBatch
+from app.infrastructure.search import UserSearchIndex
+
+
+def _batch(start: int, count: int) -> UserBatch:
+    created_at = datetime(2024, 1, 1).isoformat()
+    batch = UserBatch()
+    for index in range(start, start + count):
+        batch.append(
+            id=f"user-{index:08d}",
+            email=f"user{index}@example.com",
+            username=f"name{random.randrange(10 ** 8):08d}",
+            is_active=index % 10 != 0,
+            roles=["admin", "user"] if index % 100 == 0 else ["user"],
+            created_at=created_at
+        )
+    return batch
+
+
+async def _batches(total: int, chunk: int) -> AsyncIterator[UserBatch]:
+    for start in range(0, total, chunk):
+        yield _batch(start, min(chunk, total - start))
+
+
+def _report(label: str, operation: Callable[[int], object], iterations: int) -> None:
+    durations: List[float] = []
+    for iteration in range(iterations):
+        started = time.perf_counter()
+        operation(iteration)
+        durations.append(time.perf_counter() - started)
+    durations.sort()
+    p50 = durations[len(durations) // 2] * 1e6
+    p99 = durations[int(len(durations) * 0.99)] * 1e6
+    print(f"{label:<10} {p50:>10.1f} us {p99:>10.1f} us {durations[-1] * 1e6:>10.1f} us")
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--users", type=int, default=1_000_000)
+    parser.add_argument("--chunk", type=int, default=10_000)
+    parser.add_argument("--queries", type=int, default=10_000)
+    parser.add_argument("--limit", type=int, default=20)
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+    random.seed(args.seed)
+
+    index = UserSearchIndex()
+    gc.collect()
+    tracemalloc.start()
+    started = time.perf_counter()
+    asyncio.run(index.load(_batches(args.users, args.chunk)))
+    build_seconds = time.perf_counter() - started
+    gc.collect()
+    current, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    # 合成データ自体（文字列）も含む
+    print(
+        f"{len(index)} users: build {build_seconds:.2f} s (tracemalloc enabled), "
+        f"{current / 2 ** 20:.1f} MiB ({current / len(index):.1f} B/user including strings)"
+    )
+
+    prefixes = []
+    for _ in range(args.queries):
+        user_index = random.randrange(args.users)
+        text = random.choice([f"name{random.randrange(10 ** 8):08d}", f"user{user_index}@"])
+        prefixes.append(text[:random.randint(1, 6)])
+
+    print(f"{'operation':<10} {'p50':>13} {'p99':>13} {'max':>13}")
+    _report("prefix", lambda i: index.search(prefixes[i], limit=args.limit), args.queries)
+    _report(
+        "filtered",
+        lambda i: index.search(prefixes[i], limit=args.limit, is_active=False, role="admin"),
+        args.queries
+    )
+    updates = [random.randrange(args.users) for _ in range(args.queries)]
+    _report(
+        "apply",
+        lambda i: index.apply(User(
+            id=f"user-{updates[i]:08d}", email=f"renamed{i}@example.com", username=f"renamed{i:08d}"
+        )),
+        args.queries
+    )
+
+    # 比較: 索引を使わずに全件を走査する場合
+    entries = list(index._entries.values())
+    started = time.perf_counter()
+    matched = [entry for entry in entries if entry[0].casefold().startswith("name1234")][:args.limit]
+    print(f"linear scan of {len(entries)} users: {(time.perf_counter() - started) * 1e3:.1f} ms ({len(matched)} matched)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,116 @@
+"""
+ユーザー一覧のシリアライズのベンチマーク
+
+1万ユーザーあたりのCPU時間（time.process_time）を次の方式で比較します。
+
+    response_model  FastAPI の既定の経路（response_model=List[UserSchema] による検証・変換 → JSONResponse）
+    fast            serializers.dumps_users（検証を省き、List[User] のフィールドを orjson で直接エンコード）
+    fast_chunked    serializers.iter_json_array（USER_CHUNK_SIZE 件ずつエンコードして連結）
+    fast_batch      serializers.dumps_users に UserBatch を渡した場合（リポジトリの一覧ページはこの形）
+    fast_fields     fast_batch で ?fields=id,username,is_active を指定した場合
+
+それぞれの出力をJSONとして読み直し、内容が一致すること（fast_fields は指定したフィールドが一致すること）も確認します。
+
+使用例:
+    python -m benchmarks.bench_user_serialization
+    python -m benchmarks.bench_user_serialization --users 10000 --repeat 10
+"""
+import argparse
+import asyncio
+import json
+import time
+from datetime import datetime, timedelta
+from typing import Callable, List, Sequence
+
+from fastapi.responses import JSONResponse
+from fastapi.routing import serialize_response
+from fastapi.utils import create_response_field
+
+from app.domain.user import User, UserBatch
+from app.interfaces.api.v1.serializers import UserSchema, dumps_users, iter_json_array
+
+
+def build_users(count: int) -> List[User]:
+    created_at = datetime(2024, 1, 1, 9, 30, 15, 123456)
+    return [
+        User(
+            id=f"bench-user-{index:06d}",
+            email=f"bench{index}@example.com",
+            username=f"bench{index:06d}",
+            password_hash="",
+            roles=["user", "admin"] if index % 10 == 0 else ["user"],
+            created_at=created_at,
+            updated_at=created_at + timedelta(seconds=index) if index % 2 else None,
+        )
+        for index in range(count)
+    ]
+
+
+def response_model_path(users: List[User]) -> bytes:
+    field = create_response_field(name="Response_list_users", type_=List[UserSchema])
+    content = asyncio.run(serialize_response(field=field, response_content=users, is_coroutine=True))
+    return JSONResponse(content).body
+
+
+def fast_path(users: List[User]) -> bytes:
+    return dumps_users(users)
+
+
+def fast_chunked_path(users: List[User]) -> bytes:
+    return b"".join(iter_json_array(users))
+
+
+# 一覧の利用者の多くが必要とするフィールド
+LIST_FIELDS = ("id", "username", "is_active")
+
+
+def fast_fields_path(users: Sequence[User]) -> bytes:
+    return dumps_users(users, LIST_FIELDS)
+
+
+def measure(fn: Callable[[Sequence[User]], bytes], users: Sequence[User], repeat: int) -> float:
+    """1回あたりの最小CPU時間（秒）"""
+    best = float("inf")
+    for _ in range(repeat):
+        started = time.process_time()
+        fn(users)
+        best = min(best, time.process_time() - started)
+    return best
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--users", type=int, default=10000)
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    users = build_users(args.users)
+    paths = {
+        "response_model": response_model_path,
+        "fast": fast_path,
+        "fast_chunked": fast_chunked_path,
+    }
+    inputs = {name: users for name in paths}
+    # UserBatch への変換はリポジトリ側で行われるため、計測の対象に含めない
+    paths["fast_batch"] = fast_path
+    inputs["fast_batch"] = UserBatch.from_users(users)
+    paths["fast_fields"] = fast_fields_path
+    inputs["fast_fields"] = inputs["fast_batch"]
+
+    expected = json.loads(response_model_path(users))
+    projected = [{name: values[name] for name in LIST_FIELDS} for values in expected]
+    for name, fn in paths.items():
+        if json.loads(fn(inputs[name])) != (projected if name == "fast_fields" else expected):
+            raise SystemExit(f"{name}: output differs from response_model")
+
+    per_10k = 10000 / args.users
+    baseline = None
+    print(f"{'path':<16} {'CPU ms / 10k users':>20} {'speedup':>9}")
+    for name, fn in paths.items():
+        seconds = measure(fn, inputs[name], args.repeat)
+        baseline = baseline or seconds
+        print(f"{name:<16} {seconds * per_10k * 1000:>20.2f} {baseline / seconds:>8.1f}x")
+
+
+if __name__ == "__main__":
+    main()
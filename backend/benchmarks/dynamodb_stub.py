@@ -0,0 +1,357 @@
+"""
+ベンチマーク用のDynamoDBスタンドイン
+
+aiobotocoreの低レベルクライアントと同じ呼び出し形式（型付き属性値）を受け付け、
+ネットワーク往復の代わりに asyncio.sleep で固定レイテンシを再現します。
+Scan では scan_item_latency を指定すると、返すアイテム数に比例したサービス側の処理時間も待ちます
+（セグメントごとの呼び出しは独立に待つため、並列Scanでは重なります）。
+DynamoDB Localを起動せずにイベントループ上の並行性を確認するためのものです。
+ReturnConsumedCapacity を指定した場合は、アイテムサイズから概算した ConsumedCapacity を返します。
+"""
+import asyncio
+import bisect
+import json
+import math
+import random
+import re
+import zlib
+from typing import Any, Dict, List, Optional, Tuple
+
+from botocore.exceptions import ClientError
+
+
+def _client_error(code: str, operation: str) -> ClientError:
+    return ClientError({"Error": {"Code": code, "Message": code}}, operation)
+
+
+# UpdateExpression の SET 句の区切り（if_not_exists(...) の中のカンマでは区切らない）
+_ASSIGNMENT_SEPARATOR = re.compile(r",\s*(?![^()]*\))")
+_IF_NOT_EXISTS = re.compile(r"if_not_exists\((\S+),\s*(\S+)\)\s*\+\s*(\S+)")
+
+# テーブルのパーティションキー（ユーザーは id、メールアドレスの予約は email）
+_KEY_ATTRIBUTES = ("id", "email")
+
+
+def _key(attributes: dict) -> str:
+    """アイテムまたはキーからパーティションキーの値を取り出す"""
+    for name in _KEY_ATTRIBUTES:
+        if name in attributes:
+            return attributes[name]["S"]
+    raise _client_error("ValidationException", "Key")
+
+
+class StubDynamoDBClient:
+    def __init__(
+        self,
+        latency: float = 0.005,
+        throttle_rate: float = 0.0,
+        unprocessed_rate: float = 0.0,
+        scan_item_latency: float = 0.0
+    ):
+        self.latency = latency
+        # Scan で返すアイテム1件あたりのサービス側の処理時間（秒）
+        self.scan_item_latency = scan_item_latency
+        # 指定した割合の呼び出しでスロットリングエラーを返す
+        self.throttle_rate = throttle_rate
+        # BatchGetItem で指定した割合のキーを未処理として返す
+        self.unprocessed_rate = unprocessed_rate
+        self.tables: Dict[str, Dict[str, dict]] = {}
+        self.calls: Dict[str, int] = {}
+        self._version = 0
+        self._key_cache: Dict[tuple, Tuple[int, List[str]]] = {}
+        # 読み込んだアイテムのサイズ（キー → (アイテム, サイズ)）。書き込みではアイテムを作り直すため、同じオブジェクトなら再計算しない
+        self._size_cache: Dict[str, Tuple[dict, int]] = {}
+
+    async def _round_trip(self, operation: str) -> None:
+        self.calls[operation] = self.calls.get(operation, 0) + 1
+        if self.latency:
+            await asyncio.sleep(self.latency)
+        if self.throttle_rate and random.random() < self.throttle_rate:
+            raise _client_error("ProvisionedThroughputExceededException", operation)
+
+    @staticmethod
+    def _item_size(item: dict) -> int:
+        return len(json.dumps(item, separators=(",", ":")))
+
+    def _stored_item_size(self, item: dict) -> int:
+        # サイズの計算（JSONへの変換）は本来サーバー側の処理のため、読み込みのたびにクライアントのCPUを使わないよう覚えておく
+        key = _key(item)
+        cached = self._size_cache.get(key)
+        if cached is not None and cached[0] is item:
+            return cached[1]
+        size = self._item_size(item)
+        self._size_cache[key] = (item, size)
+        return size
+
+    def _read_units(self, items: List[dict]) -> float:
+        # 結果整合性読み込み: 4KBごとに0.5RCU（最小0.5）
+        size = sum(self._stored_item_size(item) for item in items)
+        return max(1, math.ceil(size / 4096)) * 0.5
+
+    def _write_units(self, items: List[dict]) -> float:
+        # 書き込み: アイテムごとに1KBごとに1WCU
+        return float(sum(max(1, math.ceil(self._item_size(item) / 1024)) for item in items))
+
+    @staticmethod
+    def _consumed(kwargs: Dict[str, Any], table_name: str, units: float) -> Dict[str, Any]:
+        if kwargs.get("ReturnConsumedCapacity", "NONE") == "NONE":
+            return {}
+        return {"ConsumedCapacity": {"TableName": table_name, "CapacityUnits": units}}
+
+    def _table(self, name: str) -> Dict[str, dict]:
+        return self.tables.setdefault(name, {})
+
+    def _sorted_keys(
+        self,
+        name: str,
+        segment: Optional[int],
+        total_segments: Optional[int]
+    ) -> List[str]:
+        # 書き込みがあるまでセグメントごとのソート済みキーを使い回す
+        cache_key = (name, segment, total_segments)
+        cached = self._key_cache.get(cache_key)
+        if cached is not None and cached[0] == self._version:
+            return cached[1]
+        keys = sorted(self._table(name))
+        if total_segments:
+            keys = [
+                key for key in keys
+                if zlib.crc32(key.encode("utf-8")) % total_segments == segment
+            ]
+        self._key_cache[cache_key] = (self._version, keys)
+        return keys
+
+    @staticmethod
+    def _project(item: dict, kwargs: Dict[str, Any]) -> dict:
+        # ProjectionExpression は属性名（または #名前）のカンマ区切りのみをサポート
+        projection = kwargs.get("ProjectionExpression")
+        if not projection:
+            return dict(item)
+        names = kwargs.get("ExpressionAttributeNames", {})
+        attributes = [names.get(name.strip(), name.strip()) for name in projection.split(",")]
+        return {name: item[name] for name in attributes if name in item}
+
+    async def get_item(self, TableName: str, Key: dict, **kwargs: Any) -> dict:
+        await self._round_trip("GetItem")
+        item = self._table(TableName).get(_key(Key))
+        # 実際のDynamoDBと同様に、射影してもRCUはアイテム全体のサイズで計算する
+        response = self._consumed(kwargs, TableName, self._read_units([item] if item else []))
+        if item:
+            response["Item"] = self._project(item, kwargs)
+        return response
+
+    async def batch_get_item(self, RequestItems: dict, **kwargs: Any) -> dict:
+        await self._round_trip("BatchGetItem")
+        responses: Dict[str, List[dict]] = {}
+        # 射影してもRCUはアイテム全体のサイズで計算する
+        read: Dict[str, List[dict]] = {}
+        unprocessed: Dict[str, dict] = {}
+        for table_name, request in RequestItems.items():
+            keys = request["Keys"]
+            if len(keys) > 100:
+                raise _client_error("ValidationException", "BatchGetItem")
+            table = self._table(table_name)
+            for key in keys:
+                if self.unprocessed_rate and random.random() < self.unprocessed_rate:
+                    unprocessed.setdefault(table_name, dict(request, Keys=[]))["Keys"].append(key)
+                    continue
+                item = table.get(_key(key))
+                if item:
+                    responses.setdefault(table_name, []).append(self._project(item, request))
+                    read.setdefault(table_name, []).append(item)
+        response = {"Responses": responses, "UnprocessedKeys": unprocessed}
+        consumed = [
+            self._consumed(kwargs, table_name, self._read_units(items)).get("ConsumedCapacity")
+            for table_name, items in read.items()
+        ]
+        if any(consumed):
+            response["ConsumedCapacity"] = consumed
+        return response
+
+    async def query(
+        self,
+        TableName: str,
+        ExpressionAttributeValues: dict,
+        IndexName: Optional[str] = None,
+        **kwargs: Any
+    ) -> dict:
+        await self._round_trip("Query")
+        # email-index のみをサポート
+        email = ExpressionAttributeValues[":email"]["S"]
+        items = [
+            item for item in self._table(TableName).values()
+            if item.get("email", {}).get("S") == email
+        ]
+        return dict(
+            self._consumed(kwargs, TableName, self._read_units(items)),
+            Items=[dict(item) for item in items],
+            Count=len(items)
+        )
+
+    async def scan(
+        self,
+        TableName: str,
+        Limit: Optional[int] = None,
+        ExclusiveStartKey: Optional[dict] = None,
+        Segment: Optional[int] = None,
+        TotalSegments: Optional[int] = None,
+        **kwargs: Any
+    ) -> dict:
+        await self._round_trip("Scan")
+        # キー順に並べ、ExclusiveStartKey の次から Limit 件を返す
+        keys = self._sorted_keys(TableName, Segment, TotalSegments)
+        start = 0
+        if ExclusiveStartKey:
+            start = bisect.bisect_right(keys, ExclusiveStartKey["id"]["S"])
+        end = start + Limit if Limit else len(keys)
+        page = keys[start:end]
+        table = self._table(TableName)
+        items = [table[key] for key in page]
+        if self.scan_item_latency and items:
+            await asyncio.sleep(self.scan_item_latency * len(items))
+        response: Dict[str, Any] = dict(
+            self._consumed(kwargs, TableName, self._read_units(items)),
+            Items=[self._project(item, kwargs) for item in items],
+            Count=len(page)
+        )
+        if end < len(keys):
+            response["LastEvaluatedKey"] = {"id": {"S": page[-1]}}
+        return response
+
+    async def put_item(self, TableName: str, Item: dict, **kwargs: Any) -> dict:
+        await self._round_trip("PutItem")
+        table = self._table(TableName)
+        key = _key(Item)
+        self._check_condition(kwargs, table.get(key), "PutItem")
+        table[key] = dict(Item)
+        self._version += 1
+        return self._consumed(kwargs, TableName, self._write_units([Item]))
+
+    @staticmethod
+    def _evaluate(expression: str, item: Optional[dict], names: dict, values: dict) -> bool:
+        # 条件式は attribute_exists / attribute_not_exists / 等号と、AND・OR・括弧のみをサポート
+        expression = expression.strip()
+        for operator, combine in ((" OR ", any), (" AND ", all)):
+            depth, parts, start = 0, [], 0
+            for index, char in enumerate(expression):
+                depth += (char == "(") - (char == ")")
+                if depth == 0 and expression.startswith(operator, index):
+                    parts.append(expression[start:index])
+                    start = index + len(operator)
+            if parts:
+                parts.append(expression[start:])
+                return combine(StubDynamoDBClient._evaluate(part, item, names, values) for part in parts)
+        if expression.startswith("(") and expression.endswith(")"):
+            return StubDynamoDBClient._evaluate(expression[1:-1], item, names, values)
+        function = re.fullmatch(r"(attribute_exists|attribute_not_exists)\((\S+)\)", expression)
+        if function:
+            exists = item is not None and names.get(function.group(2), function.group(2)) in item
+            return exists if function.group(1) == "attribute_exists" else not exists
+        name, value = (part.strip() for part in expression.split("="))
+        return item is not None and item.get(names.get(name, name)) == values[value]
+
+    def _condition_holds(self, params: Dict[str, Any], item: Optional[dict]) -> bool:
+        condition = params.get("ConditionExpression")
+        if not condition:
+            return True
+        return self._evaluate(
+            condition, item, params.get("ExpressionAttributeNames") or {}, params.get("ExpressionAttributeValues") or {}
+        )
+
+    def _check_condition(self, params: Dict[str, Any], item: Optional[dict], operation: str) -> None:
+        if not self._condition_holds(params, item):
+            error = _client_error("ConditionalCheckFailedException", operation)
+            if item is not None and params.get("ReturnValuesOnConditionCheckFailure") == "ALL_OLD":
+                error.response["Item"] = dict(item)
+            raise error
+
+    @staticmethod
+    def _updated(current: Optional[dict], params: Dict[str, Any]) -> dict:
+        # UpdateExpression は SET 句（値は :値 または if_not_exists(#名前, :値) + :値）のみをサポート
+        names = params.get("ExpressionAttributeNames") or {}
+        values = params.get("ExpressionAttributeValues") or {}
+        item = dict(current) if current is not None else dict(params["Key"])
+        expression = params["UpdateExpression"].strip()
+        if not expression.startswith("SET "):
+            raise _client_error("ValidationException", "UpdateItem")
+        for assignment in _ASSIGNMENT_SEPARATOR.split(expression[len("SET "):]):
+            target, source = (part.strip() for part in assignment.split("=", 1))
+            increment = _IF_NOT_EXISTS.fullmatch(source)
+            if increment:
+                attribute, default, addend = increment.groups()
+                base = item.get(names.get(attribute, attribute), values[default])
+                value = {"N": str(int(base["N"]) + int(values[addend]["N"]))}
+            else:
+                value = values[source]
+            item[names.get(target, target)] = value
+        return item
+
+    async def update_item(self, TableName: str, Key: dict, **kwargs: Any) -> dict:
+        await self._round_trip("UpdateItem")
+        table = self._table(TableName)
+        key = _key(Key)
+        self._check_condition(kwargs, table.get(key), "UpdateItem")
+        item = table[key] = self._updated(table.get(key), dict(kwargs, Key=Key))
+        self._version += 1
+
+        response = self._consumed(kwargs, TableName, self._write_units([item]))
+        if kwargs.get("ReturnValues") == "ALL_NEW":
+            response["Attributes"] = dict(item)
+        return response
+
+    async def delete_item(self, TableName: str, Key: dict, **kwargs: Any) -> dict:
+        await self._round_trip("DeleteItem")
+        table = self._table(TableName)
+        key = _key(Key)
+        self._check_condition(kwargs, table.get(key), "DeleteItem")
+        removed = table.pop(key, None)
+        self._version += 1
+        response = self._consumed(kwargs, TableName, self._write_units([removed or Key]))
+        if removed and kwargs.get("ReturnValues") == "ALL_OLD":
+            response["Attributes"] = removed
+        return response
+
+    async def transact_write_items(self, TransactItems: List[dict], **kwargs: Any) -> dict:
+        # Put / Update / Delete / ConditionCheck の条件をすべて確認してから、まとめて書き込む
+        await self._round_trip("TransactWriteItems")
+        if len(TransactItems) > 100:
+            raise _client_error("ValidationException", "TransactWriteItems")
+        reasons = []
+        for entry in TransactItems:
+            (action, params), = entry.items()
+            key = _key(params["Item"] if action == "Put" else params["Key"])
+            current = self._table(params["TableName"]).get(key)
+            if self._condition_holds(params, current):
+                reasons.append({"Code": "None"})
+            else:
+                reason = {"Code": "ConditionalCheckFailed", "Message": "The conditional request failed"}
+                if current is not None and params.get("ReturnValuesOnConditionCheckFailure") == "ALL_OLD":
+                    reason["Item"] = dict(current)
+                reasons.append(reason)
+        if any(reason["Code"] != "None" for reason in reasons):
+            error = _client_error("TransactionCanceledException", "TransactWriteItems")
+            error.response["CancellationReasons"] = reasons
+            raise error
+
+        written: Dict[str, List[dict]] = {}
+        for entry in TransactItems:
+            (action, params), = entry.items()
+            table = self._table(params["TableName"])
+            if action == "Put":
+                item = table[_key(params["Item"])] = dict(params["Item"])
+            elif action == "Update":
+                key = _key(params["Key"])
+                item = table[key] = self._updated(table.get(key), params)
+            elif action == "Delete":
+                item = table.pop(_key(params["Key"]), None) or params["Key"]
+            else:
+                continue
+            written.setdefault(params["TableName"], []).append(item)
+        self._version += 1
+
+        # 実際のDynamoDBと同様に、トランザクションの書き込みは通常の2倍のWCUを消費する
+        consumed = [
+            self._consumed(kwargs, table_name, 2 * self._write_units(items)).get("ConsumedCapacity")
+            for table_name, items in written.items()
+        ]
+        return {"ConsumedCapacity": consumed} if any(consumed) else {}
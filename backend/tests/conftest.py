@@ -0,0 +1,49 @@
+import os
+
+# app.main は読み込み時に環境変数を参照するため、読み込む前に設定する
+os.environ.setdefault("AUTH_TYPE", "local")
+os.environ.setdefault("USER_REPOSITORY", "memory")
+os.environ.setdefault("LOCAL_SECRET_KEY", "test-secret-key")
+# テストではハッシュ化のコストを下げ、ワーカープロセスを1つにする
+os.environ.setdefault("PASSWORD_HASH_SCRYPT_LN", "4")
+os.environ.setdefault("PASSWORD_HASH_WORKERS", "1")
+os.environ.setdefault("AWS_REGION", "ap-northeast-1")
+os.environ.setdefault("AWS_ACCESS_KEY_ID", "testing")
+os.environ.setdefault("AWS_SECRET_ACCESS_KEY", "testing")
+
+from datetime import datetime, timedelta
+
+import pytest
+from fastapi.testclient import TestClient
+from jose import jwt
+
+from app.main import app
+
+
+def make_token(roles=("user",)) -> str:
+    """ロールを指定したアクセストークン（MockAuth と同じ鍵で署名する）"""
+    return jwt.encode(
+        {
+            "sub": "test-user",
+            "email": "tester@example.com",
+            "username": "tester",
+            "roles": list(roles),
+            "exp": datetime.utcnow() + timedelta(minutes=30),
+        },
+        os.environ["LOCAL_SECRET_KEY"],
+        algorithm="HS256"
+    )
+
+
+@pytest.fixture
+def client():
+    # テストごとに lifespan を実行し、空のメモリ上のリポジトリから始める
+    with TestClient(app) as test_client:
+        test_client.headers["Authorization"] = f"Bearer {make_token()}"
+        yield test_client
+
+
+@pytest.fixture
+def admin_client(client):
+    client.headers["Authorization"] = f"Bearer {make_token(roles=('admin',))}"
+    return client
@@ -0,0 +1,50 @@
+import asyncio
+
+from app.main import classify_request
+from app.middleware.admission_middleware import AdmissionController, AdmissionControlMiddleware, AdmissionLimits
+
+
+def _scope(path: str, method: str = "GET", accept: bytes = b"application/json") -> dict:
+    return {"type": "http", "method": method, "path": path, "headers": [(b"accept", accept)]}
+
+
+def test_ndjson_exports_are_bulk():
+    assert classify_request(_scope("/api/v1/users", accept=b"application/x-ndjson")) == "bulk"
+    assert classify_request(_scope("/api/v1/admin/users", accept=b"application/x-ndjson")) == "bulk"
+    assert classify_request(_scope("/api/v1/users")) == "read"
+    assert classify_request(_scope("/api/v1/users/123", accept=b"application/x-ndjson")) == "read"
+    assert classify_request(_scope("/api/v1/users:import", method="POST")) == "bulk"
+    assert classify_request(_scope("/api/v1/users", method="POST")) == "write"
+
+
+def test_latency_is_measured_to_first_byte_and_slot_held_until_end():
+    controller = AdmissionController(
+        {"read": AdmissionLimits(initial_limit=10, target_latency=0.05)}, classify=lambda scope: "read"
+    )
+    limiter = controller.limiters["read"]
+    in_flight_while_streaming = []
+
+    async def streaming_app(scope, receive, send):
+        await send({"type": "http.response.start", "status": 200, "headers": []})
+        for _ in range(3):
+            await asyncio.sleep(0.05)
+            in_flight_while_streaming.append(limiter.in_flight)
+            await send({"type": "http.response.body", "body": b"x", "more_body": True})
+        await send({"type": "http.response.body", "body": b""})
+
+    async def scenario():
+        sent = []
+
+        async def send(message):
+            sent.append(message)
+
+        middleware = AdmissionControlMiddleware(streaming_app, controller)
+        await middleware(_scope("/api/v1/users"), None, send)
+        return sent
+
+    sent = asyncio.run(scenario())
+    assert sent[0]["status"] == 200
+    assert in_flight_while_streaming == [1, 1, 1]
+    assert limiter.in_flight == 0
+    # 送信に 0.15 秒かかっても、最初のバイトまでは target_latency 以内のため上限は下げない
+    assert limiter.limit == 10
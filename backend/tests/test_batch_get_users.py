@@ -0,0 +1,73 @@
+import asyncio
+import random
+
+import pytest
+
+from app.domain.user import User
+from app.infrastructure.dynamodb import UnprocessedItemsError
+from app.infrastructure.dynamodb.batch import batch_get_items
+from app.infrastructure.repositories.dynamodb_user_repository import DynamoDBUserRepository
+from benchmarks.dynamodb_stub import StubDynamoDBClient
+
+
+def _create(client, email: str, username: str) -> str:
+    response = client.post("/api/v1/users", json={"email": email, "username": username, "password": "secret-1"})
+    assert response.status_code == 200, response.text
+    return response.json()["id"]
+
+
+def test_batch_get_preserves_order_and_returns_null_for_missing(client):
+    alice = _create(client, "alice@example.com", "alice")
+    bob = _create(client, "bob@example.com", "bob")
+    response = client.post("/api/v1/users:batchGet", json={"ids": [bob, "missing", alice, bob]})
+    assert response.status_code == 200, response.text
+    users = response.json()["users"]
+    assert [user and user["username"] for user in users] == ["bob", None, "alice", "bob"]
+    assert "password_hash" not in users[0]
+
+
+def test_batch_get_with_fields(client):
+    alice = _create(client, "alice@example.com", "alice")
+    response = client.post("/api/v1/users:batchGet?fields=id,username", json={"ids": [alice]})
+    assert response.status_code == 200
+    assert response.json() == {"users": [{"id": alice, "username": "alice"}]}
+
+
+@pytest.mark.parametrize("ids", [[], [f"u{index}" for index in range(1001)]])
+def test_batch_get_rejects_empty_or_too_many_ids(client, ids):
+    assert client.post("/api/v1/users:batchGet", json={"ids": ids}).status_code == 422
+
+
+def _dynamodb_repository(**stub_options):
+    client = StubDynamoDBClient(latency=0, **stub_options)
+    return client, DynamoDBUserRepository(client=client, table_name="users")
+
+
+def test_dynamodb_get_many_chunks_retries_and_keeps_order():
+    random.seed(0)
+    client, repository = _dynamodb_repository()
+
+    async def scenario():
+        for index in range(250):
+            await repository.create_user(User(id=f"u{index:03}", email=f"u{index}@example.com", username=f"u{index}"))
+        # 一部のキーを未処理として返させ、再試行させる
+        client.unprocessed_rate = 0.2
+        ids = [f"u{index:03}" for index in reversed(range(250))] + ["missing", "u007"]
+        users = await repository.get_many(ids)
+        assert [user.id if user else None for user in users] == ids[:-2] + [None, "u007"]
+        # 100件ごとの3リクエストに、未処理のキーの再試行が加わる
+        assert client.calls["BatchGetItem"] > 3
+
+    asyncio.run(scenario())
+
+
+def test_batch_get_items_gives_up_after_max_retries():
+    client = StubDynamoDBClient(latency=0, unprocessed_rate=1.0)
+
+    async def scenario():
+        with pytest.raises(UnprocessedItemsError) as raised:
+            await batch_get_items(client, "users", [{"id": {"S": "u1"}}], max_retries=2, base_delay=0.001)
+        assert raised.value.unprocessed == 1
+        assert client.calls["BatchGetItem"] == 3
+
+    asyncio.run(scenario())
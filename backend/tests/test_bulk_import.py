@@ -0,0 +1,115 @@
+import asyncio
+import json
+
+import pytest
+
+from app.infrastructure.repositories.in_memory_user_repository import InMemoryUserRepository
+from app.interfaces.api.v1.import_parsers import MAX_LINE_BYTES, iter_lines
+from app.usecases.user_management.bulk_import import BulkUserImportUseCase, ImportRow
+
+
+async def _chunks(*chunks: bytes):
+    for chunk in chunks:
+        yield chunk
+
+
+def _collect(chunks):
+    async def collect():
+        return [line async for line in iter_lines(_chunks(*chunks))]
+    return asyncio.run(collect())
+
+
+def test_iter_lines_reports_long_and_undecodable_lines():
+    long_line = b"x" * (MAX_LINE_BYTES + 1)
+    lines = _collect([b"first\n" + long_line + b"\nsecond\n\xff\xfe\nthird"])
+    assert lines == [
+        ("first", None),
+        (None, f"1行が{MAX_LINE_BYTES}バイトを超えています"),
+        ("second", None),
+        (None, "UTF-8として解析できません"),
+        ("third", None),
+    ]
+
+
+def test_iter_lines_skips_long_line_split_across_chunks():
+    piece = b"y" * (MAX_LINE_BYTES // 2)
+    lines = _collect([b"first\n" + piece, piece, piece + b"tail", b"\nsecond\n", b"\n"])
+    assert [line for line, _ in lines] == ["first", None, "second"]
+
+
+def _import(admin_client, body: bytes, content_type: str):
+    response = admin_client.post("/api/v1/users:import", content=body, headers={"Content-Type": content_type})
+    assert response.status_code == 200, response.text
+    return [json.loads(line) for line in response.text.splitlines()]
+
+
+def test_import_reports_bad_lines_per_row(admin_client):
+    body = b"\n".join([
+        json.dumps({"email": "a@example.com", "username": "alice"}).encode(),
+        b"\xff" + json.dumps({"email": "b@example.com", "username": "bobby"}).encode(),
+        b'{"email": "c@example.com", "username": "' + b"c" * MAX_LINE_BYTES + b'"}',
+        json.dumps({"email": "d@example.com", "username": "dave"}).encode(),
+    ])
+    results = _import(admin_client, body, "application/x-ndjson")
+    assert [(result.get("row"), result.get("status")) for result in results[:-1]] == [
+        (2, "error"), (3, "error"), (1, "created"), (4, "created")
+    ]
+    assert results[-1]["summary"]["created"] == 2
+    assert results[-1]["summary"]["failed"] == 2
+    assert "error" not in results[-1]["summary"]
+
+
+def test_import_with_unreadable_csv_header_returns_summary_error(admin_client):
+    results = _import(admin_client, b"\xff\xfeemail,username\na@example.com,alice\n", "text/csv")
+    assert results == [{"summary": {
+        "created": 0, "failed": 0, "elapsed_ms": results[0]["summary"]["elapsed_ms"],
+        "error": "ヘッダー行を読み込めません: UTF-8として解析できません",
+    }}]
+
+
+class _SlowRepository(InMemoryUserRepository):
+    def __init__(self, delay: float):
+        super().__init__()
+        self.delay = delay
+
+    async def create_users(self, users):
+        await asyncio.sleep(self.delay)
+        return await super().create_users(users)
+
+
+async def _rows(count: int, error: BaseException):
+    for row in range(1, count + 1):
+        yield ImportRow(row=row, data={"email": f"user{row}@example.com", "username": f"user{row}"})
+        await asyncio.sleep(0)
+    raise error
+
+
+def test_execute_finishes_written_batches_when_input_fails():
+    repository = _SlowRepository(delay=0.01)
+    reported = []
+
+    async def scenario():
+        use_case = BulkUserImportUseCase(repository, batch_size=2)
+        return await use_case.execute(_rows(5, ValueError("読み込みに失敗しました")), reported.append)
+
+    summary = asyncio.run(scenario())
+    assert summary["created"] == 5
+    assert summary["error"] == "読み込みに失敗しました"
+    assert sorted(result["row"] for result in reported) == [1, 2, 3, 4, 5]
+    assert len(repository) == 5
+
+
+def test_execute_cancels_in_flight_batches_when_interrupted():
+    repository = _SlowRepository(delay=10)
+    reported = []
+
+    async def scenario():
+        use_case = BulkUserImportUseCase(repository, batch_size=2)
+        with pytest.raises(ConnectionError):
+            await use_case.execute(_rows(4, ConnectionError("client disconnected")), reported.append)
+        # 取り消したバッチは、戻った後に report を呼ばない
+        await asyncio.sleep(0.05)
+
+    asyncio.run(scenario())
+    assert reported == []
+    assert len(repository) == 0
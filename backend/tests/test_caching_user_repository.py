@@ -0,0 +1,121 @@
+import asyncio
+
+from app.domain.user import User
+from app.infrastructure.repositories.caching_user_repository import CachingUserRepository
+from app.infrastructure.repositories.in_memory_user_repository import InMemoryUserRepository
+
+
+class _CountingRepository(InMemoryUserRepository):
+    """読み込みの回数を数え、gate を指定すると読み込みの結果を返す前に待つリポジトリ"""
+
+    def __init__(self):
+        super().__init__()
+        self.reads = 0
+        self.gate = None
+
+    async def _wait(self) -> None:
+        self.reads += 1
+        if self.gate is not None:
+            await self.gate.wait()
+
+    async def get_by_id(self, user_id, fields=None, consistent=False):
+        user = await super().get_by_id(user_id, fields=fields, consistent=consistent)
+        await self._wait()
+        return user
+
+    async def get_by_email(self, email):
+        user = await super().get_by_email(email)
+        await self._wait()
+        return user
+
+
+def _user(user_id="u1", email="alice@example.com", username="alice") -> User:
+    return User(id=user_id, email=email, username=username)
+
+
+def test_hits_by_id_and_email_and_invalidates_on_update():
+    backing = _CountingRepository()
+    repository = CachingUserRepository(backing)
+
+    async def scenario():
+        await repository.create_user(_user())
+        assert (await repository.get_by_id("u1")).username == "alice"
+        assert (await repository.get_by_email("alice@example.com")).id == "u1"
+        assert backing.reads == 1
+
+        await repository.update_fields("u1", {"username": "alice2", "email": "alice2@example.com"})
+        assert (await repository.get_by_id("u1")).username == "alice2"
+        assert await repository.get_by_email("alice@example.com") is None
+        assert (await repository.get_by_email("alice2@example.com")).username == "alice2"
+
+        user = await repository.get_by_id("u1")
+        user.username = "alice3"
+        await repository.update_user(user)
+        assert (await repository.get_by_email("alice2@example.com")).username == "alice3"
+
+    asyncio.run(scenario())
+
+
+def test_delete_invalidates_both_keys():
+    repository = CachingUserRepository(_CountingRepository())
+
+    async def scenario():
+        await repository.create_user(_user())
+        await repository.get_by_id("u1")
+        assert await repository.delete_user("u1")
+        assert await repository.get_by_id("u1") is None
+        assert await repository.get_by_email("alice@example.com") is None
+
+    asyncio.run(scenario())
+
+
+def test_negative_results_are_cached_for_negative_ttl():
+    backing = _CountingRepository()
+    repository = CachingUserRepository(backing, negative_ttl=5.0)
+    now = [0.0]
+    repository._cache.clock = lambda: now[0]
+
+    async def scenario():
+        assert await repository.get_by_id("u1") is None
+        # 他のワーカーによる作成は negative_ttl の間は見えない
+        await backing.create_user(_user())
+        assert await repository.get_by_id("u1") is None
+        assert backing.reads == 1
+        assert repository.stats()["negative_hits"] == 1
+        now[0] += 5.0
+        assert (await repository.get_by_id("u1")).username == "alice"
+
+        # このプロセスでの作成は negative キャッシュを取り除く
+        assert await repository.get_by_email("bob@example.com") is None
+        await repository.create_user(_user("u2", "bob@example.com", "bob"))
+        assert (await repository.get_by_email("bob@example.com")).id == "u2"
+
+    asyncio.run(scenario())
+
+
+def test_fetch_overlapping_an_invalidation_is_not_cached():
+    backing = _CountingRepository()
+    repository = CachingUserRepository(backing)
+
+    async def scenario():
+        await repository.create_user(_user())
+        backing.gate = asyncio.Event()
+        # 更新前の値を読んだまま待っている間に更新（と無効化）が起きる
+        read = asyncio.create_task(repository.get_by_id("u1"))
+        await asyncio.sleep(0)
+        await repository.update_fields("u1", {"username": "alice2"})
+        backing.gate.set()
+        assert (await read).username == "alice"
+        assert repository.stats()["discarded_fetches"] == 1
+        assert (await repository.get_by_id("u1")).username == "alice2"
+
+        # 見つからなかった結果も、読み込みの間に作成されればキャッシュしない
+        backing.gate = asyncio.Event()
+        read = asyncio.create_task(repository.get_by_email("bob@example.com"))
+        await asyncio.sleep(0)
+        await repository.create_user(_user("u2", "bob@example.com", "bob"))
+        backing.gate.set()
+        assert await read is None
+        assert (await repository.get_by_email("bob@example.com")).id == "u2"
+
+    asyncio.run(scenario())
@@ -0,0 +1,116 @@
+import asyncio
+import threading
+
+import boto3
+import pytest
+from jose import jwt
+from moto import mock_aws
+
+from app.infrastructure.auth.cognito_auth import CognitoAuth
+
+REGION = "ap-northeast-1"
+EMAIL = "alice@example.com"
+PASSWORD = "Passw0rd!"
+
+
+class _RecordingClient:
+    """
+    moto の cognito-idp クライアントを包み、呼び出したメソッドとスレッドを記録する
+    id_token_claims を指定すると、initiate_auth が返すIDトークンのクレームを書き換える（None は取り除く）
+    """
+
+    def __init__(self, client, id_token_claims=None):
+        self.client = client
+        self.id_token_claims = id_token_claims
+        self.calls = []
+
+    def _record(self, name: str) -> None:
+        self.calls.append((name, threading.current_thread().name))
+
+    def initiate_auth(self, **params):
+        self._record("initiate_auth")
+        response = self.client.initiate_auth(**params)
+        if self.id_token_claims is not None:
+            tokens = response["AuthenticationResult"]
+            claims = dict(jwt.get_unverified_claims(tokens["IdToken"]), **self.id_token_claims)
+            claims = {name: value for name, value in claims.items() if value is not None}
+            tokens["IdToken"] = jwt.encode(claims, "unused", algorithm="HS256")
+        return response
+
+    def get_user(self, **params):
+        self._record("get_user")
+        return self.client.get_user(**params)
+
+
+@pytest.fixture
+def user_pool():
+    with mock_aws():
+        client = boto3.client("cognito-idp", region_name=REGION)
+        pool_id = client.create_user_pool(PoolName="users")["UserPool"]["Id"]
+        client_id = client.create_user_pool_client(
+            UserPoolId=pool_id, ClientName="app", ExplicitAuthFlows=["ALLOW_USER_PASSWORD_AUTH"]
+        )["UserPoolClient"]["ClientId"]
+        client.admin_create_user(
+            UserPoolId=pool_id, Username=EMAIL,
+            UserAttributes=[{"Name": "email", "Value": EMAIL}], MessageAction="SUPPRESS"
+        )
+        client.admin_set_user_password(UserPoolId=pool_id, Username=EMAIL, Password=PASSWORD, Permanent=True)
+        group = client.create_group(GroupName="admin", UserPoolId=pool_id)["Group"]["GroupName"]
+        client.admin_add_user_to_group(UserPoolId=pool_id, Username=EMAIL, GroupName=group)
+        yield client, pool_id, client_id
+
+
+def _login(user_pool, username=EMAIL, password=PASSWORD, id_token_claims=None):
+    client, pool_id, client_id = user_pool
+    recording = _RecordingClient(client, id_token_claims)
+    auth = CognitoAuth(
+        user_pool_id=pool_id, client_id=client_id, region=REGION, secret_key="test-secret",
+        jwks_fetcher=lambda: None, client=recording
+    )
+    try:
+        user = asyncio.run(auth.authenticate_user(username, password))
+    finally:
+        auth.close()
+    return user, recording.calls
+
+
+def test_login_falls_back_to_get_user_when_id_token_has_no_email(user_pool):
+    user, calls = _login(user_pool)
+    client, pool_id, _ = user_pool
+    sub = next(
+        attribute["Value"]
+        for attribute in client.admin_get_user(UserPoolId=pool_id, Username=EMAIL)["UserAttributes"]
+        if attribute["Name"] == "sub"
+    )
+    assert user.id == sub
+    assert user.email == EMAIL
+    assert user.username == EMAIL
+    assert [name for name, _ in calls] == ["initiate_auth", "get_user"]
+    # boto3 の呼び出しはイベントループではなく専用のスレッドプールで行う
+    assert all(thread.startswith("cognito") for _, thread in calls)
+
+
+def test_login_reads_user_from_id_token(user_pool):
+    user, calls = _login(user_pool, id_token_claims={
+        "email": EMAIL, "preferred_username": "alice", "cognito:groups": ["admin"]
+    })
+    assert (user.email, user.username, user.roles) == (EMAIL, "alice", ["admin"])
+    assert [name for name, _ in calls] == ["initiate_auth"]
+
+
+@pytest.mark.parametrize("claims", [
+    {"token_use": "access"},
+    {"aud": "other-client"},
+    {"sub": None},
+])
+def test_login_rejects_id_token_for_another_use_or_client(user_pool, claims):
+    user, calls = _login(user_pool, id_token_claims=dict(claims, email=EMAIL))
+    assert user is None
+    assert [name for name, _ in calls] == ["initiate_auth"]
+
+
+@pytest.mark.parametrize("username, password", [(EMAIL, "wrong-password"), ("nobody@example.com", PASSWORD)])
+def test_login_with_bad_credentials_returns_none(user_pool, username, password):
+    user, calls = _login(user_pool, username, password)
+    assert user is None
+    assert [name for name, _ in calls] == ["initiate_auth"]
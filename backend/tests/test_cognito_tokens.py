@@ -0,0 +1,178 @@
+import asyncio
+import time
+
+import pytest
+from cryptography.hazmat.primitives import serialization
+from cryptography.hazmat.primitives.asymmetric import rsa
+from jose import jwk, jwt
+
+from app.infrastructure.auth.cognito_auth import CognitoAuth
+
+REGION = "ap-northeast-1"
+USER_POOL_ID = "ap-northeast-1_test"
+CLIENT_ID = "test-client"
+ISSUER = f"https://cognito-idp.{REGION}.amazonaws.com/{USER_POOL_ID}"
+
+
+def _private_key() -> bytes:
+    key = rsa.generate_private_key(public_exponent=65537, key_size=2048)
+    return key.private_bytes(
+        serialization.Encoding.PEM, serialization.PrivateFormat.PKCS8, serialization.NoEncryption()
+    )
+
+
+KEYS = {"k1": _private_key(), "k2": _private_key()}
+
+
+def _jwks(*kids: str) -> dict:
+    return {"keys": [
+        dict(jwk.construct(KEYS[kid], "RS256").public_key().to_dict(), kid=kid, use="sig")
+        for kid in kids
+    ]}
+
+
+def _token(kid: str = "k1", **claims) -> str:
+    now = int(time.time())
+    payload = {
+        "sub": "user-1",
+        "iss": ISSUER,
+        "aud": CLIENT_ID,
+        "token_use": "id",
+        "cognito:username": "alice",
+        "cognito:groups": ["admin"],
+        "iat": now,
+        "exp": now + 600,
+    }
+    payload.update(claims)
+    # None を指定したクレームは含めない
+    payload = {name: value for name, value in payload.items() if value is not None}
+    return jwt.encode(payload, KEYS[kid], algorithm="RS256", headers={"kid": kid})
+
+
+class _Fetcher:
+    """返す鍵セット（例外なら送出する）を順に指定できるJWKSのフェッチャー"""
+
+    def __init__(self, *responses):
+        self.responses = list(responses)
+        self.calls = 0
+
+    async def __call__(self) -> dict:
+        response = self.responses[min(self.calls, len(self.responses) - 1)]
+        self.calls += 1
+        if isinstance(response, Exception):
+            raise response
+        return response
+
+
+@pytest.fixture
+def clock():
+    return [1000.0]
+
+
+def _auth(fetcher: _Fetcher, clock) -> CognitoAuth:
+    auth = CognitoAuth(
+        user_pool_id=USER_POOL_ID, client_id=CLIENT_ID, region=REGION,
+        secret_key="test-secret", jwks_fetcher=fetcher, client=object()
+    )
+    auth.jwks.clock = lambda: clock[0]
+    return auth
+
+
+def test_valid_id_and_access_tokens(clock):
+    fetcher = _Fetcher(_jwks("k1"))
+    auth = _auth(fetcher, clock)
+
+    async def scenario():
+        payload = await auth.verify_token(_token())
+        assert payload["sub"] == "user-1"
+        assert payload["username"] == "alice"
+        assert payload["roles"] == ["admin"]
+        access = _token(token_use="access", aud=None, client_id=CLIENT_ID)
+        assert (await auth.verify_token(access))["sub"] == "user-1"
+        # 鍵セットはキャッシュから使う
+        assert fetcher.calls == 1
+
+    asyncio.run(scenario())
+
+
+@pytest.mark.parametrize("claims", [
+    {"exp": int(time.time()) - 60},
+    {"aud": "other-client"},
+    {"token_use": "refresh"},
+    {"token_use": "access", "client_id": "other-client"},
+    {"iss": "https://cognito-idp.us-east-1.amazonaws.com/other-pool"},
+])
+def test_rejects_invalid_claims(clock, claims):
+    auth = _auth(_Fetcher(_jwks("k1")), clock)
+    assert asyncio.run(auth.verify_token(_token(**claims))) is None
+
+
+def test_rejects_token_signed_by_another_key_with_known_kid(clock):
+    auth = _auth(_Fetcher(_jwks("k1")), clock)
+    forged = jwt.encode(
+        jwt.get_unverified_claims(_token()), KEYS["k2"], algorithm="RS256", headers={"kid": "k1"}
+    )
+    assert asyncio.run(auth.verify_token(forged)) is None
+
+
+def test_unknown_kid_refreshes_once_per_interval(clock):
+    # 鍵のローテーション: 2回目の取得で k2 が増える
+    fetcher = _Fetcher(_jwks("k1"), _jwks("k1", "k2"))
+    auth = _auth(fetcher, clock)
+
+    async def scenario():
+        assert await auth.verify_token(_token("k1"))
+        assert fetcher.calls == 1
+        clock[0] += auth.jwks.min_refresh_interval
+        assert (await auth.verify_token(_token("k2")))["sub"] == "user-1"
+        assert fetcher.calls == 2
+
+        # 存在しない kid では min_refresh_interval の間は再取得しない
+        bogus = jwt.encode(
+            jwt.get_unverified_claims(_token()), KEYS["k1"], algorithm="RS256", headers={"kid": "missing"}
+        )
+        assert await auth.verify_token(bogus) is None
+        assert await auth.verify_token(bogus) is None
+        assert fetcher.calls == 2
+        clock[0] += auth.jwks.min_refresh_interval
+        assert await auth.verify_token(bogus) is None
+        assert fetcher.calls == 3
+
+    asyncio.run(scenario())
+
+
+def test_failed_first_fetch_is_not_retried_on_every_request(clock):
+    fetcher = _Fetcher(OSError("unreachable"), _jwks("k1"))
+    auth = _auth(fetcher, clock)
+
+    async def scenario():
+        assert await auth.verify_token(_token()) is None
+        assert await auth.verify_token(_token()) is None
+        assert fetcher.calls == 1
+        assert auth.jwks.refresh_errors == 1
+        clock[0] += auth.jwks.min_refresh_interval
+        assert (await auth.verify_token(_token()))["sub"] == "user-1"
+        assert fetcher.calls == 2
+
+    asyncio.run(scenario())
+
+
+def test_failed_background_refresh_keeps_serving_cached_keys(clock):
+    fetcher = _Fetcher(_jwks("k1"), OSError("unreachable"), _jwks("k1"))
+    auth = _auth(fetcher, clock)
+
+    async def scenario():
+        assert await auth.verify_token(_token())
+        clock[0] += auth.jwks.ttl
+        # 期限切れの鍵セットで検証しつつ、バックグラウンドで更新する（失敗しても手元の鍵を使い続ける）
+        assert await auth.verify_token(_token())
+        await auth.jwks.refresh()
+        assert fetcher.calls == 2
+        assert await auth.verify_token(_token())
+        assert fetcher.calls == 2
+        clock[0] += auth.jwks.min_refresh_interval
+        assert await auth.verify_token(_token())
+        await auth.jwks.refresh()
+        assert fetcher.calls == 3
+
+    asyncio.run(scenario())
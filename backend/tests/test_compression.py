@@ -0,0 +1,57 @@
+import asyncio
+import zlib
+
+import pytest
+
+from app.middleware.compression_middleware import CompressionMiddleware, available_encodings
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+try:
+    import zstandard
+except ImportError:
+    zstandard = None
+
+CHUNKS = [(b'{"id":"%d","username":"user%d"}\n' % (index, index)) * 20 for index in range(5)]
+
+
+def _decompressor(encoding: str):
+    if encoding == "zstd":
+        return zstandard.ZstdDecompressor().decompressobj().decompress
+    if encoding == "br":
+        return brotli.Decompressor().process
+    return zlib.decompressobj(31).decompress
+
+
+async def _streaming_app(scope, receive, send):
+    await send({"type": "http.response.start", "status": 200, "headers": [(b"content-type", b"application/x-ndjson")]})
+    for chunk in CHUNKS:
+        await send({"type": "http.response.body", "body": chunk, "more_body": True})
+    await send({"type": "http.response.body", "body": b""})
+
+
+@pytest.mark.parametrize("encoding", available_encodings())
+def test_streaming_chunks_are_flushed(encoding):
+    messages = []
+
+    async def send(message):
+        messages.append(message)
+
+    scope = {
+        "type": "http", "method": "GET", "path": "/api/v1/users",
+        "headers": [(b"accept-encoding", encoding.encode())],
+    }
+    asyncio.run(CompressionMiddleware(_streaming_app, minimum_size=16)(scope, None, send))
+
+    start, *bodies = messages
+    assert (b"content-encoding", encoding.encode()) in start["headers"]
+    decompress = _decompressor(encoding)
+    # 最後以外のチャンクも、それだけで元のチャンクに展開できる（圧縮器に溜まっていない）
+    for body, original in zip(bodies, CHUNKS):
+        assert body["more_body"] is True
+        assert decompress(body["body"]) == original
+    assert bodies[-1].get("more_body", False) is False
+    assert decompress(bodies[-1]["body"]) == b""
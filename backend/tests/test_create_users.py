@@ -0,0 +1,93 @@
+import asyncio
+
+import pytest
+
+from app.domain.user import User, UserBatch
+from app.infrastructure.repositories.dynamodb_user_repository import DynamoDBUserRepository
+from app.infrastructure.repositories.in_memory_user_repository import InMemoryUserRepository
+from benchmarks.dynamodb_stub import StubDynamoDBClient
+
+
+def _dynamodb_repository() -> DynamoDBUserRepository:
+    return DynamoDBUserRepository(client=StubDynamoDBClient(latency=0), table_name="users")
+
+
+@pytest.fixture(params=["memory", "dynamodb"])
+def repository(request):
+    return InMemoryUserRepository() if request.param == "memory" else _dynamodb_repository()
+
+
+def _batch(*emails: str) -> UserBatch:
+    batch = UserBatch()
+    for index, email in enumerate(emails):
+        batch.append(f"new-{index}", email, f"user{index}")
+    return batch
+
+
+def test_create_users_rejects_registered_and_repeated_emails(repository):
+    async def scenario():
+        await repository.create_user(User(id="existing", email="taken@example.com", username="taken"))
+        result = await repository.create_users(
+            _batch("a@example.com", "taken@example.com", "b@example.com", "a@example.com")
+        )
+        assert list(result.created.ids) == ["new-0", "new-2"]
+        assert result.errors == {
+            "new-1": "Email already registered",
+            "new-3": "Email already registered",
+        }
+        assert (await repository.get_by_email("a@example.com")).id == "new-0"
+        assert (await repository.get_by_email("taken@example.com")).id == "existing"
+        assert await repository.get_by_id("new-1") is None
+
+    asyncio.run(scenario())
+
+
+def test_create_users_rejects_existing_ids(repository):
+    async def scenario():
+        await repository.create_user(User(id="new-0", email="first@example.com", username="first"))
+        result = await repository.create_users([User(id="new-0", email="second@example.com", username="second")])
+        assert list(result.created) == []
+        assert result.errors == {"new-0": "ユーザーIDが既に存在します"}
+        assert (await repository.get_by_id("new-0")).email == "first@example.com"
+
+    asyncio.run(scenario())
+
+
+def test_dynamodb_create_users_spans_several_transactions():
+    repository = _dynamodb_repository()
+
+    async def scenario():
+        emails = [f"user{index}@example.com" for index in range(120)]
+        result = await repository.create_users(_batch(*emails, "user7@example.com"))
+        assert len(result.created) == 120
+        assert list(result.errors) == ["new-120"]
+        assert len(repository.client.client.tables["users-emails"]) == 120
+
+    asyncio.run(scenario())
+
+
+def test_backfill_email_reservations():
+    repository = _dynamodb_repository()
+    stub = repository.client.client
+
+    async def scenario():
+        await repository.create_users(_batch("a@example.com", "b@example.com"))
+        # 予約テーブルを導入する前に作成されたユーザー（予約なし）
+        for user_id, email in (("old-1", "c@example.com"), ("old-2", "a@example.com")):
+            await stub.put_item(
+                TableName="users",
+                Item=repository._user_to_item(User(id=user_id, email=email, username=user_id))
+            )
+        counts = await repository.backfill_email_reservations()
+        assert counts == {"reserved": 3, "conflicts": 1}
+        reservations = stub.tables["users-emails"]
+        assert {item["email"]["S"]: item["user_id"]["S"] for item in reservations.values()} == {
+            "a@example.com": "new-0",
+            "b@example.com": "new-1",
+            "c@example.com": "old-1",
+        }
+        # 予約済みのユーザーは作れない
+        result = await repository.create_users([User(id="new-9", email="c@example.com", username="late")])
+        assert result.errors == {"new-9": "Email already registered"}
+
+    asyncio.run(scenario())
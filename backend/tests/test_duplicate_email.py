@@ -0,0 +1,48 @@
+import json
+
+
+def _create(client, email: str, username: str):
+    return client.post("/api/v1/users", json={"email": email, "username": username, "password": "secret-1"})
+
+
+def test_create_user_with_registered_email_returns_400(client):
+    assert _create(client, "taken@example.com", "first").status_code == 200
+    response = _create(client, "taken@example.com", "second")
+    assert response.status_code == 400
+    assert response.json()["detail"] == "Email already registered"
+    assert [user["username"] for user in client.get("/api/v1/users").json()] == ["first"]
+
+
+def test_update_to_registered_email_returns_400(client):
+    _create(client, "taken@example.com", "first")
+    user_id = _create(client, "free@example.com", "second").json()["id"]
+    response = client.put(f"/api/v1/users/{user_id}", json={"email": "taken@example.com"})
+    assert response.status_code == 400
+    assert client.get(f"/api/v1/users/{user_id}").json()["email"] == "free@example.com"
+
+
+def test_import_reports_registered_and_repeated_emails_per_row(admin_client):
+    _create(admin_client, "taken@example.com", "existing")
+    body = "\n".join(json.dumps(row) for row in [
+        {"email": "taken@example.com", "username": "again"},
+        {"email": "new@example.com", "username": "newcomer"},
+        {"email": "new@example.com", "username": "repeated"},
+    ]).encode()
+    response = admin_client.post(
+        "/api/v1/users:import", content=body, headers={"Content-Type": "application/x-ndjson"}
+    )
+    assert response.status_code == 200, response.text
+    results = [json.loads(line) for line in response.text.splitlines()]
+
+    rows = {result["row"]: result for result in results[:-1]}
+    assert sorted(rows) == [1, 2, 3]
+    assert rows[1] == {"row": 1, "status": "error", "error": "Email already registered"}
+    assert rows[2]["status"] == "created"
+    # ファイル内で重複したメールアドレスは、書き込む前にユースケースが同じメッセージで弾く
+    assert rows[3] == {"row": 3, "status": "error", "error": "Email already registered"}
+    summary = results[-1]["summary"]
+    assert (summary["created"], summary["failed"]) == (1, 2)
+    assert "error" not in summary
+
+    users = admin_client.get("/api/v1/users").json()
+    assert sorted(user["username"] for user in users) == ["existing", "newcomer"]
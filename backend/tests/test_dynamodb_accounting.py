@@ -0,0 +1,169 @@
+import asyncio
+import json
+import logging
+
+import pytest
+from botocore.exceptions import ClientError
+
+from app.infrastructure.dynamodb.accounting import (
+    CapacityTrackingClient,
+    RequestUsage,
+    begin_request_usage,
+    current_request_usage,
+    end_request_usage,
+)
+from app.infrastructure.metrics import MetricsRegistry
+from app.middleware.logging_middleware import LoggingMiddleware
+from app.middleware.metrics_middleware import MetricsMiddleware
+from benchmarks.dynamodb_stub import StubDynamoDBClient
+
+TABLE = "users"
+
+
+def _item(user_id: str) -> dict:
+    return {"id": {"S": user_id}, "username": {"S": f"user-{user_id}"}}
+
+
+def _key(user_id: str) -> dict:
+    return {"id": {"S": user_id}}
+
+
+def test_records_calls_and_capacity_per_operation():
+    client = CapacityTrackingClient(StubDynamoDBClient(latency=0))
+
+    async def scenario():
+        usage, token = begin_request_usage("req-1")
+        try:
+            await client.put_item(TableName=TABLE, Item=_item("u1"))
+            await client.put_item(TableName=TABLE, Item=_item("u2"))
+            await client.get_item(TableName=TABLE, Key=_key("u1"))
+            # 呼び出し時に作ったタスクも同じ集計に加算される
+            await asyncio.gather(*(client.get_item(TableName=TABLE, Key=_key(user_id)) for user_id in ("u1", "u2")))
+            await client.batch_get_item(RequestItems={TABLE: {"Keys": [_key("u1"), _key("u2")]}})
+        finally:
+            end_request_usage(token)
+        return usage
+
+    usage = asyncio.run(scenario())
+    assert usage.request_id == "req-1"
+    assert usage.calls == 6
+    operations = usage.operations
+    assert (operations["put_item"].calls, operations["put_item"].write_units) == (2, 2.0)
+    assert operations["put_item"].read_units == 0.0
+    # TOTAL では CapacityUnits のみが返るため、読み取り系の操作は RCU として数える
+    assert (operations["get_item"].calls, operations["get_item"].read_units) == (3, 1.5)
+    assert (operations["batch_get_item"].calls, operations["batch_get_item"].read_units) == (1, 0.5)
+    assert (usage.read_units, usage.write_units) == (2.0, 2.0)
+
+    log = usage.to_log()
+    assert (log["calls"], log["rcu"], log["wcu"]) == (6, 2.0, 2.0)
+    get_item = dict(log["operations"]["get_item"])
+    assert get_item.pop("latency_ms") >= 0
+    assert get_item == {"calls": 3, "errors": 0, "rcu": 1.5, "wcu": 0.0}
+
+
+def test_explicit_capacity_fields_and_return_consumed_capacity():
+    usage = RequestUsage()
+    usage.record("transact_write_items", 0.001, [
+        {"TableName": "users", "ReadCapacityUnits": 1.0, "WriteCapacityUnits": 4.0},
+        {"TableName": "emails", "CapacityUnits": 2.0},
+    ])
+    assert (usage.read_units, usage.write_units) == (1.0, 6.0)
+
+    # 呼び出し側が指定した ReturnConsumedCapacity はそのまま渡す
+    client = CapacityTrackingClient(StubDynamoDBClient(latency=0))
+
+    async def scenario():
+        usage, token = begin_request_usage()
+        try:
+            response = await client.put_item(TableName=TABLE, Item=_item("u1"), ReturnConsumedCapacity="NONE")
+        finally:
+            end_request_usage(token)
+        return usage, response
+
+    usage, response = asyncio.run(scenario())
+    assert "ConsumedCapacity" not in response
+    assert (usage.calls, usage.write_units) == (1, 0.0)
+
+
+def test_errors_are_counted_and_calls_outside_a_request_are_not():
+    stub = StubDynamoDBClient(latency=0, throttle_rate=1.0)
+    client = CapacityTrackingClient(stub)
+
+    async def scenario():
+        # リクエスト外の呼び出しは集計しない
+        with pytest.raises(ClientError):
+            await client.get_item(TableName=TABLE, Key=_key("u1"))
+        assert current_request_usage() is None
+
+        usage, token = begin_request_usage()
+        try:
+            with pytest.raises(ClientError):
+                await client.get_item(TableName=TABLE, Key=_key("u1"))
+        finally:
+            end_request_usage(token)
+        return usage
+
+    usage = asyncio.run(scenario())
+    assert stub.calls["GetItem"] == 2
+    assert (usage.operations["get_item"].calls, usage.operations["get_item"].errors) == (1, 1)
+    assert usage.read_units == 0.0
+    # 読み書き以外の属性はそのまま委譲する
+    assert client.tables is stub.tables
+
+
+def _app(client: CapacityTrackingClient):
+    async def app(scope, receive, send):
+        if scope["path"] == "/users":
+            await client.put_item(TableName=TABLE, Item=_item("u1"))
+            await client.get_item(TableName=TABLE, Key=_key("u1"))
+        await send({"type": "http.response.start", "status": 200, "headers": []})
+        await send({"type": "http.response.body", "body": b"{}"})
+
+    return app
+
+
+def _request(middleware, path: str) -> None:
+    async def receive():
+        return {"type": "http.request", "body": b""}
+
+    async def send(message):
+        pass
+
+    scope = {"type": "http", "method": "GET", "path": path, "headers": [], "query_string": b""}
+    asyncio.run(middleware(scope, receive, send))
+
+
+def _samples(registry: MetricsRegistry, name: str) -> dict:
+    return {tuple(sample[0]): sample[1:] for sample in registry.snapshot()[name]["samples"]}
+
+
+def test_middlewares_log_and_count_usage_per_request(caplog):
+    registry = MetricsRegistry()
+    client = CapacityTrackingClient(StubDynamoDBClient(latency=0))
+    middleware = MetricsMiddleware(LoggingMiddleware(_app(client)), registry=registry)
+
+    with caplog.at_level(logging.INFO, logger="api"):
+        _request(middleware, "/users")
+        _request(middleware, "/other")
+
+    responses = [
+        json.loads(record.getMessage().split(": ", 1)[1])
+        for record in caplog.records if record.getMessage().startswith("Response sent")
+    ]
+    assert len(responses) == 2
+    dynamodb = responses[0]["dynamodb"]
+    assert (dynamodb["calls"], dynamodb["rcu"], dynamodb["wcu"]) == (2, 0.5, 1.0)
+    assert sorted(dynamodb["operations"]) == ["get_item", "put_item"]
+    # 呼び出しのなかったリクエストには載せない
+    assert "dynamodb" not in responses[1]
+
+    route = "__unmatched__"
+    assert _samples(registry, "dynamodb_calls_total") == {
+        ("GET", route, "put_item"): [1.0], ("GET", route, "get_item"): [1.0]
+    }
+    assert _samples(registry, "dynamodb_consumed_read_capacity_units_total") == {("GET", route, "get_item"): [0.5]}
+    assert _samples(registry, "dynamodb_consumed_write_capacity_units_total") == {("GET", route, "put_item"): [1.0]}
+    # 1リクエストあたりの呼び出し回数: 2回と0回の2リクエスト
+    _, total, count = _samples(registry, "dynamodb_calls_per_request")[("GET", route)]
+    assert (total, count) == (2, 2)
@@ -0,0 +1,47 @@
+import asyncio
+import pickle
+
+import pytest
+
+from app.domain.user import User
+from app.infrastructure.repositories.in_memory_user_repository import InMemoryUserRepository
+
+
+def test_create_user_marks_the_user_clean():
+    repository = InMemoryUserRepository()
+
+    async def scenario():
+        user = User(id="u1", email="alice@example.com", username="alice")
+        user.roles = ["admin"]
+        created = await repository.create_user(user)
+        assert created.changes() == {}
+        created.is_active = False
+        assert created.changes() == {"is_active": False}
+        updated = await repository.update_user(created)
+        assert updated.version == 1
+        assert (await repository.get_by_id("u1")).roles == ["admin"]
+
+    asyncio.run(scenario())
+
+
+def test_snapshot_round_trip(tmp_path):
+    path = str(tmp_path / "users.snapshot")
+    repository = InMemoryUserRepository()
+
+    async def scenario():
+        await repository.create_user(User(id="u1", email="alice@example.com", username="alice", roles=["admin"]))
+        await repository.update_fields("u1", {"username": "alice2"})
+        assert await repository.save_snapshot(path) == 1
+        restored = InMemoryUserRepository()
+        assert await restored.load_snapshot(path) == 1
+        user = await restored.get_by_email("alice@example.com")
+        assert (user.username, user.roles, user.version) == ("alice2", ["admin"], 1)
+
+    asyncio.run(scenario())
+
+
+def test_snapshot_with_another_format_is_rejected(tmp_path):
+    path = tmp_path / "users.snapshot"
+    path.write_bytes(pickle.dumps({"version": 2, "users": []}))
+    with pytest.raises(ValueError):
+        asyncio.run(InMemoryUserRepository().load_snapshot(str(path)))
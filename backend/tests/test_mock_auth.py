@@ -0,0 +1,63 @@
+import asyncio
+
+import pytest
+
+from app.domain.user import User
+from app.infrastructure.auth.mock_auth import MockAuth
+from app.infrastructure.auth.password_hasher import PasswordHasher
+from app.infrastructure.repositories.in_memory_user_repository import InMemoryUserRepository
+
+
+@pytest.fixture
+def auth():
+    hasher = PasswordHasher(ln=4, r=8, p=1, max_workers=1)
+    auth = MockAuth(secret_key="test-secret", password_hasher=hasher)
+    auth.user_repository = InMemoryUserRepository()
+    yield auth
+    hasher.close()
+
+
+def _login_verifications(auth: MockAuth, email: str, password: str = "password123"):
+    # ログインの結果と、その間に照合した回数
+    async def scenario():
+        before = auth.password_hasher.verified
+        user = await auth.authenticate_user(email, password)
+        return user, auth.password_hasher.verified - before
+
+    return asyncio.run(scenario())
+
+
+def test_unknown_email_still_verifies_a_password(auth):
+    user, verifications = _login_verifications(auth, "nobody@example.com")
+    assert user is None
+    assert verifications == 1
+
+
+def test_inactive_user_and_unusable_hash_still_verify_a_password(auth):
+    async def register():
+        await auth.user_repository.create_user(User(
+            id="inactive", email="inactive@example.com", username="inactive",
+            password_hash=await auth.password_hasher.hash("password123"), is_active=False
+        ))
+        await auth.user_repository.create_user(User(id="nohash", email="nohash@example.com", username="nohash"))
+
+    asyncio.run(register())
+    for email in ("inactive@example.com", "nohash@example.com"):
+        user, verifications = _login_verifications(auth, email)
+        assert user is None
+        assert verifications == 1
+
+
+def test_registered_user_logs_in(auth):
+    async def register():
+        await auth.user_repository.create_user(User(
+            id="active", email="active@example.com", username="active",
+            password_hash=await auth.password_hasher.hash("password123")
+        ))
+
+    asyncio.run(register())
+    user, _ = _login_verifications(auth, "active@example.com")
+    assert user is not None and user.id == "active"
+    user, verifications = _login_verifications(auth, "active@example.com", "wrong-password")
+    assert user is None
+    assert verifications == 1
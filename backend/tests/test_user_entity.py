@@ -0,0 +1,123 @@
+import pickle
+from datetime import datetime
+
+from app.domain.user import User, UserBatch
+from app.domain.user.entity import make_revision
+
+
+def _user(**values) -> User:
+    defaults = dict(
+        id="u1", email="alice@example.com", username="alice", roles=["user"],
+        created_at="2024-01-02T03:04:05", updated_at=None, last_login="2024-01-03T00:00:00"
+    )
+    defaults.update(values)
+    return User(**defaults)
+
+
+def test_timestamps_are_parsed_on_first_access():
+    user = _user()
+    assert not hasattr(user, "__dict__")
+    # 参照されるまでは受け取った文字列のまま持つ
+    assert user.raw_values()[6] == "2024-01-02T03:04:05"
+    assert user.isoformat("created_at") == "2024-01-02T03:04:05"
+    assert user.raw_values()[6] == "2024-01-02T03:04:05"
+
+    assert user.created_at == datetime(2024, 1, 2, 3, 4, 5)
+    assert user.raw_values()[6] == datetime(2024, 1, 2, 3, 4, 5)
+    assert user.isoformat("created_at") == "2024-01-02T03:04:05"
+    assert user.updated_at is None and user.isoformat("updated_at") is None
+    assert user.last_login == datetime(2024, 1, 3)
+    assert isinstance(User(id="u2", email="bob@example.com", username="bob").created_at, datetime)
+
+
+def test_assigned_fields_are_tracked_until_mark_clean():
+    user = _user()
+    assert user.changes() == {}
+    user.username = "alice2"
+    user.last_login = "2024-02-01T00:00:00"
+    user.add_role("admin")
+    # updated_at は変更として記録しない
+    assert sorted(user.changes()) == ["last_login", "roles", "username"]
+    assert user.changes()["last_login"] == "2024-02-01T00:00:00"
+    assert user.changes()["roles"] == ["user", "admin"]
+    assert user.updated_at is not None
+
+    user.mark_clean()
+    assert user.changes() == {}
+    user.add_role("admin")
+    user.remove_role("missing")
+    assert user.changes() == {}
+    user.deactivate()
+    assert user.changes() == {"is_active": False}
+
+
+def test_revision_follows_version_and_timestamps():
+    user = _user(version=2)
+    assert user.revision() == "2:2024-01-02T03:04:05"
+    # 解析済みでも未解析でも同じ版になる
+    assert user.created_at == datetime(2024, 1, 2, 3, 4, 5)
+    assert user.revision() == "2:2024-01-02T03:04:05"
+    user.updated_at = datetime(2024, 5, 6, 7, 8, 9)
+    assert user.revision() == "2:2024-05-06T07:08:09"
+    assert _user(version=2, updated_at="2024-05-06T07:08:09").revision() == user.revision()
+    assert make_revision(3, None, "2024-01-02T03:04:05") == "3:2024-01-02T03:04:05"
+
+
+def test_copy_and_pickle_do_not_share_roles_or_changes():
+    user = _user()
+    user.username = "changed"
+    copied = user.copy(email="other@example.com")
+    assert copied.changes() == {}
+    assert (copied.id, copied.username, copied.email) == ("u1", "changed", "other@example.com")
+    copied.add_role("admin")
+    assert user.roles == ["user"]
+
+    restored = pickle.loads(pickle.dumps(user))
+    assert restored == user
+    assert restored.changes() == {}
+    assert restored.raw_values() == user.raw_values()
+
+
+def test_batch_stores_columns_and_builds_independent_users():
+    users = [
+        _user(),
+        _user(id="u2", email="bob@example.com", username="bob", roles=["user"], version=4,
+              updated_at="2024-06-01T00:00:00", last_login=None),
+        _user(id="u3", email="carol@example.com", username="carol", roles=["admin"], is_active=False),
+    ]
+    batch = UserBatch.from_users(users)
+    assert len(batch) == 3
+    assert batch.column("username") == ["alice", "bob", "carol"]
+    assert batch.column("version") == [0, 4, 0]
+    # 同じロールの組み合わせは1つのタプルを共有する
+    assert batch.roles[0] is batch.roles[1]
+    # 日時は解析せずに保持する
+    assert batch.column("created_at")[0] == "2024-01-02T03:04:05"
+    assert batch.revisions() == [user.revision() for user in users]
+    assert [row[:5] for row in batch.rows()] == [user.raw_values()[:5] for user in users]
+    assert list(batch) == users
+    assert batch[1] == users[1]
+
+    # 取り出した User の変更はバッチに影響しない
+    first = batch[0]
+    first.add_role("admin")
+    first.username = "renamed"
+    assert batch.roles[0] == ("user",)
+    assert batch.usernames[0] == "alice"
+    assert first.changes() == {"roles": ["user", "admin"], "username": "renamed"}
+    assert next(iter(batch)).changes() == {}
+
+
+def test_batch_slices_rows_and_extend():
+    users = [_user(id=f"u{index}", email=f"user{index}@example.com", username=f"user{index}") for index in range(5)]
+    batch = UserBatch.from_rows(user.raw_values() for user in users)
+    assert list(batch) == users
+
+    tail = batch[3:]
+    assert isinstance(tail, UserBatch)
+    assert tail.ids == ["u3", "u4"]
+    head = batch[:2]
+    head.extend(tail)
+    assert head.ids == ["u0", "u1", "u3", "u4"]
+    assert len(batch) == 5
+    assert repr(head) == "UserBatch(len=4)"
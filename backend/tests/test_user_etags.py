@@ -0,0 +1,131 @@
+import asyncio
+
+from app.domain.user import User
+from app.infrastructure.repositories.caching_user_repository import CachingUserRepository
+from app.infrastructure.repositories.in_memory_user_repository import InMemoryUserRepository
+
+
+def _create(client, email: str, username: str) -> str:
+    response = client.post("/api/v1/users", json={"email": email, "username": username, "password": "secret-1"})
+    assert response.status_code == 200, response.text
+    return response.json()["id"]
+
+
+def _etag(client, user_id: str) -> str:
+    response = client.get(f"/api/v1/users/{user_id}")
+    assert response.status_code == 200
+    return response.headers["etag"]
+
+
+def test_get_returns_304_for_matching_etag(client):
+    user_id = _create(client, "alice@example.com", "alice")
+    etag = _etag(client, user_id)
+    response = client.get(f"/api/v1/users/{user_id}", headers={"If-None-Match": etag})
+    assert response.status_code == 304
+    assert response.headers["etag"] == etag
+
+
+def test_update_with_current_etag(client):
+    user_id = _create(client, "alice@example.com", "alice")
+    etag = _etag(client, user_id)
+    response = client.put(f"/api/v1/users/{user_id}", json={"username": "alice2"}, headers={"If-Match": etag})
+    assert response.status_code == 200, response.text
+    assert response.json()["username"] == "alice2"
+    assert response.headers["etag"] != etag
+    assert response.headers["etag"] == _etag(client, user_id)
+
+    # 古い ETag での更新は 412
+    stale = client.put(f"/api/v1/users/{user_id}", json={"username": "alice3"}, headers={"If-Match": etag})
+    assert stale.status_code == 412
+    assert client.get(f"/api/v1/users/{user_id}").json()["username"] == "alice2"
+
+
+def test_if_match_uses_strong_comparison_of_the_whole_etag(client):
+    alice = _create(client, "alice@example.com", "alice")
+    bob = _create(client, "bob@example.com", "bob")
+    alice_etag = _etag(client, alice)
+    # version が同じでも、他のユーザーの ETag やハッシュの異なる ETag・弱いETagには一致しない
+    version = alice_etag[1:].partition("-")[0]
+    for condition in (_etag(client, bob), f'"{version}-{"0" * 32}"', f"W/{alice_etag}"):
+        response = client.put(f"/api/v1/users/{alice}", json={"username": "mallory"}, headers={"If-Match": condition})
+        assert response.status_code == 412, condition
+    # 複数の ETag のいずれかに一致すれば更新する
+    response = client.put(
+        f"/api/v1/users/{alice}", json={"username": "alice2"}, headers={"If-Match": f'"other", {alice_etag}'}
+    )
+    assert response.status_code == 200
+
+
+def test_if_match_star_and_missing_user(client):
+    user_id = _create(client, "alice@example.com", "alice")
+    assert client.put(f"/api/v1/users/{user_id}", json={"username": "alice2"}, headers={"If-Match": "*"}).status_code == 200
+    assert client.put("/api/v1/users/missing", json={"username": "nobody"}, headers={"If-Match": "*"}).status_code == 412
+    assert client.put("/api/v1/users/missing", json={"username": "nobody"}).status_code == 404
+
+
+def test_update_without_if_match_writes_changed_fields(client):
+    user_id = _create(client, "alice@example.com", "alice")
+    response = client.put(f"/api/v1/users/{user_id}", json={"is_active": False})
+    assert response.status_code == 200
+    assert response.json()["is_active"] is False
+    assert response.json()["username"] == "alice"
+    assert response.json()["version"] == 1
+
+
+def test_if_match_update_does_not_read_before_writing(client, monkeypatch):
+    user_id = _create(client, "alice@example.com", "alice")
+    etag = _etag(client, user_id)
+    repository = client.app.state.user_repository
+    reads = []
+
+    async def get_by_id(*args, **kwargs):
+        reads.append(args)
+        raise AssertionError("If-Match の更新で読み込んだ")
+
+    monkeypatch.setattr(repository, "get_by_id", get_by_id)
+    monkeypatch.setattr(repository, "get_revision", get_by_id)
+    response = client.put(f"/api/v1/users/{user_id}", json={"username": "alice2"}, headers={"If-Match": etag})
+    assert response.status_code == 200, response.text
+    assert response.json()["version"] == 1
+    assert reads == []
+    # 古い ETag は条件付き更新の version の不一致として 412 になる
+    assert client.put(
+        f"/api/v1/users/{user_id}", json={"username": "alice3"}, headers={"If-Match": etag}
+    ).status_code == 412
+    assert reads == []
+
+
+def test_etag_depends_on_id_version_and_fields(client):
+    user_id = _create(client, "alice@example.com", "alice")
+    etag = _etag(client, user_id)
+    assert etag.startswith('"0-')
+    assert client.get(f"/api/v1/users/{user_id}?fields=username").headers["etag"] != etag
+    client.put(f"/api/v1/users/{user_id}", json={"is_active": False})
+    assert _etag(client, user_id).startswith('"1-')
+
+
+def test_update_without_changes_checks_if_match(client):
+    user_id = _create(client, "alice@example.com", "alice")
+    etag = _etag(client, user_id)
+    response = client.put(f"/api/v1/users/{user_id}", json={}, headers={"If-Match": etag})
+    assert response.status_code == 200
+    assert response.headers["etag"] == etag
+    client.put(f"/api/v1/users/{user_id}", json={"username": "alice2"})
+    assert client.put(f"/api/v1/users/{user_id}", json={}, headers={"If-Match": etag}).status_code == 412
+
+
+def test_consistent_read_bypasses_cache():
+    backing = InMemoryUserRepository()
+    repository = CachingUserRepository(backing)
+
+    async def scenario():
+        await repository.create_user(User(id="u1", email="a@example.com", username="alice"))
+        assert (await repository.get_by_id("u1")).version == 0
+        # 他のワーカーによる更新（このプロセスのキャッシュは無効化されない）
+        await backing.update_fields("u1", {"username": "alice2"})
+        assert (await repository.get_by_id("u1")).version == 0
+        assert (await repository.get_by_id("u1", consistent=True)).version == 1
+        # 読み直した値でキャッシュも更新される
+        assert (await repository.get_by_id("u1")).username == "alice2"
+
+    asyncio.run(scenario())
@@ -0,0 +1,54 @@
+import json
+
+from app.interfaces.api.v1.serializers import OUTPUT_FIELDS
+
+
+def _create(client, email="alice@example.com", username="alice"):
+    response = client.post("/api/v1/users", json={"email": email, "username": username, "password": "secret-1"})
+    assert response.status_code == 200, response.text
+    return response.json()
+
+
+def _assert_no_password_hash(value):
+    assert "password_hash" not in json.dumps(value)
+
+
+def test_user_endpoints_do_not_return_password_hash(admin_client):
+    client = admin_client
+    created = _create(client)
+    _assert_no_password_hash(created)
+    assert set(created) == set(OUTPUT_FIELDS)
+    user_id = created["id"]
+
+    responses = [
+        client.get("/api/v1/users"),
+        client.get("/api/v1/admin/users"),
+        client.get(f"/api/v1/users/{user_id}"),
+        client.put(f"/api/v1/users/{user_id}", json={"username": "alice2"}),
+        client.post("/api/v1/users:batchGet", json={"ids": [user_id, "missing"]}),
+    ]
+    for response in responses:
+        assert response.status_code == 200, response.text
+        _assert_no_password_hash(response.json())
+
+    export = client.get("/api/v1/users", headers={"Accept": "application/x-ndjson"})
+    assert export.status_code == 200
+    for line in export.text.splitlines():
+        _assert_no_password_hash(json.loads(line))
+
+
+def test_login_does_not_return_password_hash(client):
+    _create(client, email="bob@example.com", username="bob")
+    response = client.post("/api/v1/login", data={"username": "bob@example.com", "password": "secret-1"})
+    assert response.status_code == 200, response.text
+    assert response.json()["user"]["email"] == "bob@example.com"
+    _assert_no_password_hash(response.json())
+
+
+def test_password_hash_cannot_be_requested_with_fields(client):
+    user_id = _create(client)["id"]
+    for path in ("/api/v1/users", f"/api/v1/users/{user_id}"):
+        response = client.get(path, params={"fields": "id,password_hash"})
+        assert response.status_code == 400
+    response = client.get(f"/api/v1/users/{user_id}", params={"fields": "id,email"})
+    assert response.json() == {"id": user_id, "email": "alice@example.com"}
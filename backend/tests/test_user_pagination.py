@@ -0,0 +1,104 @@
+import asyncio
+import base64
+import json
+
+import pytest
+
+from app.domain.user import User
+from app.infrastructure.repositories.dynamodb_user_repository import DynamoDBUserRepository
+from benchmarks.dynamodb_stub import StubDynamoDBClient
+
+
+def _create_users(client, count: int) -> set:
+    ids = set()
+    for index in range(count):
+        response = client.post(
+            "/api/v1/users",
+            json={"email": f"user{index}@example.com", "username": f"user{index}", "password": "secret-1"}
+        )
+        assert response.status_code == 200, response.text
+        ids.add(response.json()["id"])
+    return ids
+
+
+def _walk(client, path: str, limit: int):
+    # X-Next-Cursor を辿って全ページを読み、ページごとの件数と全ユーザーのIDを返す
+    sizes, ids, cursor = [], [], None
+    while True:
+        params = {"limit": limit}
+        if cursor:
+            params["cursor"] = cursor
+        response = client.get(path, params=params)
+        assert response.status_code == 200, response.text
+        page = response.json()
+        sizes.append(len(page))
+        ids.extend(user["id"] for user in page)
+        cursor = response.headers.get("x-next-cursor")
+        if not cursor:
+            return sizes, ids
+
+
+@pytest.mark.parametrize("path", ["/api/v1/users", "/api/v1/admin/users"])
+def test_cursor_pagination_visits_every_user_once(admin_client, path):
+    created = _create_users(admin_client, 5)
+    sizes, ids = _walk(admin_client, path, limit=2)
+    assert sizes == [2, 2, 1]
+    assert len(ids) == 5 and set(ids) == created
+
+
+def test_admin_listing_requires_admin_role(client):
+    assert client.get("/api/v1/admin/users").status_code == 403
+
+
+@pytest.mark.parametrize("cursor", ["***", "a", base64.urlsafe_b64encode(b"\xff\xfe").decode().rstrip("=")])
+def test_invalid_cursor_returns_400(client, cursor):
+    response = client.get("/api/v1/users", params={"cursor": cursor})
+    assert response.status_code == 400
+    assert response.json()["detail"] == "無効なカーソルです"
+
+
+def test_limit_is_bounded(client):
+    assert client.get("/api/v1/users", params={"limit": 0}).status_code == 422
+    assert client.get("/api/v1/users", params={"limit": 1001}).status_code == 422
+
+
+def test_ndjson_streams_every_user(client):
+    created = _create_users(client, 3)
+    response = client.get("/api/v1/users", headers={"Accept": "application/x-ndjson"})
+    assert response.status_code == 200
+    assert response.headers["content-type"].startswith("application/x-ndjson")
+    lines = [json.loads(line) for line in response.text.splitlines()]
+    assert {user["id"] for user in lines} == created
+    assert "x-next-cursor" not in response.headers
+
+
+def _cursor(key) -> str:
+    return base64.urlsafe_b64encode(json.dumps(key).encode()).decode().rstrip("=")
+
+
+def test_dynamodb_cursor_pagination_and_tampered_cursors():
+    repository = DynamoDBUserRepository(client=StubDynamoDBClient(latency=0), table_name="users")
+
+    async def scenario():
+        for index in range(5):
+            await repository.create_user(User(id=f"u{index}", email=f"u{index}@example.com", username=f"u{index}"))
+        ids, cursor = [], None
+        while True:
+            page = await repository.list_users_page(limit=2, cursor=cursor)
+            ids.extend(page.items.ids)
+            cursor = page.next_cursor
+            if not cursor:
+                break
+        assert sorted(ids) == [f"u{index}" for index in range(5)]
+
+        for tampered in (
+            "not-base64!",
+            _cursor(["u1"]),
+            _cursor({"id": {"N": "1"}}),
+            _cursor({"id": {"S": "u1"}, "email": {"S": "u1@example.com"}}),
+            _cursor({"id": {"S": ""}}),
+        ):
+            with pytest.raises(ValueError):
+                await repository.list_users_page(limit=2, cursor=tampered)
+
+    asyncio.run(scenario())
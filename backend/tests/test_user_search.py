@@ -0,0 +1,45 @@
+import pytest
+
+
+def _create(client, email: str, username: str) -> str:
+    response = client.post("/api/v1/users", json={"email": email, "username": username, "password": "secret-1"})
+    assert response.status_code == 200, response.text
+    return response.json()["id"]
+
+
+def _search(client, q: str, **params):
+    response = client.get("/api/v1/users/search", params=dict(params, q=q))
+    assert response.status_code == 200, response.text
+    return [result["username"] for result in response.json()]
+
+
+@pytest.fixture
+def users(client):
+    return {
+        username: _create(client, f"{email}@example.com", username)
+        for username, email in [("alice", "wonder"), ("Alfred", "butler"), ("bob", "alpha"), ("carol", "carol")]
+    }
+
+
+def test_prefix_match_on_username_then_email(client, users):
+    # username の一致を username 順（大文字小文字を区別しない）に、続けて email だけの一致を返す
+    assert _search(client, "al") == ["Alfred", "alice", "bob"]
+    assert _search(client, "AL") == ["Alfred", "alice", "bob"]
+    assert _search(client, "butler@") == ["Alfred"]
+    assert _search(client, "zed") == []
+
+
+def test_limit(client, users):
+    assert _search(client, "al", limit=2) == ["Alfred", "alice"]
+    assert client.get("/api/v1/users/search", params={"q": "al", "limit": 0}).status_code == 422
+
+
+def test_updated_and_deleted_users(client, users):
+    client.put(f"/api/v1/users/{users['alice']}", json={"username": "zoe"})
+    assert _search(client, "al") == ["Alfred", "bob"]
+    assert _search(client, "zo") == ["zoe"]
+    client.put(f"/api/v1/users/{users['carol']}", json={"is_active": False})
+    assert _search(client, "car", is_active=False) == ["carol"]
+    assert _search(client, "car", is_active=True) == []
+    assert client.delete(f"/api/v1/users/{users['bob']}").status_code == 200
+    assert _search(client, "al") == ["Alfred"]
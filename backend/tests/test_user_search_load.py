@@ -0,0 +1,60 @@
+import asyncio
+
+from app import main
+from app.infrastructure.repositories.in_memory_user_repository import InMemoryUserRepository
+from app.infrastructure.search import UserSearchIndex
+from app.domain.user import User
+
+
+class _FlakyRepository(InMemoryUserRepository):
+    """最初の failures 回の全件読み込みで失敗するリポジトリ"""
+
+    def __init__(self, failures: int):
+        super().__init__([User(id="u1", email="alice@example.com", username="alice")])
+        self.failures = failures
+        self.attempts = 0
+
+    async def iter_user_batches(self, batch_size=1000, fields=None):
+        self.attempts += 1
+        if self.attempts <= self.failures:
+            raise ConnectionError("scan failed")
+        async for batch in super().iter_user_batches(batch_size=batch_size, fields=fields):
+            yield batch
+
+
+def test_search_index_load_retries_with_backoff(monkeypatch, caplog):
+    monkeypatch.setattr(main, "USER_SEARCH_LOAD_RETRY_BASE_SECONDS", 0.01)
+    monkeypatch.setattr(main, "USER_SEARCH_LOAD_RETRY_MAX_SECONDS", 0.02)
+    repository = _FlakyRepository(failures=2)
+    index = UserSearchIndex()
+
+    asyncio.run(asyncio.wait_for(main._load_user_search_index(index, repository), timeout=5))
+
+    assert repository.attempts == 3
+    assert index.ready
+    assert [result["username"] for result in index.search("ali")] == ["alice"]
+    warnings = [record for record in caplog.records if record.name == "api" and record.levelname == "WARNING"]
+    assert len(warnings) == 2
+
+
+def test_search_index_reloads_to_pick_up_other_workers_writes():
+    repository = InMemoryUserRepository([User(id="u1", email="alice@example.com", username="alice")])
+    index = UserSearchIndex()
+
+    async def scenario():
+        refresh = asyncio.create_task(main._refresh_user_search_index(index, repository, interval=0.01))
+        try:
+            while not index.ready:
+                await asyncio.sleep(0.001)
+            # 他のワーカーによる書き込み（この索引には直接反映されない）
+            await repository.create_user(User(id="u2", email="alfred@example.com", username="alfred"))
+            await repository.delete_user("u1")
+            for _ in range(500):
+                if [result["id"] for result in index.search("al")] == ["u2"]:
+                    break
+                await asyncio.sleep(0.01)
+            assert [result["id"] for result in index.search("al")] == ["u2"]
+        finally:
+            refresh.cancel()
+
+    asyncio.run(scenario())
@@ -0,0 +1,99 @@
+import asyncio
+import json
+from datetime import datetime
+from typing import List, Optional
+
+from pydantic import TypeAdapter
+
+from app.domain.user import User, UserBatch
+from app.interfaces.api.v1 import serializers
+from app.interfaces.api.v1 import users as users_api
+from app.interfaces.api.v1.serializers import UserSchema, dumps_user, dumps_users, iter_json_array, iter_ndjson
+
+
+def _users() -> List[User]:
+    return [
+        User(
+            id="u1", email="alice@example.com", username="alice", password_hash="secret",
+            roles=["admin", "user"], created_at=datetime(2024, 1, 2, 3, 4, 5, 678901),
+            updated_at=datetime(2024, 2, 1), version=3
+        ),
+        # リポジトリから読んだ未解析の日時文字列
+        User(
+            id="u2", email="bob@example.com", username="bob", is_active=False,
+            created_at="2024-03-04T05:06:07", last_login="2024-03-05T00:00:00.000001"
+        ),
+        User(id="u3", email="carol@example.com", username="carol", roles=["user"], created_at=datetime(2024, 4, 1)),
+    ]
+
+
+def _response_model(users) -> list:
+    # response_model=List[User] を通した場合の出力
+    return TypeAdapter(List[Optional[UserSchema]]).dump_python(list(users), mode="json")
+
+
+def test_fast_path_matches_response_model():
+    users = _users()
+    expected = _response_model(users)
+    assert "password_hash" not in expected[0]
+    assert json.loads(dumps_users(users)) == expected
+    assert json.loads(dumps_users(UserBatch.from_users(users))) == expected
+    assert json.loads(dumps_user(users[1])) == expected[1]
+
+
+def test_stdlib_fallback_matches_orjson(monkeypatch):
+    users = _users()
+    encoded = dumps_users(users)
+    monkeypatch.setattr(serializers, "orjson", None)
+    assert json.loads(dumps_users(users)) == json.loads(encoded)
+    assert json.loads(dumps_users(UserBatch.from_users(users), ["id", "roles"])) == [
+        {"id": "u1", "roles": ["admin", "user"]}, {"id": "u2", "roles": []}, {"id": "u3", "roles": ["user"]},
+    ]
+
+
+def test_missing_users_keep_their_position():
+    users = _users()
+    values = json.loads(dumps_users([users[0], None, users[2]]))
+    assert values[1] is None
+    assert [value["id"] for value in (values[0], values[2])] == ["u1", "u3"]
+    assert json.loads(dumps_users([None, users[1]], ["username"])) == [None, {"username": "bob"}]
+
+
+def test_chunked_array_and_ndjson_match_single_encoding():
+    users = _users()
+    for fields in (None, ("id", "created_at")):
+        single = dumps_users(users, fields)
+        chunks = list(iter_json_array(users, chunk_size=2, fields=fields))
+        assert b"".join(chunks) == single
+        assert len(chunks) == 4
+
+        async def batches():
+            yield UserBatch.from_users(users[:2])
+            yield UserBatch.from_users(users[2:])
+
+        async def collect():
+            return [chunk async for chunk in iter_ndjson(batches(), fields)]
+
+        ndjson = asyncio.run(collect())
+        assert len(ndjson) == 2
+        assert [json.loads(line) for line in b"".join(ndjson).splitlines()] == json.loads(single)
+    assert b"".join(iter_json_array([])) == b"[]"
+
+
+def test_large_pages_are_streamed_as_one_array(client, monkeypatch):
+    for index in range(5):
+        response = client.post("/api/v1/users", json={
+            "email": f"user{index}@example.com", "username": f"user{index}", "password": "secret-1"
+        })
+        assert response.status_code == 200
+    single = client.get("/api/v1/users", params={"limit": 10})
+    assert "content-length" in single.headers
+
+    monkeypatch.setattr(users_api, "USER_CHUNK_SIZE", 2)
+    streamed = client.get("/api/v1/users", params={"limit": 10})
+    assert streamed.status_code == 200
+    assert "content-length" not in streamed.headers
+    assert streamed.headers["content-type"].startswith("application/json")
+    assert streamed.headers["etag"] == single.headers["etag"]
+    assert streamed.json() == single.json()
+    assert len(streamed.json()) == 5